@@ -0,0 +1,5 @@
+
+# src/data_checker/__init__.py
+
+
+from .checker import SchemaCompiler, CompiledSchema, CSVSchemaChecker
@@ -0,0 +1,384 @@
+
+# src/data_checker/checker.py
+
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# csv upload validation against a JSON schema
+# the schema is compiled once into vectorized column checks, then run chunk by chunk
+
+ERROR_FIELDS = ["row", "column", "rule", "value", "message"]
+
+_NUMERIC_TYPES = {"integer", "number"}
+_TRUE_TOKENS = {"true", "1", "yes"}
+_BOOLEAN_TOKENS = _TRUE_TOKENS | {"false", "0", "no"}
+
+
+def _search(raw, pattern):
+    """Vectorized regex search (JSON schema patterns are not anchored)"""
+    with warnings.catch_warnings():
+        # pandas warns about capture groups, only the match flag is used here
+        warnings.simplefilter("ignore", UserWarning)
+        return raw.str.contains(pattern, na=False)
+
+
+class ColumnProgram:
+    """
+    Compiled checks for a single schema property (one CSV column)
+    """
+
+    def __init__(self, column, types, required=False, unique=False):
+        self.column = column
+        self.types = types
+        self.required = required
+        self.unique = unique
+
+        # list of (rule name, check function, message), check(raw, parsed) returns a violation mask
+        self.checks = []
+
+    def parse(self, raw):
+        """
+        Parse raw string values into the schema type
+
+        Args:
+            raw: Series of raw strings (NaN for empty cells)
+
+        Returns:
+            tuple: (parsed Series, mask of values matching at least one schema type)
+        """
+        parsed = raw
+        type_ok = None
+
+        for value_type in self.types:
+            if value_type == "string":
+                ok = pd.Series(True, index=raw.index)
+            elif value_type in _NUMERIC_TYPES:
+                numbers = pd.to_numeric(raw, errors="coerce")
+                ok = numbers.notna()
+                if value_type == "integer":
+                    ok = ok & (numbers % 1 == 0)
+                if parsed is raw:
+                    parsed = numbers
+            elif value_type == "boolean":
+                tokens = raw.str.strip().str.lower()
+                ok = tokens.isin(_BOOLEAN_TOKENS)
+                if parsed is raw:
+                    parsed = tokens.isin(_TRUE_TOKENS)
+            elif value_type in ("date", "date-time"):
+                dates = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+                ok = dates.notna()
+                if parsed is raw:
+                    parsed = dates
+            else:
+                raise ValueError(f"unsupported schema type for {self.column}: {value_type}")
+
+            type_ok = ok if type_ok is None else type_ok | ok
+
+        if type_ok is None:
+            type_ok = pd.Series(True, index=raw.index)
+
+        return parsed, type_ok
+
+
+class CompiledSchema:
+    """
+    JSON schema compiled into per-column programs, evaluated one chunk at a time
+    """
+
+    def __init__(self, programs, required_columns, allow_additional=True, title=None):
+        self.programs = programs
+        self.required_columns = required_columns
+        self.allow_additional = allow_additional
+        self.title = title
+
+    def new_state(self):
+        """Fresh per-run state (hashes of values seen so far for unique columns)"""
+        return {name: np.empty(0, dtype=np.uint64) for name, program in self.programs.items() if program.unique}
+
+    def check_header(self, columns):
+        """
+        Check the column names of an upload against the schema
+
+        Returns:
+            list of error rows for missing and unexpected columns
+        """
+        errors = []
+        for column in self.required_columns:
+            if column not in columns:
+                errors.append([0, column, "required_column", "", f"required column {column} is missing"])
+
+        if not self.allow_additional:
+            for column in columns:
+                if column not in self.programs:
+                    errors.append([0, column, "additional_column", "", f"column {column} is not in the schema"])
+
+        return errors
+
+    def iter_chunk_errors(self, chunk, state):
+        """
+        Run every compiled check on one chunk
+
+        Args:
+            chunk: DataFrame of raw string values, index = 0-based data row number
+            state: run state from new_state
+
+        Yields:
+            tuple: (column, rule, message, row positions in the chunk)
+        """
+        for column, program in self.programs.items():
+            if column not in chunk.columns:
+                continue
+
+            raw = chunk[column]
+            present = raw.notna()
+
+            if program.required:
+                missing = ~present
+                if missing.any():
+                    yield column, "required", "value is required", np.flatnonzero(missing.to_numpy())
+
+            parsed, type_ok = program.parse(raw)
+            bad_type = present & ~type_ok
+            if bad_type.any():
+                yield column, "type", f"expected {'/'.join(program.types)}", np.flatnonzero(bad_type.to_numpy())
+
+            # value checks only look at present values of the right type
+            checkable = present & type_ok
+            for rule, check, message in program.checks:
+                violations = checkable & check(raw, parsed)
+                if violations.any():
+                    yield column, rule, message, np.flatnonzero(violations.to_numpy())
+
+            if program.unique:
+                yield from self._unique_errors(column, raw, present, state)
+
+    def _unique_errors(self, column, raw, present, state):
+        """Duplicates inside the chunk or against hashes from earlier chunks"""
+        positions = np.flatnonzero(present.to_numpy())
+        if len(positions) == 0:
+            return
+
+        hashes = pd.util.hash_array(raw.to_numpy(dtype=object)[positions].astype(str))
+        duplicated = pd.Series(hashes).duplicated().to_numpy() | np.isin(hashes, state[column])
+        state[column] = np.union1d(state[column], hashes)
+
+        if duplicated.any():
+            yield column, "unique", "duplicate value", positions[duplicated]
+
+
+class SchemaCompiler:
+    """
+    Turns a JSON schema into a CompiledSchema of vectorized column checks
+
+    Supported keywords per property: type (string, integer, number, boolean, date,
+    date-time, null or a list of these), format (date, date-time), enum, pattern,
+    minLength, maxLength, minimum, maximum, exclusiveMinimum, exclusiveMaximum and
+    the non-standard unique flag. Top level: properties, required, additionalProperties.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+
+    def compile(self, schema):
+        """
+        Compile a JSON schema
+
+        Args:
+            schema: schema dictionary or path to a JSON schema file
+
+        Returns:
+            CompiledSchema
+        """
+        if isinstance(schema, str):
+            with open(schema) as f:
+                schema = json.load(f)
+
+        required = schema.get("required", [])
+        programs = {}
+
+        for column, spec in schema.get("properties", {}).items():
+            programs[column] = self._compile_property(column, spec, column in required)
+
+        self.logger.info(f"compiled schema with {len(programs)} columns and "
+                         f"{sum(len(p.checks) for p in programs.values())} value checks")
+
+        return CompiledSchema(programs, required, schema.get("additionalProperties", True), schema.get("title"))
+
+    def _compile_property(self, column, spec, required):
+        types = spec.get("type", "string")
+        types = [types] if isinstance(types, str) else list(types)
+        types = [t for t in types if t != "null"]
+
+        if spec.get("format") in ("date", "date-time") and "string" in types:
+            types = [spec["format"] if t == "string" else t for t in types]
+
+        program = ColumnProgram(column, types, required=required, unique=spec.get("unique", False))
+        numeric = any(t in _NUMERIC_TYPES for t in types)
+        dated = any(t in ("date", "date-time") for t in types)
+
+        if "enum" in spec:
+            allowed = spec["enum"]
+            if numeric:
+                program.checks.append(("enum", lambda raw, parsed, a=allowed: ~parsed.isin(a),
+                                       f"value not in {allowed}"))
+            else:
+                allowed_strings = [str(v) for v in allowed]
+                program.checks.append(("enum", lambda raw, parsed, a=allowed_strings: ~raw.isin(a),
+                                       f"value not in {allowed}"))
+
+        if "pattern" in spec:
+            pattern = re.compile(spec["pattern"])
+            program.checks.append(("pattern", lambda raw, parsed, p=pattern: ~_search(raw, p),
+                                   f"value does not match {spec['pattern']}"))
+
+        if "minLength" in spec:
+            program.checks.append(("minLength", lambda raw, parsed, n=spec["minLength"]: raw.str.len() < n,
+                                   f"shorter than {spec['minLength']}"))
+        if "maxLength" in spec:
+            program.checks.append(("maxLength", lambda raw, parsed, n=spec["maxLength"]: raw.str.len() > n,
+                                   f"longer than {spec['maxLength']}"))
+
+        # bounds compare parsed numbers (or dates)
+        if numeric or dated:
+            bounds = {
+                "minimum": lambda parsed, b: parsed < b,
+                "maximum": lambda parsed, b: parsed > b,
+                "exclusiveMinimum": lambda parsed, b: parsed <= b,
+                "exclusiveMaximum": lambda parsed, b: parsed >= b,
+            }
+            for keyword, compare in bounds.items():
+                if keyword in spec:
+                    bound = pd.Timestamp(spec[keyword]) if dated and not numeric else spec[keyword]
+                    program.checks.append((keyword, lambda raw, parsed, c=compare, b=bound: c(parsed, b),
+                                           f"{keyword} is {spec[keyword]}"))
+
+        return program
+
+
+class CSVSchemaChecker:
+    """
+    Validates CSV uploads against a JSON schema, streaming chunks from ClinicalDataIngestor
+    and writing row-level errors to a file as they are found
+    """
+
+    def __init__(self, schema, max_errors=1000, chunksize=100000, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.compiled = schema if isinstance(schema, CompiledSchema) else SchemaCompiler(self.logger).compile(schema)
+        self.max_errors = max_errors
+        self.chunksize = chunksize
+
+    def check(self, source, error_path=None, **read_kwargs):
+        """
+        Validate a file against the compiled schema
+
+        Args:
+            source: path to the upload or a ClinicalDataIngestor
+            error_path: CSV file for row-level errors (default: <upload>_errors.csv)
+            read_kwargs: passed to the chunked reader (skiprows, sep, ...)
+
+        Returns:
+            dictionary summary of the run
+        """
+        ingestor = source if isinstance(source, ClinicalDataIngestor) else ClinicalDataIngestor(source)
+        if error_path is None:
+            error_path = os.path.splitext(ingestor.data_path)[0] + "_errors.csv"
+
+        # read every cell as a string, the compiled programs do the typing
+        read_kwargs.setdefault("dtype", str)
+
+        state = self.compiled.new_state()
+        errors_by_column = {}
+        error_count = 0
+        rows_checked = 0
+        stopped_early = False
+        header_checked = False
+
+        with open(error_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(ERROR_FIELDS)
+
+            def count(column, rule, n):
+                nonlocal error_count
+                error_count += n
+                counts = errors_by_column.setdefault(column, {})
+                counts[rule] = counts.get(rule, 0) + n
+
+            for chunk in ingestor.iter_chunks(chunksize=self.chunksize, **read_kwargs):
+                if not header_checked:
+                    chunk.columns = [str(col).strip() for col in chunk.columns]
+                    columns = chunk.columns.tolist()
+                    for row in self.compiled.check_header(columns)[:self.max_errors]:
+                        writer.writerow(row)
+                        count(row[1], row[2], 1)
+                    header_checked = True
+                else:
+                    chunk.columns = columns
+
+                row_numbers = chunk.index.to_numpy() + 1
+                rows_checked += len(chunk)
+
+                for column, rule, message, positions in self.compiled.iter_chunk_errors(chunk, state):
+                    positions = positions[:self.max_errors - error_count]
+
+                    # only this check's errors are held in memory, then appended to the file
+                    errors = pd.DataFrame({
+                        "row": row_numbers[positions],
+                        "column": column,
+                        "rule": rule,
+                        "value": chunk[column].to_numpy()[positions],
+                        "message": message
+                    })
+                    errors.to_csv(f, header=False, index=False)
+                    count(column, rule, len(errors))
+
+                    if error_count >= self.max_errors:
+                        break
+
+                if error_count >= self.max_errors:
+                    stopped_early = True
+                    self.logger.warning(f"error cap of {self.max_errors} reached after {rows_checked} rows, stopping")
+                    break
+
+        summary = {
+            "schema": self.compiled.title,
+            "file": ingestor.data_path,
+            "valid": error_count == 0,
+            "rows_checked": rows_checked,
+            "error_count": error_count,
+            "errors_by_column": errors_by_column,
+            "stopped_early": stopped_early,
+            "error_file": error_path,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+        self.logger.info(f"checked {rows_checked} rows of {ingestor.data_path}: {error_count} errors")
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a CSV upload against a JSON schema")
+    parser.add_argument("schema", help="path to the JSON schema")
+    parser.add_argument("upload", help="path to the CSV upload")
+    parser.add_argument("--errors", help="path of the row-level error file")
+    parser.add_argument("--max-errors", type=int, default=1000)
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    checker = CSVSchemaChecker(args.schema, max_errors=args.max_errors, chunksize=args.chunksize)
+    summary = checker.check(args.upload, args.errors)
+    print(json.dumps(summary, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
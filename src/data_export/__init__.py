@@ -0,0 +1,5 @@
+
+# src/data_export/__init__.py
+
+
+from .exporter import PartitionedExporter
@@ -0,0 +1,405 @@
+# src/data_export/exporter.py
+
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.cache import file_fingerprint, read_frame, write_frame
+from src.data_ingestion.predicates import filter_mask, validate_filters
+
+# partitioned export of processed tables with a provenance manifest
+#
+# dataset layout (hive style directories, one file per partition):
+#   <root>/manifest.json
+#   <root>/source=patient/part.parquet
+#   <root>/source=patient/visit_year=2020/part.parquet
+#   <root>/source=patient/apoe_status=E3%2FE4/part.parquet   (keys and values percent-encoded)
+#   <root>/source=large/part-<run>-00000.parquet, ...         (export_parts, one file per staged part)
+#
+# the manifest records every partition (rows, columns, content hash) and, per source,
+# the standardization_info / validation_results of the run that produced it.
+# exports only rewrite partitions whose content hash changed
+
+MANIFEST = "manifest.json"
+
+
+def _jsonable(value):
+    """Convert numpy / pandas values in results dictionaries to plain json types"""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _content_hash(frame):
+    """Hash of a partition's values, index and column names"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(json.dumps([str(c) for c in frame.columns]).encode())
+    return digest.hexdigest()
+
+
+def _partition_path(values):
+    """Relative directory of a partition, ex. source=patient/visit_year=2020"""
+    # "/" or "=" inside a value would nest directories or break the key=value split
+    return "/".join(f"{quote(str(key), safe='')}={quote(str(value), safe='')}" for key, value in values.items())
+
+
+def _typed(values, value):
+    """
+    Partition values (stored as strings) and a filter value converted to the filter's type,
+    so numbers and dates compare as numbers and dates instead of text ("9" > "10")
+    """
+    sample = next(iter(value), None) if isinstance(value, (list, tuple, set)) else value
+    if isinstance(sample, (bool, np.bool_)) or sample is None:
+        convert, cast = (lambda v: v), str
+    elif isinstance(sample, (int, float, np.number)):
+        convert, cast = (lambda v: pd.to_numeric(v, errors="coerce")), (lambda x: x)
+    elif isinstance(sample, (pd.Timestamp, datetime, date, np.datetime64)):
+        convert, cast = (lambda v: pd.to_datetime(v, errors="coerce", format="mixed")), pd.Timestamp
+    else:
+        convert, cast = (lambda v: v), str
+
+    if isinstance(value, (list, tuple, set)):
+        return convert(values), [cast(x) for x in value]
+    return convert(values), cast(value)
+
+
+def _restore(values, dtype):
+    """Partition key column (directory strings) cast back to the dtype it was exported with"""
+    values = values.where(values != "__null__")
+    if pd.api.types.is_bool_dtype(dtype):
+        return values.map({"True": True, "False": False})
+    if pd.api.types.is_numeric_dtype(dtype):
+        values = pd.to_numeric(values, errors="coerce")
+        # integers with a null partition stay float
+        return values.astype(dtype) if values.notna().all() else values
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return pd.to_datetime(values, errors="coerce", format="mixed")
+    return values
+
+
+def _entry_files(entry):
+    """Files of a partition, several when it was exported from staged parts"""
+    return entry["files"] if "files" in entry else [entry["file"]]
+
+
+class PartitionedExporter:
+    """
+    Writes standardized tables to a partitioned columnar dataset and reads them back
+    """
+
+    def __init__(self, root, logger=None):
+        self.root = root
+        self.logger = logger or logging.getLogger(__name__)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {"partitions": {}, "sources": {}}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    # writing
+
+    def export(self, frame, source, partition_cols=None, standardization_info=None,
+               validation_results=None, source_path=None):
+        """
+        Export one source's processed table, replacing only partitions that changed
+
+        Args:
+            frame: standardized DataFrame
+            source: name of the source (ex. the input file name), first partition level
+            partition_cols: further partition columns (ex. a date or year column)
+            standardization_info: DataStandardizer.standardization_info of the run
+            validation_results: DataValidator.validation_results of the run
+            source_path: input file, its fingerprint is recorded for provenance
+
+        Returns:
+            dict with written, unchanged and removed partition paths
+        """
+        partition_cols = list(partition_cols or [])
+        missing = [c for c in partition_cols if c not in frame.columns]
+        if missing:
+            raise KeyError(f"Partition columns not found: {missing}")
+
+        source = str(source)
+        summary = {"written": [], "unchanged": [], "removed": []}
+        seen = set()
+        partition_dtypes = {c: str(frame[c].dtype) for c in partition_cols}
+
+        if partition_cols:
+            groups = frame.groupby(partition_cols, sort=True, dropna=False)
+        else:
+            groups = [((), frame)]
+
+        for key, part in groups:
+            key = key if isinstance(key, tuple) else (key,)
+            values = {"source": source}
+            values.update({c: ("__null__" if pd.isna(v) else v) for c, v in zip(partition_cols, key)})
+            relative = _partition_path(values)
+            seen.add(relative)
+
+            data = part.drop(columns=partition_cols)
+            content_hash = _content_hash(data)
+
+            entry = self.manifest["partitions"].get(relative)
+            if entry and entry["content_hash"] == content_hash and os.path.exists(os.path.join(self.root, entry["file"])):
+                summary["unchanged"].append(relative)
+                continue
+
+            directory = os.path.join(self.root, relative)
+            os.makedirs(directory, exist_ok=True)
+            written = write_frame(data, os.path.join(directory, "part"))
+            if entry:
+                for f in _entry_files(entry):
+                    if os.path.join(self.root, f) != written:
+                        self._remove_file(f)
+
+            self.manifest["partitions"][relative] = {
+                "file": os.path.relpath(written, self.root),
+                "source": source,
+                "values": {k: str(v) for k, v in values.items()},
+                "rows": len(data),
+                "columns": [str(c) for c in data.columns],
+                "content_hash": content_hash,
+                "written_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            summary["written"].append(relative)
+
+        # partitions of this source that are not in the new drop
+        for relative, entry in list(self.manifest["partitions"].items()):
+            if entry["source"] == source and relative not in seen:
+                for f in _entry_files(entry):
+                    self._remove_file(f)
+                del self.manifest["partitions"][relative]
+                summary["removed"].append(relative)
+
+        self.manifest["sources"][source] = {
+            "partition_cols": partition_cols,
+            "partition_dtypes": partition_dtypes,
+            "input": file_fingerprint(source_path) if source_path else None,
+            "standardization_info": _jsonable(standardization_info or {}),
+            "validation_results": _jsonable(validation_results or {}),
+            "exported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._save_manifest()
+
+        self.logger.info(f"exported {source}: {len(summary['written'])} partitions written, "
+                         f"{len(summary['unchanged'])} unchanged, {len(summary['removed'])} removed")
+        return summary
+
+    def export_parts(self, parts, source, partition_cols=None, standardization_info=None,
+                     validation_results=None, source_path=None):
+        """
+        Export one source staged as parquet parts (MemoryGovernor chunked runs) one part at a time
+
+        Every part is split on the partition columns and written as its own file inside the
+        partition directories, so the whole table is never in memory. A partition whose
+        combined content hash did not change keeps its old files.
+
+        Args:
+            parts: paths of the staged parts, in row order
+            source: name of the source, first partition level
+            partition_cols, standardization_info, validation_results, source_path: as in export()
+
+        Returns:
+            dict with written, unchanged and removed partition paths
+        """
+        partition_cols = list(partition_cols or [])
+        source = str(source)
+        summary = {"written": [], "unchanged": [], "removed": []}
+        # new files get a run token, the old files stay valid until the manifest is saved
+        token = f"{time.time_ns():x}"
+        written = {}
+        partition_dtypes = {}
+
+        for number, part_path in enumerate(parts):
+            frame = read_frame(part_path)
+            missing = [c for c in partition_cols if c not in frame.columns]
+            if missing:
+                raise KeyError(f"Partition columns not found: {missing}")
+            if not partition_dtypes:
+                partition_dtypes = {c: str(frame[c].dtype) for c in partition_cols}
+
+            groups = frame.groupby(partition_cols, sort=True, dropna=False) if partition_cols else [((), frame)]
+            for key, part in groups:
+                key = key if isinstance(key, tuple) else (key,)
+                values = {"source": source}
+                values.update({c: ("__null__" if pd.isna(v) else v) for c, v in zip(partition_cols, key)})
+                relative = _partition_path(values)
+
+                data = part.drop(columns=partition_cols)
+                directory = os.path.join(self.root, relative)
+                os.makedirs(directory, exist_ok=True)
+                path = write_frame(data, os.path.join(directory, f"part-{token}-{number:05d}"))
+
+                entry = written.setdefault(relative, {"values": values, "files": [], "rows": 0,
+                                                      "columns": [], "hashes": []})
+                entry["files"].append(os.path.relpath(path, self.root))
+                entry["rows"] += len(data)
+                entry["columns"].extend(str(c) for c in data.columns if str(c) not in entry["columns"])
+                entry["hashes"].append(_content_hash(data))
+
+        for relative, new in written.items():
+            content_hash = hashlib.sha1("".join(new["hashes"]).encode()).hexdigest()
+            entry = self.manifest["partitions"].get(relative)
+            if entry and entry["content_hash"] == content_hash and \
+                    all(os.path.exists(os.path.join(self.root, f)) for f in _entry_files(entry)):
+                for f in new["files"]:
+                    self._remove_file(f)
+                summary["unchanged"].append(relative)
+                continue
+
+            if entry:
+                for f in _entry_files(entry):
+                    self._remove_file(f)
+            self.manifest["partitions"][relative] = {
+                "files": new["files"],
+                "source": source,
+                "values": {k: str(v) for k, v in new["values"].items()},
+                "rows": new["rows"],
+                "columns": new["columns"],
+                "content_hash": content_hash,
+                "written_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            summary["written"].append(relative)
+
+        for relative, entry in list(self.manifest["partitions"].items()):
+            if entry["source"] == source and relative not in written:
+                for f in _entry_files(entry):
+                    self._remove_file(f)
+                del self.manifest["partitions"][relative]
+                summary["removed"].append(relative)
+
+        self.manifest["sources"][source] = {
+            "partition_cols": partition_cols,
+            "partition_dtypes": partition_dtypes,
+            "input": file_fingerprint(source_path) if source_path else None,
+            "standardization_info": _jsonable(standardization_info or {}),
+            "validation_results": _jsonable(validation_results or {}),
+            "exported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._save_manifest()
+
+        self.logger.info(f"exported {source} from {len(parts)} parts: {len(summary['written'])} partitions written, "
+                         f"{len(summary['unchanged'])} unchanged, {len(summary['removed'])} removed")
+        return summary
+
+    def _remove_file(self, relative_file):
+        """Delete a partition file and the directories it leaves empty"""
+        path = os.path.join(self.root, relative_file)
+        if os.path.exists(path):
+            os.remove(path)
+
+        # nested partitions share parent directories, only empty ones go
+        directory = os.path.dirname(path)
+        while os.path.abspath(directory) != os.path.abspath(self.root) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    # reading
+
+    def partitions(self, filters=None):
+        """
+        Partitions whose directory values can satisfy the filters (partition pruning)
+
+        Args:
+            filters: list of (column, op, value), only filters on partition keys prune
+                (partition values are compared as the type of the filter value)
+
+        Returns:
+            list of manifest entries
+        """
+        filters = validate_filters(filters)
+        entries = list(self.manifest["partitions"].values())
+        if not entries:
+            return []
+
+        keys = pd.DataFrame([e["values"] for e in entries])
+        # directory values are strings, each filter compares them converted to its value's type
+        typed = pd.DataFrame(index=keys.index)
+        prune = []
+        for c, op, v in filters:
+            if c in keys.columns:
+                column = len(prune)
+                typed[column], v = _typed(keys[c], v)
+                prune.append((column, op, v))
+        if not prune:
+            return entries
+
+        mask = filter_mask(typed, prune)
+        return [e for e, keep in zip(entries, mask) if keep]
+
+    def read(self, columns=None, filters=None, sources=None):
+        """
+        Read the dataset back, opening only partitions that match the filters
+
+        Args:
+            columns: data columns to read (partition keys are always added)
+            filters: list of (column, op, value) on partition keys and/or data columns
+            sources: only these sources
+
+        Returns:
+            DataFrame with the partition keys as columns
+        """
+        filters = validate_filters(filters)
+        entries = self.partitions(filters)
+        if sources is not None:
+            entries = [e for e in entries if e["source"] in set(sources)]
+
+        frames = []
+        dtypes = {}
+        for entry in entries:
+            keys = entry["values"]
+            data_filters = [f for f in filters if f[0] not in keys]
+            # a filter column this partition does not have is missing in every row of it
+            absent = [f for f in data_filters if f[0] not in entry["columns"]]
+            present = [f for f in data_filters if f[0] in entry["columns"]]
+            wanted = None if columns is None else [c for c in columns if c not in keys and c in entry["columns"]]
+
+            part = pd.concat([read_frame(os.path.join(self.root, f), columns=wanted, filters=present)
+                              for f in _entry_files(entry)])
+            if absent:
+                missing = pd.DataFrame({c: np.nan for c, _, _ in absent}, index=part.index)
+                part = part[filter_mask(missing, absent)]
+            for key, value in keys.items():
+                part[key] = value
+            frames.append(part)
+            dtypes.update(self.manifest["sources"].get(entry["source"], {}).get("partition_dtypes", {}))
+
+        self.logger.info(f"read {len(frames)} of {len(self.manifest['partitions'])} partitions")
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        data = pd.concat(frames)
+        # directory values are strings, keys go back to the dtype they were exported with
+        for key, dtype in dtypes.items():
+            if key in data.columns:
+                data[key] = _restore(data[key], dtype)
+        return data
+
+    def provenance(self, source):
+        """Provenance recorded for a source (standardization and validation results)"""
+        return self.manifest["sources"].get(str(source))
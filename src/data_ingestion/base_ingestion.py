@@ -1,15 +1,119 @@
 
 
 from abc import ABC, abstractmethod
+from datetime import datetime
+import csv
+import mmap
 import os
+import re
 import logging
 
-# configure logging (time, log name, log level, message)
+import numpy as np
+
+# logging is configured by the entry points (dashboard, cli, tests), not on import,
+# so library users keep control of their own handlers
+
+# byte scan settings for the fast metadata path
+
+_SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+_SCAN_FORMATS = {'csv': ',', 'tsv': '\t'}
+_SCAN_EXTENSIONS = {'csv': 'csv', 'tsv': 'tsv', 'txt': 'tsv'}
+
+# same tokens pandas treats as missing by default
+
+_NA_TOKENS = {'', 'na', 'n/a', 'nan', 'null', 'none', '#n/a', '<na>', '-nan', '1.#qnan', '-1.#ind'}
+_INT_PATTERN = re.compile(r'^[+-]?\d+$')
+_BOOL_TOKENS = {'true', 'false'}
+_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$')
+
+
+def _count_records(path, quotechar='"'):
+    """
+    Count newline-terminated records in a file without decoding it.
+
+    The file is memory-mapped and scanned block by block. Blocks without any
+    quote characters are counted with a plain byte count, blocks with quotes
+    only count newlines that sit outside a quoted field (an even number of
+    quotes before them), so embedded newlines in quoted values are not
+    counted as new records.
+
+    Args:
+        path: path to a delimited text file
+        quotechar: quote character used by the file
+
+    Returns:
+        int: number of records, including any header lines
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+
+    quote = ord(quotechar)
+    quote_byte = quotechar.encode()
+    records = 0
+    in_quotes = False
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, size, _SCAN_BLOCK_SIZE):
+            block = mm[start:start + _SCAN_BLOCK_SIZE]
+
+            if not in_quotes and block.find(quote_byte) == -1:
+                records += block.count(b'\n')
+                continue
+
+            buf = np.frombuffer(block, dtype=np.uint8)
+            quote_positions = np.flatnonzero(buf == quote)
+            newline_positions = np.flatnonzero(buf == 10)
+
+            # quotes seen before each newline decide if it is inside a field
+            quotes_before = np.searchsorted(quote_positions, newline_positions) + int(in_quotes)
+            records += int(np.count_nonzero((quotes_before & 1) == 0))
+            in_quotes = bool((len(quote_positions) + int(in_quotes)) & 1)
+
+        last_byte = mm[size - 1:size]
+
+    # last record without a trailing newline still counts
+    if last_byte != b'\n':
+        records += 1
+
+    return records
+
+
+def _estimate_dtype(values):
+    """
+    Estimate the pandas dtype of a column from a sample of raw string values.
+
+    Args:
+        values: list of raw cell strings from the head of the file
+
+    Returns:
+        str: estimated dtype name (int64, float64, bool, datetime64[ns] or object)
+    """
+    present = [v.strip() for v in values if v.strip().lower() not in _NA_TOKENS]
+    has_missing = len(present) < len(values)
+
+    # all missing columns come back as float64 from pandas
+    if not present:
+        return 'float64'
+
+    if all(_INT_PATTERN.match(v) for v in present):
+        return 'float64' if has_missing else 'int64'
+
+    try:
+        for v in present:
+            float(v)
+        return 'float64'
+    except ValueError:
+        pass
+
+    if not has_missing and all(v.lower() in _BOOL_TOKENS for v in present):
+        return 'bool'
+
+    if all(_DATE_PATTERN.match(v) for v in present):
+        return 'datetime64[ns]'
+
+    return 'object'
 
-logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
 # define class and inherit form ABC
 # template for other ingestion classes to follow
@@ -70,13 +174,73 @@ class DataIngestionBase(ABC):
         """
         pass
 
+    # fast metadata path, reads only the header and a head sample and counts rows from raw bytes
 
+    def scan_metadata(self, sample_rows=100, skiprows=0, delimiter=None, encoding='utf-8-sig'):
+        """
+        Extract metadata from a delimited text file without building a DataFrame.
 
+        Only the header and the first sample_rows records are parsed, the row
+        count comes from a memory-mapped newline scan that skips newlines
+        inside quoted fields. Data types are estimated from the head sample.
 
+        Args:
+            sample_rows: number of records after the header used for dtype estimation
+            skiprows: number of lines to skip before the header row
+            delimiter: field delimiter (inferred from the file format if None)
+            encoding: text encoding of the header and sample
 
-
-
-
-
-
-        
+        Returns:
+            dict: Metadata dictionary
+        """
+        if not os.path.isfile(self.data_path):
+            raise ValueError(f"fast metadata scan needs a file, got: {self.data_path}")
+
+        file_format = getattr(self, 'file_format', None)
+        if file_format is None:
+            extension = self.data_path.split('.')[-1].lower()
+            file_format = _SCAN_EXTENSIONS.get(extension, 'csv')
+
+        if file_format not in _SCAN_FORMATS:
+            raise ValueError(f"fast metadata scan only supports delimited text, got: {file_format}")
+
+        delimiter = delimiter or _SCAN_FORMATS[file_format]
+
+        # parse the header and a head sample with the csv module (handles quoting)
+
+        sample = []
+        with open(self.data_path, 'r', encoding=encoding, newline='') as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            for _ in range(skiprows):
+                next(reader, None)
+            header = next(reader, [])
+            for row in reader:
+                if len(sample) >= sample_rows:
+                    break
+                if row:
+                    sample.append(row)
+
+        columns = [col.strip() for col in header]
+        data_types = {}
+        for i, col in enumerate(columns):
+            data_types[col] = _estimate_dtype([row[i] if i < len(row) else '' for row in sample])
+
+        num_rows = max(_count_records(self.data_path) - skiprows - 1, 0)
+
+        metadata = {
+            "file_format": file_format,
+            "file_size_bytes": os.path.getsize(self.data_path),
+            "num_subjects": num_rows,
+            "num_features": len(columns),
+            "column_names": columns,
+            "data_types": data_types,
+            "dtype_sample_rows": len(sample),
+            "processing_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+        possible_id_cols = [col for col in columns if 'id' in col.lower() or 'subject' in col.lower()]
+        if possible_id_cols:
+            metadata["possible_id_columns"] = possible_id_cols
+
+        self.logger.info(f"scanned metadata for {self.data_path}: {num_rows} rows, {len(columns)} columns")
+        return metadata
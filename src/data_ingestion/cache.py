@@ -0,0 +1,141 @@
+# src/data_ingestion/cache.py
+
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+from .predicates import validate_filters, read_columns, select
+
+# on-disk cache of parsed tables, so a source file is only parsed once
+# tables are stored as parquet (columnar) when pyarrow is available, pickle otherwise
+
+DEFAULT_CACHE_DIR = os.environ.get("AD_PIPELINE_CACHE_DIR", os.path.join("data", "cache"))
+
+
+def write_frame(frame, path_without_ext, index=None):
+    """
+    Write a DataFrame as parquet, falling back to pickle
+
+    Args:
+        frame: DataFrame to store
+        path_without_ext: target path, the extension is chosen by the format used
+        index: True stores the index as a column even when it is a plain range, so
+            filtered reads keep the original row labels (pickle always keeps them)
+
+    Returns:
+        str: path of the written file
+    """
+    try:
+        path = path_without_ext + ".parquet"
+        frame.to_parquet(path + ".tmp", index=index)
+    except Exception as e:
+        # missing pyarrow or mixed-type object columns, keep the table in pickle form
+        logging.getLogger(__name__).debug(f"parquet write failed ({e}), using pickle")
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+        path = path_without_ext + ".pkl"
+        frame.to_pickle(path + ".tmp")
+
+    # rename so readers never see a half written file
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_frame(path, columns=None, filters=None):
+    """
+    Read a table written by write_frame
+
+    Args:
+        path: parquet or pickle path
+        columns: only read these columns (parquet reads just their bytes)
+        filters: row filters, list of (column, op, value) (parquet skips row groups
+            whose statistics rule them out)
+
+    Returns:
+        DataFrame
+    """
+    filters = validate_filters(filters)
+
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path, columns=read_columns(columns, filters), filters=filters or None)
+        return select(frame, columns)
+
+    return select(pd.read_pickle(path), columns, filters)
+
+
+def file_fingerprint(path):
+    """Cheap identity of a file's contents (absolute path, size and modification time)"""
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_name(path):
+    """Cache entry name of a source file, its name and a hash of its absolute path (same-named files differ)"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]}"
+
+
+class IngestionCache:
+    """
+    Cache of parsed tables keyed by the source file fingerprint and the read options
+    """
+
+    def __init__(self, cache_dir=None, logger=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.logger = logger or logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, data_path, **options):
+        """
+        Cache key for a source file and the options it was parsed with
+
+        Args:
+            data_path: source file path
+            options: read options that change the parsed result (sheet, range, ...)
+
+        Returns:
+            str: hex digest
+        """
+        identity = {"source": file_fingerprint(data_path), "options": options}
+        payload = json.dumps(identity, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _find(self, key):
+        for ext in (".parquet", ".pkl"):
+            path = os.path.join(self.cache_dir, key + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, key, columns=None, filters=None):
+        """
+        Look up a cached table, optionally reading only some columns and rows
+
+        Returns:
+            DataFrame or None when the key is not cached
+        """
+        path = self._find(key)
+        if path is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.logger.info(f"ingestion cache hit: {path}")
+        return read_frame(path, columns=columns, filters=filters)
+
+    def put(self, key, frame):
+        """
+        Store a parsed table
+
+        Returns:
+            str: path of the cached file
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # filtered hits return the row labels a filtered parse would have
+        path = write_frame(frame, os.path.join(self.cache_dir, key), index=True)
+        self.logger.info(f"cached parsed table: {path}")
+        return path
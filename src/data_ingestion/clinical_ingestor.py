@@ -5,10 +5,25 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from .base_ingestion import DataIngestionBase
+from .sampling import reservoir_sample, proportion_interval
+from .cache import IngestionCache
+from .excel_reader import iter_excel_batches, read_excel_fast, scan_excel_metadata
+from .predicates import validate_filters, read_columns, select
 
 # pandas for tabular, numpy for operations, datetime for timestamp
 # base class!
 
+# arguments the streaming excel reader understands, anything else goes to pd.read_excel
+
+_EXCEL_FAST_ARGS = {'sheet_name', 'cell_range', 'batch_size'}
+_EXCEL_STREAM_ARGS = {'sheet_name', 'cell_range'}
+
+def _concat(chunks):
+    if not chunks:
+        return pd.DataFrame()
+    # a single chunk keeps its columns and dtypes even when every row was filtered out
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
 # inherits from abstract base class
 
 class ClinicalDataIngestor(DataIngestionBase):
@@ -22,12 +37,24 @@ class ClinicalDataIngestor(DataIngestionBase):
     # init self.data as None (lazy loading)
     # logs the format being used
 
-    def __init__(self, data_path, file_format=None):
+    def __init__(self, data_path, file_format=None, cache=None):
         super().__init__(data_path)
         self.file_format = file_format or self._infer_format(data_path)
         self.data = None
+        self.cache = cache
         self.logger.info(f"Initialized clinical data ingestor with format: {self.file_format}")
 
+    # excel engines and the cache are only set up when first needed
+
+    def _get_cache(self):
+        if self.cache is None:
+            self.cache = IngestionCache(logger=self.logger)
+        return self.cache
+
+    def _is_streamable_excel(self):
+        # openpyxl read-only mode handles the xml based formats, .xls still goes through pandas
+        return self.data_path.lower().endswith(('.xlsx', '.xlsm'))
+
     def _infer_format(self,data_path):
         extension = data_path.split('.')[-1].lower()
         format_map ={
@@ -46,27 +73,210 @@ class ClinicalDataIngestor(DataIngestionBase):
         return file_format
         
 
-    def load_data(self, **kwargs):
+    def load_data(self, columns=None, filters=None, use_cache=None, chunksize=100000, **kwargs):
+        """
+        Load the clinical data
+
+        args:
+            columns (list, optional): only these columns, projection is passed down to the parser
+            filters (list, optional): row filters as (column, op, value) tuples, ex.
+                [("gender", "==", "female")], applied chunk by chunk while reading
+            use_cache (bool, optional): parse the file once into the columnar ingestion cache and
+                read columns/rows from there (default: on for streamed excel, off for text)
+            chunksize (int): rows per chunk when filtering
+            kwargs: passed to the pandas reader (skiprows, header, ...)
+
+        returns:
+            pandas.DataFrame
+        """
         self.logger.info(f"Loading clinical data from {self.data_path}")
+        filters = validate_filters(filters)
 
         try:
-            if self.file_format == 'csv':
-                self.data = pd.read_csv(self.data_path, **kwargs)
-            elif self.file_format == 'excel':
-                self.data = pd.read_excel(self.data_path, **kwargs)
-            elif self.file_format == 'tsv':
-                self.data = pd.read_csv(self.data_path, **kwargs)
+            if self.file_format == 'excel' and self._is_streamable_excel() and set(kwargs) <= _EXCEL_FAST_ARGS:
+                if use_cache is not None:
+                    kwargs['use_cache'] = use_cache
+                self.data = self.load_excel(columns=columns, filters=filters, **kwargs)
+            elif use_cache:
+                self.data = self._load_cached(columns, filters, **kwargs)
+            elif filters:
+                chunks = self.iter_chunks(chunksize=chunksize, columns=read_columns(columns, filters), **kwargs)
+                self.data = _concat([select(chunk, columns, filters) for chunk in chunks])
             else:
-                raise ValueError(f"unsupported file format: {self.file_format}")
+                self.data = self._read(columns, **kwargs)
 
-            self.logger.info(f"succesfully loaded data with shape: self.data.shape")
+            self.logger.info(f"succesfully loaded data with shape: {self.data.shape}")
             return self.data
 
         except Exception as e:
             self.logger.error(f"error loading clinical data: {str(e)}")
             raise
 
-    def get_metadata(self):
+    def _read(self, columns=None, **kwargs):
+        """
+        Read the whole file with the pandas reader for its format
+        """
+        if columns is not None:
+            kwargs['usecols'] = columns
+
+        if self.file_format == 'csv':
+            data = pd.read_csv(self.data_path, **kwargs)
+        elif self.file_format == 'excel':
+            data = pd.read_excel(self.data_path, **kwargs)
+        elif self.file_format == 'tsv':
+            data = pd.read_csv(self.data_path, sep=kwargs.pop('sep', '\t'), **kwargs)
+        else:
+            raise ValueError(f"unsupported file format: {self.file_format}")
+
+        # usecols keeps file order, return the requested order
+        return data if columns is None else data[list(columns)]
+
+    def _load_cached(self, columns, filters, **kwargs):
+        """
+        Projection and filters served from the columnar cache, the file is parsed on a miss
+        """
+        cache = self._get_cache()
+        key = cache.key(self.data_path, reader=self.file_format, **kwargs)
+
+        data = cache.get(key, columns=columns, filters=filters)
+        if data is None:
+            full = self._read(**kwargs)
+            cache.put(key, full)
+            data = select(full, columns, filters)
+
+        return data
+
+    # excel fast path, streams the sheet in read-only mode and caches the parsed table
+
+    def load_excel(self, sheet_name=None, cell_range=None, header=True, batch_size=10000, use_cache=True,
+                   columns=None, filters=None):
+        """
+        Load an excel worksheet through the streaming reader
+
+        args:
+            sheet_name (str or int, optional): worksheet name or index, active sheet if None
+            cell_range (str, optional): cell range to read, ex. "A1:F1000"
+            header (bool): first row of the range holds the column names
+            batch_size (int): rows converted per batch
+            use_cache (bool): read from / write to the ingestion cache
+            columns (list, optional): only return these columns
+            filters (list, optional): row filters as (column, op, value) tuples
+
+        returns:
+            pandas.DataFrame: the worksheet with typed columns
+        """
+        options = {"reader": "excel_stream", "sheet_name": sheet_name, "cell_range": cell_range, "header": header}
+
+        if use_cache:
+            cache = self._get_cache()
+            key = cache.key(self.data_path, **options)
+            cached = cache.get(key, columns=columns, filters=filters)
+            if cached is not None:
+                self.data = cached
+                return self.data
+
+        self.logger.info(f"Streaming excel sheet {sheet_name or '(active)'} from {self.data_path}")
+
+        # the cache keeps the whole sheet, without it only the needed columns are converted
+        needed = None if use_cache else read_columns(columns, filters)
+        data = read_excel_fast(self.data_path, sheet_name, cell_range, header, batch_size, columns=needed)
+
+        if use_cache:
+            cache.put(key, data)
+
+        self.data = select(data, columns, filters)
+        return self.data
+
+    # stream the file in row chunks instead of loading it all at once
+
+    def iter_chunks(self, chunksize=100000, columns=None, **kwargs):
+        """
+        Stream the clinical data as a sequence of DataFrame chunks
+
+        args:
+            chunksize (int): number of rows per chunk
+            columns (list, optional): only parse these columns
+            kwargs: passed to the pandas reader (skiprows, header, ...)
+
+        yields:
+            pandas.DataFrame: consecutive row chunks, index continues across chunks
+        """
+        self.logger.info(f"Streaming clinical data from {self.data_path} in chunks of {chunksize}")
+
+        if self.file_format in ('csv', 'tsv'):
+            if self.file_format == 'tsv':
+                kwargs.setdefault('sep', '\t')
+            if columns is not None:
+                kwargs['usecols'] = columns
+            with pd.read_csv(self.data_path, chunksize=chunksize, **kwargs) as reader:
+                for chunk in reader:
+                    yield chunk if columns is None else chunk[list(columns)]
+        elif self.file_format == 'excel' and self._is_streamable_excel() and set(kwargs) <= _EXCEL_STREAM_ARGS:
+            start = 0
+            for names, arrays in iter_excel_batches(self.data_path, batch_size=chunksize, columns=columns, **kwargs):
+                chunk = pd.DataFrame(dict(zip(names, arrays)))
+                chunk.index = chunk.index + start
+                start += len(chunk)
+                yield chunk
+        elif self.file_format == 'excel':
+            frame = self._read(columns, **kwargs)
+            for start in range(0, len(frame), chunksize):
+                yield frame.iloc[start:start + chunksize]
+        else:
+            raise ValueError(f"unsupported file format: {self.file_format}")
+
+    # reservoir sample of rows, memory and downstream cost depend on sample_size only
+
+    def sample_rows(self, sample_size=10000, chunksize=100000, seed=None, **kwargs):
+        """
+        Draw a uniform random sample of rows while streaming the file (reservoir sampling)
+
+        args:
+            sample_size (int): number of rows to keep
+            chunksize (int): rows read per chunk while streaming
+            seed (int, optional): random seed for reproducible samples
+            kwargs: passed to the pandas reader
+
+        returns:
+            tuple: (pandas.DataFrame sample indexed by original row number, total row count)
+        """
+        chunks = self.iter_chunks(chunksize=chunksize, **kwargs)
+        sample, total_rows = reservoir_sample(chunks, sample_size, seed=seed)
+
+        self.logger.info(f"sampled {len(sample)} of {total_rows} rows from {self.data_path}")
+        return sample, total_rows
+
+    def get_metadata(self, fast=False, approximate=False, sample_size=10000, confidence=0.95,
+                     seed=None, **kwargs):
+        """
+        Extract metadata from the clinical data
+
+        args:
+            fast (bool): use the header/byte scan path instead of loading the table
+                (delimited text and xlsx, .xls falls back to a full load)
+            approximate (bool): profile a reservoir sample instead of the full table,
+                missing values are estimates with confidence intervals
+            sample_size (int): rows kept in the sample for approximate mode
+            confidence (float): confidence level of the reported intervals
+            seed (int, optional): random seed for the sample
+            kwargs: passed to scan_metadata (fast) or the chunked reader (approximate)
+
+        returns:
+            dict: metadata dictionary
+        """
+        if fast and self.data is None and self.file_format in ('csv', 'tsv'):
+            metadata = {"data_type": "clinical"}
+            metadata.update(self.scan_metadata(**kwargs))
+            return metadata
+
+        if fast and self.data is None and self.file_format == 'excel' and self._is_streamable_excel():
+            metadata = {"data_type": "clinical"}
+            metadata.update(scan_excel_metadata(self.data_path, **kwargs))
+            return metadata
+
+        if approximate and self.data is None:
+            return self._approximate_metadata(sample_size, confidence, seed, **kwargs)
+
         if self.data is None:
             self.load_data()
 
@@ -90,6 +300,43 @@ class ClinicalDataIngestor(DataIngestionBase):
 
         return metadata
 
+    def _approximate_metadata(self, sample_size, confidence, seed, **kwargs):
+        """
+        Metadata estimated from a reservoir sample, cost is bound by sample_size
+        """
+        sample, total_rows = self.sample_rows(sample_size, seed=seed, **kwargs)
+        n = len(sample)
+
+        missing_counts = sample.isna().sum()
+        missing_values = {}
+        missing_intervals = {}
+        for col in sample.columns:
+            low, high = proportion_interval(int(missing_counts[col]), n, confidence, total_rows)
+            rate = missing_counts[col] / n if n else 0.0
+            missing_values[col] = int(round(rate * total_rows))
+            missing_intervals[col] = (int(low * total_rows), int(np.ceil(high * total_rows)))
+
+        metadata = {
+                "data_type": "clinical",
+                "file_format": self.file_format,
+                "num_subjects": total_rows,
+                "num_features": sample.shape[1],
+                "column_names": sample.columns.tolist(),
+                "data_types": {col: str(dtype) for col, dtype in sample.dtypes.items()},
+                "missing_values": missing_values,
+                "missing_value_intervals": missing_intervals,
+                "approximate": True,
+                "sample_size": n,
+                "confidence": confidence,
+                "processing_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+
+        possible_id_cols = [col for col in sample.columns if 'id' in col.lower() or 'subject' in col.lower()]
+        if possible_id_cols:
+            metadata["possible_id_columns"] = possible_id_cols
+
+        return metadata
+
     # data transformation example (birthdate to age)
 
     def calculate_age(self, birth_date_col, reference_date=None):
@@ -0,0 +1,190 @@
+# src/data_ingestion/excel_reader.py
+
+import os
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+# streaming excel reader, walks a worksheet in read-only mode one row batch at a time
+# and builds typed numpy columns directly instead of going through pd.read_excel
+
+
+def _typed_column(values):
+    """
+    Convert one batch of cell values to a typed numpy array
+
+    Args:
+        values: tuple of python cell values (None for empty cells)
+
+    Returns:
+        numpy array (int64, float64, bool, datetime64[ns] or object)
+    """
+    kinds = {type(v) for v in values if v is not None}
+    has_missing = any(v is None for v in values)
+
+    if not kinds:
+        return np.full(len(values), np.nan)
+
+    if kinds <= {int} and not has_missing:
+        return np.array(values, dtype=np.int64)
+
+    if kinds <= {int, float}:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    if kinds == {bool} and not has_missing:
+        return np.array(values, dtype=bool)
+
+    if kinds <= {datetime, date}:
+        return np.array([np.datetime64('NaT') if v is None else np.datetime64(v, 'ns') for v in values],
+                        dtype='datetime64[ns]')
+
+    # strings, times and mixed cells stay as objects
+    return np.array([np.nan if v is None else v for v in values], dtype=object)
+
+
+def _concat_columns(parts):
+    """Join per-batch arrays of one column, promoting to object when the kinds disagree"""
+    if len(parts) == 1:
+        return parts[0]
+    try:
+        return np.concatenate(parts)
+    except (TypeError, ValueError):
+        return np.concatenate([p.astype(object) for p in parts])
+
+
+def iter_excel_batches(data_path, sheet_name=None, cell_range=None, header=True, batch_size=10000, columns=None):
+    """
+    Stream a worksheet as typed column batches
+
+    Args:
+        data_path: path to an .xlsx/.xlsm workbook
+        sheet_name: worksheet name or 0-based index (active sheet if None)
+        cell_range: restrict to a cell range like "A1:F1000" or "B:D"
+        header: use the first row of the range as column names
+        batch_size: number of rows per batch
+        columns: only convert these columns (names with a header, positions without)
+
+    Yields:
+        tuple: (list of column names, list of typed numpy arrays)
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.cell import range_boundaries
+
+    workbook = load_workbook(data_path, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            sheet = workbook.active
+        elif isinstance(sheet_name, int):
+            sheet = workbook.worksheets[sheet_name]
+        else:
+            sheet = workbook[sheet_name]
+
+        bounds = {}
+        if cell_range:
+            min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+            bounds = {"min_col": min_col, "min_row": min_row, "max_col": max_col, "max_row": max_row}
+
+        rows = sheet.iter_rows(values_only=True, **bounds)
+
+        names = None
+        if header:
+            first = next(rows, None)
+            if first is None:
+                return
+            names = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(first)]
+
+        positions = None
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                names = names or list(range(len(batch[0])))
+                positions = positions or _positions(names, columns)
+                yield [names[i] for i in positions], _batch_arrays(batch, positions)
+                batch = []
+
+        if batch:
+            names = names or list(range(len(batch[0])))
+            positions = positions or _positions(names, columns)
+            yield [names[i] for i in positions], _batch_arrays(batch, positions)
+    finally:
+        workbook.close()
+
+
+def _positions(names, columns):
+    """Cell positions of the requested columns, in the requested order"""
+    if columns is None:
+        return list(range(len(names)))
+
+    missing = [c for c in columns if c not in names]
+    if missing:
+        raise ValueError(f"columns not found in sheet: {missing}")
+    return [names.index(c) for c in columns]
+
+
+def _batch_arrays(batch, positions):
+    """Transpose a batch of row tuples into typed arrays for the selected cell positions"""
+    # read-only rows can be ragged when trailing cells are empty
+    return [_typed_column([row[i] if i < len(row) else None for row in batch]) for i in positions]
+
+
+def read_excel_fast(data_path, sheet_name=None, cell_range=None, header=True, batch_size=10000, columns=None):
+    """
+    Read a worksheet into a DataFrame through the streaming reader (only the given columns if set)
+
+    Returns:
+        DataFrame with typed columns
+    """
+    names = None
+    parts = []
+    for names, arrays in iter_excel_batches(data_path, sheet_name, cell_range, header, batch_size, columns):
+        parts.append(arrays)
+
+    if names is None:
+        return pd.DataFrame()
+
+    data = {}
+    for i, column in enumerate(names):
+        data[column] = _concat_columns([arrays[i] for arrays in parts])
+
+    return pd.DataFrame(data)
+
+
+def scan_excel_metadata(data_path, sheet_name=None, sample_rows=100):
+    """
+    Header, row count and dtypes from the first rows of a worksheet, without reading the rest
+
+    The row count comes from the sheet dimension stored in the workbook.
+
+    Returns:
+        dict: Metadata dictionary
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(data_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active if sheet_name is None else (
+            workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name])
+        sheet_title = sheet.title
+        max_row = sheet.max_row
+    finally:
+        workbook.close()
+
+    batches = iter_excel_batches(data_path, sheet_name, batch_size=sample_rows)
+    try:
+        columns, arrays = next(batches, ([], []))
+    finally:
+        batches.close()
+
+    return {
+        "file_format": "excel",
+        "sheet_name": sheet_title,
+        "file_size_bytes": os.path.getsize(data_path),
+        "num_subjects": max(max_row - 1, 0) if max_row else 0,
+        "num_features": len(columns),
+        "column_names": columns,
+        "data_types": {col: str(array.dtype) for col, array in zip(columns, arrays)},
+        "dtype_sample_rows": len(arrays[0]) if arrays else 0,
+        "processing_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
@@ -0,0 +1,96 @@
+# src/data_ingestion/predicates.py
+
+import operator
+
+import numpy as np
+
+# row filters for load_data, written like parquet/pyarrow filters:
+#   [("gender", "==", "female"), ("birthDate", ">=", "1960-01-01")]
+# all filters in the list must hold (AND)
+
+_COMPARISONS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+_MEMBERSHIP = {"in", "not in"}
+
+
+def validate_filters(filters):
+    """
+    Check a filter list and return it as a list of (column, op, value) tuples
+
+    Raises:
+        ValueError: for unknown operators or malformed filters
+    """
+    if not filters:
+        return []
+
+    checked = []
+    for f in filters:
+        if len(f) != 3:
+            raise ValueError(f"filters must be (column, op, value) tuples, got: {f}")
+        column, op, value = f
+        if op not in _COMPARISONS and op not in _MEMBERSHIP:
+            raise ValueError(f"unsupported filter operator: {op}")
+        checked.append((column, op, value))
+
+    return checked
+
+
+def filter_columns(filters):
+    """Columns referenced by a filter list, in order of first use"""
+    return list(dict.fromkeys(column for column, _, _ in filters or []))
+
+
+def read_columns(columns, filters):
+    """Columns the parser has to read to project columns and evaluate filters (None = all)"""
+    if columns is None:
+        return None
+    return list(dict.fromkeys(list(columns) + filter_columns(filters)))
+
+
+def filter_mask(frame, filters):
+    """
+    Boolean mask of rows matching every filter
+
+    Args:
+        frame: DataFrame holding the filter columns
+        filters: list of (column, op, value)
+
+    Returns:
+        numpy boolean array
+    """
+    mask = np.ones(len(frame), dtype=bool)
+
+    for column, op, value in validate_filters(filters):
+        values = frame[column]
+        if op == "in":
+            matched = values.isin(value)
+        elif op == "not in":
+            matched = ~values.isin(value)
+        else:
+            matched = _COMPARISONS[op](values, value)
+
+        # missing values never match a comparison
+        mask &= np.asarray(matched.fillna(False), dtype=bool)
+
+    return mask
+
+
+def select(frame, columns=None, filters=None):
+    """
+    Apply filters, then keep only the requested columns (in the requested order)
+
+    Returns:
+        DataFrame
+    """
+    if filters:
+        frame = frame[filter_mask(frame, filters)]
+    if columns is not None:
+        frame = frame[list(columns)]
+    return frame
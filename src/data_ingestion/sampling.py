@@ -0,0 +1,129 @@
+# src/data_ingestion/sampling.py
+
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+
+# helpers for the approximate (sampled) profiling and validation mode
+
+
+def reservoir_sample(chunks, sample_size, seed=None):
+    """
+    Uniform random sample of rows from a stream of DataFrame chunks (reservoir sampling)
+
+    Each chunk is handled with vectorized draws: row i (0-based, global) is kept
+    when randint(0, i) lands inside the reservoir, and replaces that slot.
+
+    Args:
+        chunks: iterable of DataFrames
+        sample_size: number of rows to keep
+        seed: random seed for reproducible samples
+
+    Returns:
+        tuple: (DataFrame sample indexed by original row number, total row count)
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    slot_rows = np.empty(0, dtype=np.int64)
+    total_rows = 0
+
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        chunk.index = chunk.index + total_rows
+        row_numbers = chunk.index.to_numpy()
+        total_rows += len(chunk)
+
+        # fill the reservoir first
+        fill = max(sample_size - len(slot_rows), 0)
+        if fill:
+            head = chunk.iloc[:fill]
+            reservoir = head if reservoir is None else pd.concat([reservoir, head])
+            slot_rows = np.concatenate([slot_rows, row_numbers[:fill]])
+            chunk = chunk.iloc[fill:]
+            row_numbers = row_numbers[fill:]
+
+        if chunk.empty:
+            continue
+
+        slots = rng.integers(0, row_numbers + 1)
+        accepted = np.flatnonzero(slots < sample_size)
+        if len(accepted) == 0:
+            continue
+
+        # later rows overwrite earlier ones aimed at the same slot
+        slots = slots[accepted]
+        _, last = np.unique(slots[::-1], return_index=True)
+        last = len(accepted) - 1 - last
+        keep = accepted[last]
+        slots = slots[last]
+
+        reservoir = pd.concat([reservoir.drop(index=slot_rows[slots]), chunk.iloc[keep]])
+        slot_rows[slots] = row_numbers[keep]
+
+    if reservoir is None:
+        return pd.DataFrame(), total_rows
+
+    return reservoir.sort_index(), total_rows
+
+
+def proportion_interval(successes, n, confidence=0.95, population=None):
+    """
+    Wilson score interval for a proportion estimated from a sample
+
+    Args:
+        successes: number of sampled items with the property
+        n: sample size
+        confidence: confidence level (0.95 = 95%)
+        population: population size, applies the finite population correction when given
+
+    Returns:
+        tuple: (lower, upper) bounds of the proportion
+    """
+    if n == 0:
+        return (0.0, 1.0)
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+
+    # sampling the whole population leaves no uncertainty
+    fpc = 1.0
+    if population is not None and population > 1:
+        fpc = max((population - n) / (population - 1), 0.0)
+        if fpc == 0:
+            return (float(p), float(p))
+
+    z2 = z * z * fpc
+    denominator = 1 + z2 / n
+    center = (p + z2 / (2 * n)) / denominator
+    margin = np.sqrt(z2 * (p * (1 - p) / n + z2 / (4 * n * n))) / denominator
+
+    return (float(max(center - margin, 0.0)), float(min(center + margin, 1.0)))
+
+
+def mean_interval(values, confidence=0.95, population=None):
+    """
+    Normal approximation interval for the mean of per-row values (e.g. row completeness)
+
+    Args:
+        values: array of sampled per-row values
+        confidence: confidence level
+        population: population size for the finite population correction
+
+    Returns:
+        tuple: (lower, upper) bounds of the mean
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return (0.0, 1.0)
+
+    mean = values.mean()
+    if n == 1:
+        return (float(mean), float(mean))
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    se = values.std(ddof=1) / np.sqrt(n)
+    if population is not None and population > 1:
+        se *= np.sqrt(max((population - n) / (population - 1), 0.0))
+
+    return (float(mean - z * se), float(mean + z * se))
@@ -0,0 +1,247 @@
+# src/data_standardization/gene_ids.py
+
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.cache import DEFAULT_CACHE_DIR, cache_name, file_fingerprint
+
+# gene identifier harmonization against a local mapping table (HGNC complete set layout:
+# symbol, ensembl_gene_id, alias_symbol, prev_symbol, "|" between several values)
+#
+# the table is compiled into two lookup indexes, both sorted key arrays with an int32 target
+# (row of the approved symbol) that are hashed once into a pandas Index:
+#   exact       approved symbols, versionless Ensembl ids, previous symbols and aliases as written
+#   normalized  the same keys uppercased without ".", "-", "_" and spaces, so dotted variants
+#               from R (MIR1302.2HG) and case variants still find MIR1302-2HG
+# a key claimed by several symbols at its best priority (symbol < id < previous < alias) is
+# ambiguous and left out, unmatched genes are reported, not guessed.
+# whole gene indexes are translated with two get_indexer calls, the compiled index is saved
+# as an .npz next to the other caches and reloaded when the table did not change
+
+MAPPING_COLUMNS = {
+    "symbol": "symbol",
+    "ids": ("ensembl_gene_id",),
+    "previous": ("prev_symbol",),
+    "aliases": ("alias_symbol",),
+}
+
+_PRIORITIES = ("symbol", "ids", "previous", "aliases")
+
+_ENSEMBL_VERSION = r"^(ENS[A-Z]*G\d+)\.\d+$"
+_SEPARATORS = r"[.\-_\s]+"
+
+
+def exact_keys(values):
+    """Lookup keys of identifiers as written, with Ensembl version suffixes removed"""
+    keys = pd.Series(np.asarray(values, dtype=object), dtype=object).astype(str).str.strip()
+    return keys.str.replace(_ENSEMBL_VERSION, r"\1", regex=True).to_numpy(dtype=object)
+
+
+def normalized_keys(values):
+    """Uppercase keys without separators ("MIR1302.2HG" and "mir1302-2hg" -> "MIR13022HG")"""
+    keys = pd.Series(exact_keys(values), dtype=object).str.upper()
+    return keys.str.replace(_SEPARATORS, "", regex=True).to_numpy(dtype=object)
+
+
+def _compile(keys, targets, priorities):
+    """Keep the best priority of every key, drop keys claimed by several symbols"""
+    entries = pd.DataFrame({"key": keys, "target": targets, "priority": priorities})
+    entries = entries[entries["key"] != ""].drop_duplicates(["key", "target"])
+    entries = entries[entries["priority"] == entries.groupby("key")["priority"].transform("min")]
+    claimed = entries.groupby("key")["target"].transform("size")
+
+    ambiguous = entries.loc[claimed > 1, "key"].nunique()
+    entries = entries[claimed == 1].sort_values("key")
+    return entries["key"].to_numpy(dtype=str), entries["target"].to_numpy(dtype=np.int32), int(ambiguous)
+
+
+class GeneIdHarmonizer:
+    """
+    Translates gene symbols, aliases and Ensembl ids to approved symbols with bulk lookups
+    """
+
+    def __init__(self, symbols, exact, normalized, meta=None, logger=None):
+        """
+        Args:
+            symbols: approved symbols, targets index into them
+            exact: (keys, targets) of the exact index
+            normalized: (keys, targets) of the normalized index
+            meta: description of the source table and build
+        """
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.meta = meta or {}
+        self.logger = logger or logging.getLogger(__name__)
+        self.last_stats = {}
+
+        self._exact_index, self._exact_targets = pd.Index(exact[0], dtype=object), np.asarray(exact[1])
+        self._normalized_index, self._normalized_targets = pd.Index(normalized[0], dtype=object), np.asarray(normalized[1])
+
+    # building
+
+    @classmethod
+    def from_frame(cls, table, columns=None, separator="|", meta=None, logger=None):
+        """
+        Compile a mapping table
+
+        Args:
+            table: DataFrame with one row per approved symbol
+            columns: dict with the "symbol" column and lists of "ids", "previous" and
+                "aliases" columns (see MAPPING_COLUMNS), missing columns are skipped
+            separator: separator of several values in one cell
+
+        Returns:
+            GeneIdHarmonizer
+        """
+        columns = {**MAPPING_COLUMNS, **(columns or {})}
+        if columns["symbol"] not in table.columns:
+            raise ValueError(f"mapping table has no symbol column {columns['symbol']}")
+
+        table = table[table[columns["symbol"]].notna()].reset_index(drop=True)
+        symbols = table[columns["symbol"]].astype(str).str.strip().to_numpy(dtype=object)
+
+        keys, targets, priorities = [exact_keys(symbols)], [np.arange(len(symbols))], [np.zeros(len(symbols), dtype=int)]
+        for priority, kind in enumerate(_PRIORITIES[1:], start=1):
+            for column in columns[kind]:
+                if column not in table.columns:
+                    continue
+                values = table[column].dropna().astype(str).str.split(separator, regex=False).explode()
+                values = values[values.str.strip() != ""]
+                keys.append(exact_keys(values.to_numpy(dtype=object)))
+                targets.append(values.index.to_numpy())
+                priorities.append(np.full(len(values), priority))
+
+        keys, targets, priorities = np.concatenate(keys), np.concatenate(targets), np.concatenate(priorities)
+        exact = _compile(keys, targets, priorities)
+        normalized = _compile(normalized_keys(keys), targets, priorities)
+
+        meta = {**(meta or {}), "symbols": len(symbols), "exact_keys": len(exact[0]),
+                "normalized_keys": len(normalized[0]), "ambiguous_keys": exact[2] + normalized[2]}
+        return cls(symbols, exact[:2], normalized[:2], meta=meta, logger=logger)
+
+    @classmethod
+    def build(cls, table_path, columns=None, separator="|", logger=None):
+        """
+        Compile a mapping table file (.tsv/.txt tab separated, otherwise csv)
+
+        Returns:
+            GeneIdHarmonizer
+        """
+        sep = "\t" if table_path.lower().endswith((".tsv", ".txt", ".tsv.gz", ".txt.gz")) else ","
+        table = pd.read_csv(table_path, sep=sep, dtype=str, keep_default_na=False, na_values=[""])
+        harmonizer = cls.from_frame(table, columns=columns, separator=separator, logger=logger,
+                                    meta={"source": file_fingerprint(table_path),
+                                          "columns": {**MAPPING_COLUMNS, **(columns or {})},
+                                          "separator": separator})
+        harmonizer.logger.info(f"compiled gene id index from {table_path}: {harmonizer.meta['symbols']} symbols, "
+                               f"{harmonizer.meta['exact_keys']} keys, {harmonizer.meta['ambiguous_keys']} ambiguous")
+        return harmonizer
+
+    def save(self, path):
+        """Write the compiled index (.npz, no pickled objects)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, symbols=self.symbols.astype(str),
+                     exact_keys=self._exact_index.to_numpy(dtype=str), exact_targets=self._exact_targets,
+                     normalized_keys=self._normalized_index.to_numpy(dtype=str),
+                     normalized_targets=self._normalized_targets,
+                     meta=np.array(json.dumps(self.meta)))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path, logger=None):
+        """Open a compiled index written by save()"""
+        with np.load(path, allow_pickle=False) as saved:
+            return cls(saved["symbols"], (saved["exact_keys"], saved["exact_targets"]),
+                       (saved["normalized_keys"], saved["normalized_targets"]),
+                       meta=json.loads(str(saved["meta"])), logger=logger)
+
+    @classmethod
+    def for_table(cls, table_path, columns=None, separator="|", cache_dir=None, logger=None):
+        """
+        Open the compiled index of a mapping table, compiling it on first use or when the
+        table or the column settings changed
+
+        Returns:
+            GeneIdHarmonizer
+        """
+        path = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "gene_ids", f"{cache_name(table_path)}.npz")
+
+        if os.path.exists(path):
+            try:
+                harmonizer = cls.load(path, logger=logger)
+                if harmonizer.meta.get("source") == file_fingerprint(table_path) and \
+                        harmonizer.meta.get("columns") == {**MAPPING_COLUMNS, **(columns or {})} and \
+                        harmonizer.meta.get("separator") == separator:
+                    return harmonizer
+            except (OSError, ValueError, KeyError) as e:
+                (logger or logging.getLogger(__name__)).warning(f"rebuilding unreadable gene id index {path}: {str(e)}")
+
+        harmonizer = cls.build(table_path, columns=columns, separator=separator, logger=logger)
+        harmonizer.save(path)
+        return harmonizer
+
+    # lookups
+
+    def lookup(self, genes):
+        """
+        Approved symbol rows of gene identifiers
+
+        Args:
+            genes: gene symbols, aliases or Ensembl ids
+
+        Returns:
+            tuple: (int array of symbol rows, -1 when unmatched; array of match kinds
+                "exact", "normalized" or "")
+        """
+        genes = np.asarray(genes, dtype=object)
+        rows = np.full(len(genes), -1, dtype=np.int64)
+        kinds = np.full(len(genes), "", dtype=object)
+        if not len(genes):
+            return rows, kinds
+
+        positions = self._exact_index.get_indexer(exact_keys(genes))
+        found = positions >= 0
+        rows[found] = self._exact_targets[positions[found]]
+        kinds[found] = "exact"
+
+        rest = np.flatnonzero(~found)
+        if len(rest):
+            positions = self._normalized_index.get_indexer(normalized_keys(genes[rest]))
+            found = positions >= 0
+            rows[rest[found]] = self._normalized_targets[positions[found]]
+            kinds[rest[found]] = "normalized"
+
+        return rows, kinds
+
+    def translate(self, genes, keep_unmapped=True):
+        """
+        Translate gene identifiers to approved symbols
+
+        Args:
+            genes: gene symbols, aliases or Ensembl ids (list, array, Series or Index)
+            keep_unmapped: unmatched genes keep their name (None otherwise)
+
+        Returns:
+            numpy object array of symbols, match counts in last_stats
+        """
+        values = np.asarray(genes, dtype=object)
+        present = pd.notna(values)
+
+        rows, kinds = self.lookup(values[present].astype(str))
+        translated = values.copy() if keep_unmapped else np.full(len(values), None, dtype=object)
+        mapped = rows >= 0
+        translated[np.flatnonzero(present)[mapped]] = self.symbols[rows[mapped]]
+
+        self.last_stats = {
+            "genes": len(values),
+            "exact": int((kinds == "exact").sum()),
+            "normalized": int((kinds == "normalized").sum()),
+            "unmapped": int(len(values) - mapped.sum()),
+        }
+        self.logger.info(f"translated {len(values)} gene ids: {self.last_stats['exact']} exact, "
+                         f"{self.last_stats['normalized']} normalized, {self.last_stats['unmapped']} unmapped")
+        return translated
@@ -0,0 +1,391 @@
+# src/data_standardization/linkage.py
+
+import logging
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+# duplicate patient detection and record linkage over standardized demographics
+#
+# comparing every pair is O(n^2), so candidate pairs come from blocking indexes instead:
+#   - blocking keys: records sharing a key (soundex of the names, birth date, postal code, ...)
+#     are compared with each other, blocks are turned into pairs size by size with triu indices
+#   - sorted neighbourhood: records sorted by name are compared with the next window - 1 records,
+#     which catches typos a blocking key splits apart
+# the union of candidate pairs is scored field by field with vectorized similarities
+# (character bigram dice for strings, floored at PHONETIC_SIMILARITY when the soundex codes
+# agree so transposed letters in short names still score, exact and partial matches for
+# dates and codes),
+# in batches on a thread pool. matches are grouped into clusters with connected components
+
+DEFAULT_FIELDS = {
+    "family_name": "string",
+    "given_name": "string",
+    "birth_date": "date",
+    "postal_code": "exact",
+}
+
+# every entry is one blocking key made of (transform, column) parts
+DEFAULT_BLOCKING = (
+    (("soundex", "family_name"), ("soundex", "given_name")),
+    (("exact", "birth_date"),),
+    (("exact", "postal_code"), ("soundex", "family_name")),
+)
+
+DEFAULT_SORT_KEYS = (("family_name", "given_name"),)
+
+# string similarity of two names that sound alike ("Murphy"/"Murhpy")
+PHONETIC_SIMILARITY = 0.8
+
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"])
+                  for c in letters}
+_NOT_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(value):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    value = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
+    return _SPACES.sub(" ", _NOT_ALNUM.sub(" ", value.lower())).strip()
+
+
+def soundex(value):
+    """American soundex code of a name ("Robert" -> "R163"), empty for empty names"""
+    letters = [c for c in normalize_text(value) if c.isalpha()]
+    if not letters:
+        return ""
+
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES[letters[0]]
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES[c]
+        if digit != "0" and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code
+        if c not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def _map_unique(series, func):
+    """Apply a python function once per distinct value, missing values stay missing"""
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(v) for v in uniques], dtype=object)
+    out = np.full(len(series), None, dtype=object)
+    present = codes >= 0
+    out[present] = mapped[codes[present]]
+    return out
+
+
+def _key_part(frame, transform, column):
+    values = frame[column]
+    if transform == "exact":
+        return _map_unique(values, lambda v: normalize_text(v) or None)
+    if transform == "soundex":
+        return _map_unique(values, lambda v: soundex(v) or None)
+    if transform == "year":
+        years = pd.to_datetime(values, errors="coerce", format="mixed").dt.year
+        return np.where(years.isna(), None, years.astype("Int64").astype(str)).astype(object)
+    raise ValueError(f"Unsupported blocking transform: {transform}")
+
+
+def _block_codes(frame, key):
+    """Integer block id per record for one blocking key, -1 when any part is missing"""
+    parts = [_key_part(frame, transform, column) for transform, column in key]
+    missing = np.zeros(len(frame), dtype=bool)
+    for part in parts:
+        missing |= pd.isna(part)
+
+    combined = pd.Series(parts[0], dtype=object)
+    for part in parts[1:]:
+        combined = combined + "|" + pd.Series(part, dtype=object)
+    codes, _ = pd.factorize(combined)
+    codes[missing] = -1
+    return codes
+
+
+def _block_pairs(codes, max_block_size):
+    """
+    All pairs inside every block, generated for all blocks of one size at once
+
+    Returns:
+        (left, right, oversized block count)
+    """
+    order = np.argsort(codes, kind="stable")
+    order = order[codes[order] >= 0]
+    if len(order) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+
+    lefts, rights = [], []
+    for size in np.unique(sizes):
+        if size < 2 or size > max_block_size:
+            continue
+        block_starts = starts[sizes == size]
+        members = order[block_starts[:, None] + np.arange(size)]
+        i, j = np.triu_indices(size, k=1)
+        lefts.append(members[:, i].ravel())
+        rights.append(members[:, j].ravel())
+
+    oversized = int((sizes > max_block_size).sum())
+    if not lefts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), oversized
+    return np.concatenate(lefts), np.concatenate(rights), oversized
+
+
+def _neighbourhood_pairs(frame, columns, window):
+    """Pairs of records within window positions of each other after sorting by the columns"""
+    sort_key = pd.Series("", index=range(len(frame)), dtype=object)
+    for column in columns:
+        sort_key = sort_key + " " + pd.Series(_map_unique(frame[column], normalize_text), dtype=object).fillna("")
+    sort_key = sort_key.str.strip()
+
+    present = np.flatnonzero(sort_key.to_numpy() != "")
+    order = present[np.argsort(sort_key.to_numpy()[present], kind="stable")]
+
+    lefts, rights = [], []
+    for offset in range(1, window):
+        lefts.append(order[:-offset])
+        rights.append(order[offset:])
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def _bigram_matrix(strings):
+    """Binary sparse matrix of character bigrams, one row per string"""
+    vocabulary = {}
+    indptr, indices = [0], []
+    for s in strings:
+        padded = f" {s} "
+        grams = {vocabulary.setdefault(padded[k:k + 2], len(vocabulary)) for k in range(len(padded) - 1)}
+        indices.extend(sorted(grams))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(strings), max(len(vocabulary), 1)))
+
+
+class _FieldIndex:
+    """Per-field distinct values and their encodings, built once per linkage run"""
+
+    def __init__(self, values, kind):
+        self.kind = kind
+        if kind == "date":
+            parsed = pd.to_datetime(pd.Series(values), errors="coerce", format="mixed")
+            self.null = parsed.isna().to_numpy()
+            self.year = parsed.dt.year.to_numpy(dtype=float)
+            self.month = parsed.dt.month.to_numpy(dtype=float)
+            self.day = parsed.dt.day.to_numpy(dtype=float)
+            return
+
+        normalized = _map_unique(pd.Series(values), lambda v: normalize_text(v) or None)
+        self.codes, uniques = pd.factorize(pd.Series(normalized, dtype=object))
+        self.null = self.codes < 0
+        if kind == "string":
+            self.bigrams = _bigram_matrix(uniques)
+            self.sizes = np.asarray(self.bigrams.sum(axis=1)).ravel()
+            self.phonetic, _ = pd.factorize(pd.Series([soundex(v) for v in uniques], dtype=object))
+
+    def similarity(self, left, right):
+        """Similarity in [0, 1] for record pairs, NaN where either side is missing"""
+        null = self.null[left] | self.null[right]
+
+        if self.kind == "date":
+            same = [(a[left] == a[right]) for a in (self.year, self.month, self.day)]
+            matches = same[0].astype(int) + same[1] + same[2]
+            # day and month swapped is a common entry error
+            swapped = same[0] & (self.month[left] == self.day[right]) & (self.day[left] == self.month[right])
+            score = np.where(matches == 3, 1.0, np.where((matches == 2) | swapped, 0.5, 0.0))
+
+        elif self.kind == "exact":
+            score = (self.codes[left] == self.codes[right]).astype(float)
+
+        else:
+            a, b = self.codes[left], self.codes[right]
+            score = np.zeros(len(left))
+            valid = ~null
+            # similarity of each distinct value pair is computed once
+            m = len(self.sizes)
+            inverse, pair_ids = pd.factorize(np.minimum(a[valid], b[valid]).astype(np.int64) * m
+                                             + np.maximum(a[valid], b[valid]))
+            u, v = pair_ids // m, pair_ids % m
+            shared = np.asarray(self.bigrams[u].multiply(self.bigrams[v]).sum(axis=1)).ravel()
+            dice = 2 * shared / np.maximum(self.sizes[u] + self.sizes[v], 1)
+            dice = np.where(self.phonetic[u] == self.phonetic[v], np.maximum(dice, PHONETIC_SIMILARITY), dice)
+            score[valid] = dice[inverse]
+
+        return np.where(null, np.nan, score)
+
+
+class RecordLinker:
+    """
+    Blocking-indexed duplicate detection within one table and linkage across tables
+    """
+
+    def __init__(self, fields=None, weights=None, blocking=DEFAULT_BLOCKING, sort_keys=DEFAULT_SORT_KEYS,
+                 window=5, threshold=0.85, max_block_size=1000, batch_size=250000, n_jobs=-1, logger=None):
+        """
+        Args:
+            fields: dict of column -> comparison ("string", "date" or "exact")
+            weights: dict of column -> weight in the match score (defaults to 1 per field)
+            blocking: blocking keys, each a tuple of (transform, column) with transform
+                "exact", "soundex" or "year"
+            sort_keys: column tuples for the sorted neighbourhood passes
+            window: sorted neighbourhood window (records compared with the next window - 1)
+            threshold: minimum weighted score of a match
+            max_block_size: larger blocks (ex. a placeholder birth date) are skipped
+            batch_size: candidate pairs scored per task
+            n_jobs: scoring threads (-1 = all cores)
+        """
+        self.fields = dict(fields or DEFAULT_FIELDS)
+        self.weights = {field: (weights or {}).get(field, 1.0) for field in self.fields}
+        self.blocking = blocking
+        self.sort_keys = sort_keys
+        self.window = window
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self.batch_size = batch_size
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+        self.logger = logger or logging.getLogger(__name__)
+        self.last_stats = {}
+
+    def candidate_pairs(self, frame, sources=None):
+        """
+        Union of the pairs proposed by every blocking key and sorted neighbourhood pass
+
+        Args:
+            frame: records with the blocking columns
+            sources: optional source label per record, only pairs across sources are kept
+
+        Returns:
+            (left, right) arrays of row positions with left < right
+        """
+        lefts, rights = [], []
+        oversized = 0
+        for key in self.blocking:
+            if all(column in frame.columns for _, column in key):
+                left, right, skipped = _block_pairs(_block_codes(frame, key), self.max_block_size)
+                lefts.append(left)
+                rights.append(right)
+                oversized += skipped
+        for columns in self.sort_keys:
+            present = [column for column in columns if column in frame.columns]
+            if present and self.window > 1 and len(frame) > 1:
+                left, right = _neighbourhood_pairs(frame, present, self.window)
+                lefts.append(left)
+                rights.append(right)
+
+        if oversized:
+            self.logger.warning(f"skipped {oversized} blocks larger than {self.max_block_size} records")
+        if not lefts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        left, right = np.concatenate(lefts).astype(np.int64), np.concatenate(rights).astype(np.int64)
+        low, high = np.minimum(left, right), np.maximum(left, right)
+        keep = low != high
+        if sources is not None:
+            sources = np.asarray(sources)
+            keep &= sources[low] != sources[high]
+
+        pair_ids = np.sort(low[keep] * len(frame) + high[keep])
+        pair_ids = pair_ids[np.r_[True, pair_ids[1:] != pair_ids[:-1]]] if len(pair_ids) else pair_ids
+        return pair_ids // len(frame), pair_ids % len(frame)
+
+    def score_pairs(self, frame, left, right):
+        """
+        Field similarities and the weighted match score of record pairs
+
+        Returns:
+            DataFrame with left, right, one similarity column per field and score
+        """
+        fields = [field for field in self.fields if field in frame.columns]
+        indexes = {field: _FieldIndex(frame[field].to_numpy(), self.fields[field]) for field in fields}
+
+        def score_batch(start):
+            l, r = left[start:start + self.batch_size], right[start:start + self.batch_size]
+            similarities = {field: indexes[field].similarity(l, r) for field in fields}
+            total = np.zeros(len(l))
+            weight = np.zeros(len(l))
+            for field, values in similarities.items():
+                present = ~np.isnan(values)
+                total += np.where(present, values, 0) * self.weights[field]
+                weight += present * self.weights[field]
+            # fields missing on either side do not count for or against a match
+            score = np.divide(total, weight, out=np.zeros(len(l)), where=weight > 0)
+            return pd.DataFrame({"left": l, "right": r, **similarities, "score": score})
+
+        starts = range(0, len(left), self.batch_size)
+        if self.n_jobs > 1 and len(starts) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+                batches = list(pool.map(score_batch, starts))
+        else:
+            batches = [score_batch(start) for start in starts]
+
+        if not batches:
+            return pd.DataFrame({"left": left, "right": right, **{f: [] for f in fields}, "score": []})
+        return pd.concat(batches, ignore_index=True)
+
+    def _match(self, frame, sources=None):
+        start = time.perf_counter()
+        frame = frame.reset_index(drop=True)
+        left, right = self.candidate_pairs(frame, sources)
+        scored = self.score_pairs(frame, left, right)
+        matches = scored[scored["score"] >= self.threshold].reset_index(drop=True)
+
+        n = len(frame)
+        self.last_stats = {
+            "records": n,
+            "candidate_pairs": len(left),
+            "all_pairs": n * (n - 1) // 2,
+            "matches": len(matches),
+            "seconds": time.perf_counter() - start,
+        }
+        self.logger.info(f"compared {len(left)} of {n * (n - 1) // 2} possible pairs, "
+                         f"{len(matches)} matches in {self.last_stats['seconds']:.2f}s")
+        return matches
+
+    def duplicates(self, frame):
+        """
+        Likely duplicate records within one table
+
+        Returns:
+            DataFrame of matching pairs (row positions left < right) with field similarities and score
+        """
+        return self._match(frame)
+
+    def link(self, left_frame, right_frame):
+        """
+        Records of two tables that likely describe the same patient
+
+        Returns:
+            DataFrame of matching pairs, left/right are row positions in left_frame/right_frame
+        """
+        columns = [c for c in left_frame.columns if c in right_frame.columns]
+        combined = pd.concat([left_frame[columns], right_frame[columns]], ignore_index=True)
+        sources = np.r_[np.zeros(len(left_frame), dtype=np.int8), np.ones(len(right_frame), dtype=np.int8)]
+
+        matches = self._match(combined, sources)
+        matches["right"] = matches["right"] - len(left_frame)
+        return matches
+
+    def clusters(self, n_records, matches):
+        """
+        Cluster id per record, records joined by a chain of matches share a cluster
+
+        Returns:
+            numpy array of cluster ids (0..k-1)
+        """
+        graph = sparse.coo_matrix((np.ones(len(matches)), (matches["left"], matches["right"])),
+                                  shape=(n_records, n_records))
+        _, labels = connected_components(graph, directed=False)
+        return labels
@@ -5,6 +5,7 @@ import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime
+from .string_transforms import shared_transformer
 
 
 class DataStandardizer:
@@ -12,9 +13,12 @@ class DataStandardizer:
         Base class for standardizing clinical and omics data
     """
 
-    def __init__(self,data, logger=None):
+    def __init__(self,data, logger=None, string_transformer=None):
         self.data = data
         self.logger = logger or logging.getLogger(__name__)
+
+        # string cleaning runs on distinct values, memoized across standardizer instances
+        self.string_transformer = string_transformer or shared_transformer()
         self.standardization_info = {
             "transformations_applied": [],
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -36,13 +40,13 @@ class DataStandardizer:
         if not date_columns:
             return False
 
-        transformed_columns = {}
+        transformed_columns = []
 
         for column in date_columns:
             if column in self.data.columns:
                 try:
                     # convert to date time
-                    self.data[column] = self.data[column].dt.strftime(target_format)
+                    self.data[column] = pd.to_datetime(self.data[column], errors="coerce")
 
                     # convert to new string format if requested
 
@@ -114,212 +118,300 @@ class DataStandardizer:
                 except Exception as e:
                     self.logger.error(f"error standardizing units for {column}: {str(e)}")
         
-            if standardized_columns:
-                self.standardization_info["transformation_applied"].append({
-                    "type":"unit_standardization",
-                    "columns":"standardized_columns",
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-            
-            return standardized_columns
+        if standardized_columns:
+            self.standardization_info["transformations_applied"].append({
+                "type":"unit_standardization",
+                "columns":standardized_columns,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
         
-        def standardize_terminology(self, column, mapping_dict, new_column=None):
-            """
-            Map values in a column to standard terminology
-            Args:
-                column: column containing values to standardize
-                mapping_dict: dictionary mapping values to standard terms
-                new_column: if given, new column made instead of modifying existing
+        return standardized_columns
+        
+    def standardize_terminology(self, column, mapping_dict, new_column=None):
+        """
+        Map values in a column to standard terminology
+        Args:
+            column: column containing values to standardize
+            mapping_dict: dictionary mapping values to standard terms
+            new_column: if given, new column made instead of modifying existing
+
+        Returns:
+            Boolean indicating success 
+        """
 
-            Returns:
-                Boolean indicating success 
-            """
+        if column not in self.data.columns:
+             self.logger.error(f"column {column} not found in the dataset")
+             return False
+        
+        target_column = new_column or column
 
-            if column not in self.data.columns:
-                 self.loggier.error(f"column {column} not found in the dataset")
-                 return False
-            
-            target_column = new_column or column
 
+        # create copy of original data in a new column..
 
-            # create copy of original data in a new column..
+        if new_column:
+            self.data[target_column] = self.data[column].copy()
 
-            if new_column:
-                self.data[target_column] = self.data[column].copy()
+        # apply mapping
 
-            # apply mapping
+        unmapped_values = set()
 
-            unmapped_values = set()
+        def map_value(val):
+            if pd.isna(val):
+                return val
 
-            def map_value(val):
-                if pd.isna(val):
-                    return val
+            str_val = str(val).lower().strip()
+            if str_val in mapping_dict:
+                    return mapping_dict[str_val]
+            else:
+                unmapped_values.add(str_val)
+                return val
 
-                str_val = str(val).lower().strip()
-                if str_val in mapping_dict:
-                        return mapping_dict[str_val]
-                else:
-                    unmapped_values.add(str_val)
-                    return val
+        self.data[target_column] = self.data[column].apply(map_value)
 
-            self.data[target_column] = self.data[column].apply(map_value)
+        # log unmapped values
 
-            # log unmapped values
+        if unmapped_values:
+            self.logger.warning(f"Found{len(unmapped_values)} unmapped values in {column}: {unmapped_values}")
+        
+        self.standardization_info["transformations_applied"].append({
+            "type": "terminology_standardization",
+            "column": column,
+            "target_column": target_column,
+            "unmapped_values_count": len(unmapped_values),
+        })
 
-            if unmapped_values:
-                self.logger.warning(f"Found{len(unmapped_values)} unmapped values in {column}: {unmapped_values}")
-            
-            self.standardization_info["transformations_applied"].append({
-                "type": "terminology_standardization",
-                "column": column,
-                "target_column": target_column,
-                "unmapped_values_count": len(unmapped_values),
-            })
+        return True
+    
 
-            return True
+    # harmonize ids across data sets
+
+    def harmonize_ids(self, id_column, id_format = None, prefix = None):
+        """
+        Standardize patient and subject ids to a consistent format
+
+        Args:
+            id_column: column containing IDs to harmonize
+            id_format: format string for id standardization
+            prefix: prefix to add to ids (ex. 'PATIENT-')
         
+        Returns:
+            series with harmonized IDs
+        """
 
-        # harmonize ids across data sets
+        if id_column not in self.data.columns:
+            self.logger.error(f"ID column {id_column} not found in dataset")
+            return None
+        
+        # create harmonized id column
 
-        def harmonize_ids(self, id_column, id_format = None, prefix = None):
-            """
-            Standardize patient and subject ids to a consistent format
+        harmonized_column = f"harmonized{id_column}"
 
-            Args:
-                id_column: column containing IDs to harmonize
-                id_format: format string for id standardization
-                prefix: prefix to add to ids (ex. 'PATIENT-')
-            
-            Returns:
-                series with harmonized IDs
-            """
+        # start with og IDs
 
-            if id_column not in self.data.columns:
-                self.logger.error(f"ID column {id_column} not found in dataset")
-                return None
-            
-            # create harmonized id column
+        self.data[harmonized_column] = self.data[id_column].astype(str)
 
-            harmonized_column = f"harmonized{id_column}"
 
-            # start with og IDs
+        # remove non alphanumeric chars if needed
 
-            self.data[harmonized_column] = self.data[id_column].astype(str)
+        if id_format == "alphanumeric":
+            self.data[harmonized_column] = self.data[harmonized_column].str.replace(r'[^a-zA-Z0-9]', '', regex=True)
+        
+        # apply prefix if given
 
+        if prefix:
+            self.data[harmonized_column] = prefix + self.data[harmonized_column]
+        
+            self.standardization_info["transformations_applied"].append({
+                "type": "id_harmonization",
+                "source_column": id_column,
+                "result_column": harmonized_column,
+                "format": id_format,
+                "prefix": prefix,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
 
-            # remove non alphanumeric chars if needed
+        return self.data[harmonized_column]
 
-            if id_format == "alphanumeric":
-                self.data[harmonized_column] = self.data[harmonized_column].str.replace(r'[^a-zA-Z0-9]', '', regex=True)
-            
-            # apply prefix if given
+    def harmonize_gene_ids(self, mapping_path = None, gene_column = None, harmonizer = None, keep_unmapped = True,
+                           **mapping_kwargs):
+        """
+        Translate gene symbols, aliases and Ensembl ids to approved symbols (see gene_ids.py)
 
-            if prefix:
-                self.data[harmonized_column] = prefix + self.data[harmonized_column]
-            
-                self.standardization_info["transformations_applied"].append({
-                    "type": "id_harmonization",
-                    "source_column": id_column,
-                    "result_column": harmonized_column,
-                    "format": id_format,
-                    "prefix": prefix,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-
-            return self.data[harmonized_column]
-
-        def standardize_demographics(self, name_columns=None, address_columns=None):
-            """
-            Standardize demographic information like names and addresses
-            
-            Args:
-                name_columns: Dictionary mapping name fields to standard columns
-                    {'name_first': 'given_name', 'name_last': 'family_name'}
-                address_columns: Dictionary mapping address fields to standard columns
-                    {'addr1': 'address_line', 'zip': 'postal_code'}
-            
-            Returns:
-                Dictionary of standardized columns
-            """
-            standardized = {}
-            
-            # standardize name fields
-            if name_columns:
-                for source, target in name_columns.items():
-                    if source in self.data.columns:
-                        # Convert to proper case and remove extra spaces
-                        self.data[target] = self.data[source].str.title().str.strip()
-                        standardized[source] = target
-            
-            # Standardize address fields
-            if address_columns:
-                for source, target in address_columns.items():
-                    if source in self.data.columns:
-                        # Basic cleaning
-                        self.data[target] = self.data[source].str.strip()
-                        standardized[source] = target
-            
-            if standardized:
-                self.standardization_info["transformations_applied"].append({
-                    "type": "demographic_standardization",
-                    "standardized_fields": standardized,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-            
-            return standardized
+        Args:
+            mapping_path: local mapping table, compiled once and cached on disk
+            gene_column: column with gene ids, the index (count matrix layout) when None
+            harmonizer: compiled GeneIdHarmonizer, used instead of mapping_path
+            keep_unmapped: unmatched genes keep their name (None otherwise)
+            mapping_kwargs: passed to GeneIdHarmonizer.for_table (columns, separator, cache_dir)
 
-                        
-        def run_standardization_pipeline(self, config):
-            """
-            Run a complete standardization pipeline based on configuration
-            
-            Args:
-                config: Dictionary with standardization configuration
-                    {
-                    "dates": {"columns": [...], "format": "..."},
-                    "units": {column_unit_mappings},
-                    "terminology": {column_mapping_pairs},
-                    "ids": {"column": "...", "format": "...", "prefix": "..."},
-                    "demographics": {"name_columns": {...}, "address_columns": {...}}
-                    }
-            
-            Returns:
-                Standardization info dictionary
-            """
-            # Date standardization
-            if "dates" in config:
-                self.standardize_dates(
-                    config["dates"].get("columns", []),
-                    config["dates"].get("format")
-                )
-            
-            # Unit standardization
-            if "units" in config:
-                self.standardize_units(config["units"])
-            
-            # Terminology mapping
-            if "terminology" in config:
-                for column, mapping in config["terminology"].items():
-                    self.standardize_terminology(column, mapping)
-            
-            # ID harmonization
-            if "ids" in config:
-                self.harmonize_ids(
-                    config["ids"].get("column"),
-                    config["ids"].get("format"),
-                    config["ids"].get("prefix")
-                )
-            
-            # Demographics standardization
-            if "demographics" in config:
-                self.standardize_demographics(
-                    config["demographics"].get("name_columns"),
-                    config["demographics"].get("address_columns")
-                )
-            
-            return self.standardization_info
+        Returns:
+            series with harmonized gene ids
+        """
+        from .gene_ids import GeneIdHarmonizer
+
+        if harmonizer is None:
+            if mapping_path is None:
+                raise ValueError("harmonize_gene_ids needs a mapping_path or a harmonizer")
+            harmonizer = GeneIdHarmonizer.for_table(mapping_path, logger = self.logger, **mapping_kwargs)
+
+        if gene_column is not None and gene_column not in self.data.columns:
+            self.logger.error(f"gene column {gene_column} not found in dataset")
+            return None
+
+        # count matrices keep genes in the index, which is replaced by the approved symbols
+        genes = self.data.index if gene_column is None else self.data[gene_column]
+        translated = pd.Series(harmonizer.translate(genes, keep_unmapped = keep_unmapped),
+                               index = self.data.index, dtype = object)
+
+        if gene_column is None:
+            self.data.index = pd.Index(translated.to_numpy(), name = self.data.index.name)
+            result_column = "index"
+        else:
+            result_column = f"harmonized{gene_column}"
+            self.data[result_column] = translated
+
+        self.standardization_info["transformations_applied"].append({
+            "type": "gene_id_harmonization",
+            "source_column": gene_column or "index",
+            "result_column": result_column,
+            "mapping": harmonizer.meta.get("source", {}).get("path"),
+            **harmonizer.last_stats,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+        return translated
+
+    def standardize_demographics(self, name_columns=None, address_columns=None):
+        """
+        Standardize demographic information like names and addresses
+        
+        Args:
+            name_columns: Dictionary mapping name fields to standard columns
+                {'name_first': 'given_name', 'name_last': 'family_name'}
+            address_columns: Dictionary mapping address fields to standard columns
+                {'addr1': 'address_line', 'zip': 'postal_code'}
+        
+        Returns:
+            Dictionary of standardized columns
+        """
+        standardized = {}
+        
+        # standardize name fields
+        if name_columns:
+            for source, target in name_columns.items():
+                if source in self.data.columns:
+                    # Convert to proper case and remove extra spaces
+                    self.data[target] = self.string_transformer.apply(self.data[source], ("title", "strip"))
+                    standardized[source] = target
+        
+        # Standardize address fields
+        if address_columns:
+            for source, target in address_columns.items():
+                if source in self.data.columns:
+                    # Basic cleaning
+                    self.data[target] = self.string_transformer.apply(self.data[source], "strip")
+                    standardized[source] = target
+        
+        if standardized:
+            self.standardization_info["transformations_applied"].append({
+                "type": "demographic_standardization",
+                "standardized_fields": standardized,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+        
+        return standardized
+
+    def find_duplicates(self, fields = None, cluster_column = "duplicate_cluster", **linker_kwargs):
+        """
+        Flag likely duplicate patients with blocking-indexed record linkage (see linkage.py)
+
+        Args:
+            fields: dictionary mapping standardized columns to a comparison ("string", "date", "exact")
+            cluster_column: column receiving the cluster id, duplicates share an id
+            linker_kwargs: passed to RecordLinker (threshold, window, blocking, ...)
+
+        Returns:
+            DataFrame of matching row pairs with their similarity scores
+        """
+        from .linkage import RecordLinker
+
+        linker = RecordLinker(fields, logger = self.logger, **linker_kwargs)
+        matches = linker.duplicates(self.data)
+        self.data[cluster_column] = linker.clusters(len(self.data), matches)
+
+        self.standardization_info["transformations_applied"].append({
+            "type": "duplicate_detection",
+            "fields": linker.fields,
+            "result_column": cluster_column,
+            "threshold": linker.threshold,
+            "candidate_pairs": linker.last_stats["candidate_pairs"],
+            "matches": len(matches),
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+        return matches
+
+    def run_standardization_pipeline(self, config):
+        """
+        Run a complete standardization pipeline based on configuration
+        
+        Args:
+            config: Dictionary with standardization configuration
+                {
+                "dates": {"columns": [...], "format": "..."},
+                "units": {column_unit_mappings},
+                "terminology": {column_mapping_pairs},
+                "ids": {"column": "...", "format": "...", "prefix": "..."},
+                "gene_ids": {"mapping_path": "...", "gene_column": "..."},
+                "demographics": {"name_columns": {...}, "address_columns": {...}},
+                "duplicates": {"fields": {...}, "threshold": ...}
+                }
+        
+        Returns:
+            Standardization info dictionary
+        """
+        # Date standardization
+        if "dates" in config:
+            self.standardize_dates(
+                config["dates"].get("columns", []),
+                config["dates"].get("format")
+            )
+        
+        # Unit standardization
+        if "units" in config:
+            self.standardize_units(config["units"])
+        
+        # Terminology mapping
+        if "terminology" in config:
+            for column, mapping in config["terminology"].items():
+                self.standardize_terminology(column, mapping)
+        
+        # ID harmonization
+        if "ids" in config:
+            self.harmonize_ids(
+                config["ids"].get("column"),
+                config["ids"].get("format"),
+                config["ids"].get("prefix")
+            )
+        
+        # Gene identifiers against a local mapping table
+        if "gene_ids" in config:
+            self.harmonize_gene_ids(**config["gene_ids"])
+        
+        # Demographics standardization
+        if "demographics" in config:
+            self.standardize_demographics(
+                config["demographics"].get("name_columns"),
+                config["demographics"].get("address_columns")
+            )
+        
+        # Duplicate patients, after names and addresses are standardized
+        if "duplicates" in config:
+            self.find_duplicates(**config["duplicates"])
+        
+        return self.standardization_info
 
 
-                                
+                            
 
 
@@ -0,0 +1,182 @@
+# src/data_standardization/string_transforms.py
+
+import atexit
+import logging
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.cache import DEFAULT_CACHE_DIR
+
+# string cleaning on distinct values instead of rows
+#
+# name/address columns repeat heavily (cities, states, common names), so a transform runs
+# once per distinct value (or once per category of a categorical column) and the results
+# are broadcast back through the factorized codes. results are memoized per transform chain
+# and shared by every DataStandardizer in the process, the shared memo is kept across runs in
+# DEFAULT_MEMO_PATH (save()/load() for other transformers).
+# the cost of a column grows with its cardinality and the number of new values, not its rows.
+#
+# transforms are applied with the pandas .str methods, so missing and non-string values
+# behave exactly like df[col].str.title().str.strip()
+
+TRANSFORMS = {
+    "strip": lambda s: s.str.strip(),
+    "title": lambda s: s.str.title(),
+    "upper": lambda s: s.str.upper(),
+    "lower": lambda s: s.str.lower(),
+    "collapse_spaces": lambda s: s.str.replace(r"\s+", " ", regex=True),
+    "alphanumeric": lambda s: s.str.replace(r"[^0-9A-Za-z ]+", "", regex=True),
+}
+
+DEFAULT_MEMO_PATH = os.path.join(DEFAULT_CACHE_DIR, "string_memo.pkl")
+
+
+class StringTransformer:
+    """
+    Memoized string transforms over the distinct values of a column
+    """
+
+    def __init__(self, max_entries=1000000, logger=None):
+        """
+        Args:
+            max_entries: memoized values per transform chain, the memo of a chain is
+                cleared when it grows past this
+        """
+        self.max_entries = max_entries
+        self.logger = logger or logging.getLogger(__name__)
+        self.memo = {}
+        self.stats = {"rows": 0, "distinct": 0, "computed": 0}
+
+    def _chain(self, transforms):
+        if isinstance(transforms, str):
+            transforms = (transforms,)
+        unknown = [t for t in transforms if t not in TRANSFORMS]
+        if unknown:
+            raise ValueError(f"Unsupported string transforms: {unknown}")
+        return tuple(transforms)
+
+    def transform_values(self, values, transforms):
+        """
+        Transform an array of distinct values, computing only values not seen before
+
+        Args:
+            values: distinct values (no missing values)
+            transforms: transform name or sequence of names, applied in order
+
+        Returns:
+            numpy object array of results
+        """
+        chain = self._chain(transforms)
+        memo = self.memo.setdefault(chain, {})
+
+        missing = [v for v in values if v not in memo]
+        if missing and len(memo) + len(missing) > self.max_entries:
+            # evict before computing, so every value of this call is computed or kept
+            memo.clear()
+            missing = list(values)
+        if missing:
+            result = pd.Series(missing, dtype=object)
+            for name in chain:
+                result = TRANSFORMS[name](result)
+            # non-string values come back as NaN, like the .str methods
+            memo.update(zip(missing, result.astype(object)))
+            self.stats["computed"] += len(missing)
+
+        return np.array([memo[v] for v in values], dtype=object)
+
+    def apply(self, series, transforms):
+        """
+        Transform a column through its distinct values
+
+        Args:
+            series: column to transform (object, string or categorical)
+            transforms: transform name or sequence of names, applied in order
+
+        Returns:
+            transformed Series with the same index
+        """
+        self.stats["rows"] += len(series)
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = self.transform_values(series.cat.categories, transforms)
+            self.stats["distinct"] += len(categories)
+            new_categories = pd.Series(categories, dtype=object)
+            if new_categories.notna().all() and new_categories.is_unique:
+                return series.cat.rename_categories(list(categories))
+            # transformed categories collide ("smith " and "Smith"), rebuild from the codes
+            values = np.where(series.cat.codes.to_numpy() >= 0, categories[series.cat.codes.to_numpy()], None)
+            return pd.Series(values, index=series.index, name=series.name, dtype="category")
+
+        codes, uniques = pd.factorize(series)
+        results = self.transform_values(uniques, transforms)
+        self.stats["distinct"] += len(uniques)
+
+        # missing values are kept as they are (None stays None, NaN stays NaN)
+        values = series.to_numpy(dtype=object, copy=True)
+        present = codes >= 0
+        values[present] = results[codes[present]]
+
+        # string dtype columns stay string dtype, everything else comes back as object like .str does
+        result = pd.Series(values, index=series.index, name=series.name, dtype=object)
+        return result.astype(series.dtype) if isinstance(series.dtype, pd.StringDtype) else result
+
+    def save(self, path=DEFAULT_MEMO_PATH):
+        """Write the memo to disk for later runs"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self.memo, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MEMO_PATH, **kwargs):
+        """Transformer with a memo saved by an earlier run (empty if there is none)"""
+        transformer = cls(**kwargs)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    transformer.memo = pickle.load(f)
+            except Exception as e:
+                transformer.logger.warning(f"ignoring unreadable string memo {path}: {str(e)}")
+        return transformer
+
+
+# shared by every DataStandardizer (and the dashboard) in the process, loaded from
+# DEFAULT_MEMO_PATH and saved back when the process exits (or save_shared_memo() is called)
+_shared = None
+_saved_computed = 0
+
+
+def shared_transformer():
+    """Process-wide transformer, so repeated standardization runs reuse each other's results"""
+    global _shared
+    if _shared is None:
+        _shared = StringTransformer.load(DEFAULT_MEMO_PATH)
+        atexit.register(save_shared_memo)
+    return _shared
+
+
+def save_shared_memo(path=DEFAULT_MEMO_PATH):
+    """
+    Write the process-wide memo for later runs, only when this process added values to it
+
+    Returns:
+        bool: True when the memo was written
+    """
+    global _saved_computed
+    if _shared is None or _shared.stats["computed"] == _saved_computed:
+        return False
+    try:
+        _shared.save(path)
+    except OSError as e:
+        _shared.logger.warning(f"could not save string memo {path}: {str(e)}")
+        return False
+    _saved_computed = _shared.stats["computed"]
+    return True
+
+
+def transform_column(series, *transforms):
+    """Apply transforms to a column through the process-wide memo"""
+    return shared_transformer().apply(series, transforms)
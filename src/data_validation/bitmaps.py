@@ -0,0 +1,117 @@
+# src/data_validation/bitmaps.py
+
+import numpy as np
+import pandas as pd
+
+# compact row masks for validation checks, one bit per row
+# lets the dashboard drill down into failing rows without re-running the checks
+
+# number of set bits for every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class RowBitmap:
+    """
+    Bit-packed boolean mask over the rows of a table
+    """
+
+    __slots__ = ("bits", "length")
+
+    def __init__(self, bits, length):
+        self.bits = bits
+        self.length = length
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Pack a boolean mask (array or Series) into a bitmap
+
+        Args:
+            mask: boolean array-like, NaN counts as False
+
+        Returns:
+            RowBitmap
+        """
+        mask = np.asarray(mask)
+        if mask.dtype != bool:
+            # a plain bool cast turns NaN (float or object masks) into True
+            mask = np.where(pd.isna(mask), False, mask).astype(bool)
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def empty(cls, length):
+        """Bitmap with no rows set"""
+        return cls(np.zeros((length + 7) // 8, dtype=np.uint8), length)
+
+    def to_mask(self):
+        """Unpack into a boolean numpy array"""
+        return np.unpackbits(self.bits, count=self.length).astype(bool)
+
+    def positions(self):
+        """Row positions (0-based) that are set"""
+        return np.flatnonzero(self.to_mask())
+
+    def count(self):
+        """Number of rows set"""
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def _check(self, other):
+        if self.length != other.length:
+            raise ValueError(f"bitmaps cover different row counts: {self.length} vs {other.length}")
+
+    def __and__(self, other):
+        self._check(other)
+        return RowBitmap(self.bits & other.bits, self.length)
+
+    def __or__(self, other):
+        self._check(other)
+        return RowBitmap(self.bits | other.bits, self.length)
+
+    def __sub__(self, other):
+        self._check(other)
+        return RowBitmap(self.bits & ~other.bits, self.length)
+
+    def __invert__(self):
+        bits = ~self.bits
+        # clear the padding bits past the last row
+        tail = self.length % 8
+        if tail:
+            bits[-1] &= np.uint8((0xFF << (8 - tail)) & 0xFF)
+        return RowBitmap(bits, self.length)
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return f"RowBitmap({self.count()}/{self.length} rows, {self.nbytes} bytes)"
+
+
+def combine(bitmaps, how="union"):
+    """
+    Union or intersection of several bitmaps
+
+    Args:
+        bitmaps: list of RowBitmap over the same rows
+        how: "union" (any check failed) or "intersection" (all checks failed)
+
+    Returns:
+        RowBitmap
+    """
+    if not bitmaps:
+        raise ValueError("no bitmaps to combine")
+
+    if how == "union":
+        bits = np.bitwise_or.reduce([b.bits for b in bitmaps])
+    elif how == "intersection":
+        bits = np.bitwise_and.reduce([b.bits for b in bitmaps])
+    else:
+        raise ValueError(f"Unsupported bitmap combination: {how}")
+
+    for b in bitmaps[1:]:
+        bitmaps[0]._check(b)
+
+    return RowBitmap(bits, bitmaps[0].length)
@@ -0,0 +1,370 @@
+# src/data_validation/rules.py
+
+import ast
+import operator
+
+import numpy as np
+import pandas as pd
+
+# cross-column rule engine, rules are written as small python-like expressions:
+#
+#   "deathDate >= birthDate"
+#   "between(age, 50, 90)"                         with when="cohort == 'AD'" (conditional range)
+#   "apoe_status in apoe_codes"                    referential check, apoe_codes is a named code list
+#   "isnull(deathDate) or date(deathDate) >= date(birthDate)"
+#
+# every expression is parsed into a tree of hashable tuples. identical subtrees (a column
+# load, "cohort == 'AD'", date(birthDate), ...) are the same tuple, so a RuleSet evaluates
+# each distinct node once per chunk and hundreds of rules cost about one pass over the data.
+#
+# every node evaluates to (values, null). missing inputs make a result null, and null never
+# counts as a violation (like validate_value_ranges, where NaN never fails a min/max check)
+
+_COMPARE = {
+    ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+}
+_COMPARE_OPS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+# op with its operands swapped, used to put constants on the right
+_FLIPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+_ARITHMETIC = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+_ARITHMETIC_OPS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+
+_FUNCTIONS = {"abs": 1, "between": 3, "isnull": 1, "notnull": 1, "date": 1, "year": 1}
+
+_BOOLEAN_KINDS = {"cmp", "and", "or", "not", "isin", "isnull", "notnull", "between"}
+_COMMUTATIVE = {"==", "!=", "+", "*"}
+
+
+class RuleSyntaxError(ValueError):
+    """A rule expression that cannot be compiled"""
+
+
+def _sorted_operands(operands):
+    # stable canonical order, so "a and b" and "b and a" share one node
+    return tuple(sorted(dict.fromkeys(operands), key=repr))
+
+
+class _Compiler:
+    """Turns one expression into a tree of tuples"""
+
+    def __init__(self, code_lists):
+        self.code_lists = code_lists
+
+    def compile(self, text):
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise RuleSyntaxError(f"invalid rule expression {text!r}: {e.msg}")
+        return self._node(tree.body, text)
+
+    def _node(self, node, text):
+        if isinstance(node, ast.Name):
+            if node.id in self.code_lists:
+                raise RuleSyntaxError(f"code list {node.id!r} can only be used after 'in' ({text!r})")
+            return ("col", node.id)
+
+        if isinstance(node, ast.Constant):
+            return ("const", node.value)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) \
+                and isinstance(node.operand, ast.Constant):
+            return ("const", -node.operand.value)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ("not", self._node(node.operand, text))
+
+        if isinstance(node, ast.BoolOp):
+            kind = "and" if isinstance(node.op, ast.And) else "or"
+            operands = []
+            for value in node.values:
+                child = self._node(value, text)
+                # flatten nested and/or so the operand order does not matter
+                operands.extend(child[1:] if child[0] == kind else [child])
+            return (kind,) + _sorted_operands(operands)
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+            op = _ARITHMETIC[type(node.op)]
+            left, right = self._node(node.left, text), self._node(node.right, text)
+            if op in _COMMUTATIVE:
+                left, right = sorted([left, right], key=repr)
+            return ("bin", op, left, right)
+
+        if isinstance(node, ast.Compare):
+            # chained comparisons (18 <= age <= 65) become an "and" of pairs
+            parts = []
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                parts.append(self._compare(op, left, right, text))
+                left = right
+            return parts[0] if len(parts) == 1 else ("and",) + _sorted_operands(parts)
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS:
+            name = node.func.id
+            if len(node.args) != _FUNCTIONS[name] or node.keywords:
+                raise RuleSyntaxError(f"{name}() takes {_FUNCTIONS[name]} argument(s) ({text!r})")
+            return (name,) + tuple(self._node(arg, text) for arg in node.args)
+
+        raise RuleSyntaxError(f"unsupported syntax {ast.dump(node)[:60]} in rule {text!r}")
+
+    def _compare(self, op, left, right, text):
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if isinstance(right, ast.Name) and right.id in self.code_lists:
+                codes = ("codes", right.id)
+            elif isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+                codes = ("literal", _sorted_operands(self._literal(e, text) for e in right.elts))
+            else:
+                raise RuleSyntaxError(f"'in' needs a code list name or a literal list ({text!r})")
+            node = ("isin", self._node(left, text), codes)
+            return ("not", node) if isinstance(op, ast.NotIn) else node
+
+        if type(op) not in _COMPARE:
+            raise RuleSyntaxError(f"unsupported comparison in rule {text!r}")
+
+        op = _COMPARE[type(op)]
+        left, right = self._node(left, text), self._node(right, text)
+        if left[0] == "const" and right[0] != "const":
+            left, right, op = right, left, _FLIPPED[op]
+        elif op in _COMMUTATIVE and right[0] != "const":
+            left, right = sorted([left, right], key=repr)
+        return ("cmp", op, left, right)
+
+    def _literal(self, node, text):
+        if isinstance(node, ast.Constant):
+            return node.value
+        raise RuleSyntaxError(f"code lists may only hold constants ({text!r})")
+
+
+def _columns(node, found):
+    """Columns referenced by a node tree"""
+    if node[0] == "col":
+        found[node[1]] = None
+    for child in node[1:]:
+        if isinstance(child, tuple) and child and isinstance(child[0], str) and child[0] not in ("codes", "literal"):
+            _columns(child, found)
+    return found
+
+
+def _walk(node, seen):
+    """Count distinct nodes of a tree into seen"""
+    if not isinstance(node, tuple) or not node or node[0] in ("const", "codes", "literal"):
+        return
+    seen[node] = seen.get(node, 0) + 1
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            _walk(child, seen)
+
+
+def _as_compare_operand(values, other):
+    # ISO date strings compared against a datetime column
+    if isinstance(values, str) and isinstance(other, np.ndarray) and other.dtype.kind == "M":
+        return np.datetime64(pd.Timestamp(values), "ns")
+    return values
+
+
+class RuleSet:
+    """
+    Compiled cross-column rules, evaluated together chunk by chunk
+    """
+
+    def __init__(self, rules, code_lists=None):
+        """
+        Args:
+            rules: dict of rule name -> expression, or name -> {"expr": ..., "when": ...}
+                (the rule is only checked on rows where "when" holds)
+            code_lists: dict of name -> allowed values, for "column in name" checks
+        """
+        self.code_lists = {name: pd.Index(pd.unique(pd.Series(list(values), dtype=object)))
+                           for name, values in (code_lists or {}).items()}
+        compiler = _Compiler(self.code_lists)
+
+        self.rules = {}
+        for name, spec in rules.items():
+            if isinstance(spec, str):
+                spec = {"expr": spec}
+            expr = compiler.compile(spec["expr"])
+            when = compiler.compile(spec["when"]) if spec.get("when") else None
+            for part, label in ((expr, "expr"), (when, "when")):
+                if part is not None and part[0] not in _BOOLEAN_KINDS and part[0] != "const":
+                    raise RuleSyntaxError(f"{label} of rule {name!r} is not a condition: {spec[label]!r}")
+            self.rules[name] = {"expr": expr, "when": when, "text": spec["expr"], "when_text": spec.get("when")}
+
+        # shared subexpressions across all rules
+        seen = {}
+        for rule in self.rules.values():
+            _walk(rule["expr"], seen)
+            if rule["when"] is not None:
+                _walk(rule["when"], seen)
+        self.node_count = sum(seen.values())
+        self.distinct_nodes = len(seen)
+
+    @property
+    def columns(self):
+        """Columns referenced by any rule"""
+        found = {}
+        for rule in self.rules.values():
+            _columns(rule["expr"], found)
+            if rule["when"] is not None:
+                _columns(rule["when"], found)
+        return list(found)
+
+    def rule_columns(self, name):
+        """Columns referenced by one rule"""
+        rule = self.rules[name]
+        found = _columns(rule["expr"], {})
+        return list(_columns(rule["when"], found) if rule["when"] is not None else found)
+
+    # evaluation
+
+    def _evaluate(self, node, chunk, memo):
+        if node in memo:
+            return memo[node]
+
+        kind = node[0]
+        if kind == "const":
+            return node[1], False
+
+        if kind == "col":
+            series = chunk[node[1]]
+            null = series.isna().to_numpy()
+            # nullable extension columns (boolean, Int64, ...) become plain numpy arrays
+            if pd.api.types.is_bool_dtype(series.dtype):
+                values = series.to_numpy(dtype=bool, na_value=False)
+            elif pd.api.types.is_numeric_dtype(series.dtype) and null.any():
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+            else:
+                values = series.to_numpy()
+            result = values, null
+
+        elif kind == "cmp":
+            (a, a_null), (b, b_null) = (self._evaluate(child, chunk, memo) for child in node[2:])
+            a, b = _as_compare_operand(a, b), _as_compare_operand(b, a)
+            op = _COMPARE_OPS[node[1]]
+            if isinstance(a, np.ndarray) and a.dtype == object:
+                # object arrays go through pandas, which tolerates mixed None/NaN/str values
+                values = op(pd.Series(a, copy=False), b).to_numpy(dtype=bool)
+            else:
+                with np.errstate(invalid="ignore"):
+                    values = np.asarray(op(a, b), dtype=bool)
+            result = values, a_null | b_null
+
+        elif kind == "bin":
+            (a, a_null), (b, b_null) = (self._evaluate(child, chunk, memo) for child in node[2:])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = _ARITHMETIC_OPS[node[1]](a, b)
+            null = a_null | b_null
+            if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+                null = null | ~np.isfinite(values)
+            result = values, null
+
+        elif kind in ("and", "or"):
+            operands = [self._evaluate(child, chunk, memo) for child in node[1:]]
+            # Kleene logic: a known False decides an "and", a known True decides an "or"
+            decided = False
+            values = kind == "and"
+            null = False
+            for v, n in operands:
+                known = v & ~n if kind == "or" else ~v & ~n
+                decided = decided | known
+                values = (values | v) if kind == "or" else (values & v)
+                null = null | n
+            result = values, null & ~decided
+
+        elif kind == "not":
+            values, null = self._evaluate(node[1], chunk, memo)
+            result = ~values, null
+
+        elif kind == "isin":
+            values, null = self._evaluate(node[1], chunk, memo)
+            codes = self.code_lists[node[2][1]] if node[2][0] == "codes" else pd.Index(node[2][1], dtype=object)
+            result = codes.get_indexer(pd.Index(values, dtype=object)) >= 0, null
+
+        elif kind == "between":
+            (v, v_null), (low, low_null), (high, high_null) = (self._evaluate(c, chunk, memo) for c in node[1:])
+            with np.errstate(invalid="ignore"):
+                values = (v >= low) & (v <= high)
+            result = np.asarray(values, dtype=bool), v_null | low_null | high_null
+
+        elif kind in ("isnull", "notnull"):
+            _, null = self._evaluate(node[1], chunk, memo)
+            null = np.broadcast_to(null, len(chunk))
+            result = (null if kind == "isnull" else ~null), np.zeros(len(chunk), dtype=bool)
+
+        elif kind == "abs":
+            values, null = self._evaluate(node[1], chunk, memo)
+            result = np.abs(values), null
+
+        elif kind == "date":
+            values, null = self._evaluate(node[1], chunk, memo)
+            parsed = pd.to_datetime(pd.Series(values, copy=False), errors="coerce", format="mixed")
+            parsed = parsed.to_numpy(dtype="datetime64[ns]")
+            result = parsed, null | np.isnat(parsed)
+
+        elif kind == "year":
+            values, null = self._evaluate(node[1], chunk, memo)
+            # unparseable values become missing years, like date()
+            parsed = pd.to_datetime(pd.Series(np.atleast_1d(values), copy=False), errors="coerce", format="mixed")
+            years = parsed.dt.year.to_numpy(dtype=float)
+            if np.ndim(values) == 0:
+                years = years[0]
+            result = years, null | np.isnan(years)
+
+        else:
+            raise RuleSyntaxError(f"unknown node {kind}")
+
+        memo[node] = result
+        return result
+
+    def _violations(self, chunk, names):
+        memo = {}
+        masks = {}
+        for name in names:
+            rule = self.rules[name]
+            values, null = self._evaluate(rule["expr"], chunk, memo)
+            # constants come back as python bools, where ~True is -2
+            values, null = np.asarray(values, dtype=bool), np.asarray(null, dtype=bool)
+            violated = ~values & ~null
+            if rule["when"] is not None:
+                applies, applies_null = self._evaluate(rule["when"], chunk, memo)
+                applies, applies_null = np.asarray(applies, dtype=bool), np.asarray(applies_null, dtype=bool)
+                violated = violated & applies & ~applies_null
+            masks[name] = np.broadcast_to(violated, len(chunk))
+        return masks
+
+    def evaluate(self, data, chunksize=100000, names=None):
+        """
+        Violation masks of every rule over a DataFrame, chunk by chunk
+
+        Args:
+            data: DataFrame holding the rule columns
+            chunksize: rows evaluated together (intermediates of one chunk stay small)
+            names: only these rules (defaults to all)
+
+        Returns:
+            dict of rule name -> numpy boolean array, True where the row breaks the rule
+        """
+        names = list(self.rules) if names is None else list(names)
+        masks = {name: np.zeros(len(data), dtype=bool) for name in names}
+        for start in range(0, len(data), chunksize):
+            chunk = data.iloc[start:start + chunksize]
+            for name, mask in self._violations(chunk, names).items():
+                masks[name][start:start + len(chunk)] = mask
+        return masks
+
+    def count_violations(self, chunks, names=None):
+        """
+        Stream chunks (ex. ClinicalDataIngestor.iter_chunks) and count violations per rule
+
+        Returns:
+            tuple: (dict of rule name -> violation count, total rows)
+        """
+        names = list(self.rules) if names is None else list(names)
+        counts = dict.fromkeys(names, 0)
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+            for name, mask in self._violations(chunk, names).items():
+                counts[name] += int(mask.sum())
+        return counts, total
@@ -4,6 +4,10 @@ import logging
 import pandas as pd 
 import numpy as np
 from datetime import datetime
+from src.data_ingestion.sampling import proportion_interval, mean_interval
+from src.data_validation.bitmaps import RowBitmap, combine
+from src.data_validation.outliers import OutlierEngine
+from src.data_validation.rules import RuleSet
 
 
 class DataValidator:
@@ -11,11 +15,34 @@ class DataValidator:
     Base validator for data quality checks and validation
     """
 
-    def __init__(self, data, logger = None):
+    def __init__(self, data, logger = None, population_size = None):
         self.data = data
         self.logger = logger or logging.getLogger(__name__)
         self.validation_results = {}
 
+        # set when data is a sample of a larger file (approximate mode)
+        self.population_size = population_size
+
+        # bit-packed row masks of failing rows per check, keyed like "range:age"
+        self.violation_bitmaps = {}
+
+    @classmethod
+    def from_sample(cls, ingestor, sample_size = 10000, seed = None, logger = None, **read_kwargs):
+        """
+        Build a validator over a reservoir sample streamed from an ingestor
+
+        args:
+            ingestor: ClinicalDataIngestor (or any ingestor with sample_rows)
+            sample_size: rows kept in the sample
+            seed: random seed for the sample
+            read_kwargs: passed to the chunked reader
+
+        returns:
+            DataValidator over the sample, with population_size set
+        """
+        sample, total_rows = ingestor.sample_rows(sample_size, seed = seed, **read_kwargs)
+        return cls(sample, logger = logger, population_size = total_rows)
+
 
     def validate_missing_data(self, threshold = 0.2):
         """
@@ -113,6 +140,7 @@ class DataValidator:
             range_rules = {}
 
         range_violations = {}
+        self._clear_bitmaps("range:")
 
         for column, rules in range_rules.items():
             if column in self.data.columns:
@@ -128,11 +156,15 @@ class DataValidator:
                 if max_val is not None:
                     violations = violations | (self.data[column] > max_val)
 
+                # every executed check keeps a bitmap, an empty one when it passed
+                key = f"range:{column}"
+                self.violation_bitmaps[key] = RowBitmap.from_mask(violations)
                 if violations.any():
                     range_violations[column] = {
                         "rules": rules,
                         "violation_count": violations.sum(),
                         "violation_percentage": violations.mean(),
+                        "bitmap_key": key,
                     }
 
         self.validation_results["range_violations"] = range_violations
@@ -140,60 +172,168 @@ class DataValidator:
 
     # ex. dictionary of rules, checks columns against rules, records violations for minmax constraints
 
+    # cross-column rules (deathDate >= birthDate, conditional ranges, code lists)
+
+    def validate_rules(self, rules = None, code_lists = None, chunksize = 100000):
+        """
+            Validate cross-column rules written in the rule expression language (see rules.py)
+
+            Args:
+                rules: dictionary mapping rule names to an expression, or to {"expr": ..., "when": ...}
+                code_lists: dictionary mapping code list names to allowed values
+                chunksize: rows evaluated together, all rules share one pass per chunk
+
+            Returns:
+                dictionary of rules with violations
+        """
+
+        rule_violations = {}
+        self._clear_bitmaps("rule:")
+
+        rule_set = RuleSet(rules or {}, code_lists)
+
+        # rules on columns this table does not have are skipped, like range rules
+        names = []
+        for name in rule_set.rules:
+            missing = [col for col in rule_set.rule_columns(name) if col not in self.data.columns]
+            if missing:
+                self.logger.warning(f"skipping rule {name}, missing columns: {missing}")
+            else:
+                names.append(name)
+
+        masks = rule_set.evaluate(self.data, chunksize = chunksize, names = names)
+
+        for name, violations in masks.items():
+            count = int(violations.sum())
+            key = f"rule:{name}"
+            self.violation_bitmaps[key] = RowBitmap.from_mask(violations)
+            if count:
+                rule_violations[name] = {
+                    "rule": rule_set.rules[name]["text"],
+                    "when": rule_set.rules[name]["when_text"],
+                    "violation_count": count,
+                    "violation_percentage": count / len(self.data),
+                    "bitmap_key": key,
+                }
+
+        self.logger.info(f"checked {len(names)} rules with {rule_set.distinct_nodes} distinct expressions "
+                         f"({rule_set.node_count} before sharing)")
+        self.validation_results["rule_violations"] = rule_violations
+        return rule_violations
+
     # outlier detection (detect statistical outliers)
 
-    def detect_outliers(self, columns = None, method = "zscore", threshold=3):
+    def detect_outliers(self, columns = None, method = "zscore", threshold=3, log_scale = False, group_by = None):
         
         """
         Detect statistical outlier in numeric columns
         
         Args:
             columns: list of columns to check (defaults to all numeric)
-            method: (zscore or iqr) 
-            threshold: for outlier classification
+            method: (zscore, iqr or mad for robust median/MAD scores)
+            threshold: for outlier classification (iqr uses 1.5 * IQR fences)
+            log_scale: score log1p(values), for count data
+            group_by: column name (ex. site) or row labels, thresholds are computed per group
         
         """
 
         if columns is None:
             columns = self.data.select_dtypes(include=np.number).columns
 
+        # a grouping column is not scored itself, row labels (Series/array) exclude nothing
+        excluded = group_by if isinstance(group_by, str) else None
+        columns = [column for column in columns if column in self.data.columns and column != excluded]
+
         outliers = {}
+        self._clear_bitmaps("outlier:")
+
+        if isinstance(group_by, str):
+            group_by = self.data[group_by]
+
+        # score the whole numeric block at once
+        engine = OutlierEngine(method, threshold, log_scale)
+        is_outlier = engine.detect(self.data[columns], groups = group_by)
+
+        outlier_counts = is_outlier.sum()
+        flagged = outlier_counts[outlier_counts > 0].index
 
         for column in columns:
-            if column in self.data.columns:
-                if method == "zscore":
-                    # how many std devs from mean
-
-                    z_scores = np.abs((self.data[column] - self.data[column].mean()) / self.data[column].std())
-                    is_outlier = z_scores > threshold
-                elif method == "iqr":
-                    # values outside of 1.5 * iqr from q1/q3
-                    Q1 = self.data[column].quantile(0.25)
-                    Q3 = self.data[column].quantile(0.75)
-                    IQR = Q3 - Q1
-                    is_outlier = (self.data[column] < (Q1 - 1.5 * IQR)) | (self.data[column] > (Q3 + 1.5 * IQR))
-                else: 
-                    raise ValueError (f"Unsupported outlier detection method: {method}")
-                
-                if is_outlier.any():
-                    outliers[column] = {
-                        "method": method,
-                        "threshold": threshold,
-                        "outlier_count": is_outlier.sum(),
-                        "outlier_percentage": is_outlier.mean(),
-                    }
+            self.violation_bitmaps[f"outlier:{column}"] = RowBitmap.from_mask(is_outlier[column])
+
+        for column in flagged:
+            key = f"outlier:{column}"
+            outliers[column] = {
+                "method": method,
+                "threshold": threshold,
+                "outlier_count": outlier_counts[column],
+                "outlier_percentage": outlier_counts[column] / len(self.data),
+                "bitmap_key": key,
+            }
+            if log_scale:
+                outliers[column]["log_scale"] = True
+            if group_by is not None:
+                outliers[column]["grouped"] = True
         self.validation_results["outliers"] = outliers
         return outliers
 
     
+    # drill-down into failing rows from the stored bitmaps, no checks are re-run
+
+    def violation_mask(self, keys, how = "union"):
+        """
+        Combine the row bitmaps of one or more checks
+
+        Args:
+            keys: bitmap key or list of keys (see violation_bitmaps, ex. "range:age")
+            how: "union" (rows failing any check) or "intersection" (rows failing all)
+
+        Returns:
+            RowBitmap over the rows of self.data
+        """
+        if isinstance(keys, str):
+            keys = [keys]
+
+        missing = [key for key in keys if key not in self.violation_bitmaps]
+        if missing:
+            raise KeyError(f"No violation bitmap for: {missing}")
+
+        return combine([self.violation_bitmaps[key] for key in keys], how)
+
+    def _clear_bitmaps(self, prefix):
+        """
+            Helper method dropping bitmaps of a check before it is re-run
+        """
+        for key in [key for key in self.violation_bitmaps if key.startswith(prefix)]:
+            del self.violation_bitmaps[key]
+
+    def violating_rows(self, keys, how = "union", limit = None):
+        """
+        Fetch the rows flagged by one or more checks
+
+        Args:
+            keys: bitmap key or list of keys
+            how: "union" or "intersection"
+            limit: return at most this many rows
+
+        Returns:
+            DataFrame of the offending rows
+        """
+        positions = self.violation_mask(keys, how).positions()
+        if limit is not None:
+            positions = positions[:limit]
+        return self.data.iloc[positions]
+
     # run all validations 
 
-    def run_all_validations(self, expected_types = None, range_rules = None, outlier_columns = None):
+    def run_all_validations(self, expected_types = None, range_rules = None, outlier_columns = None,
+                            rules = None, code_lists = None, missing_threshold = 0.2):
 
-        self.validate_missing_data()
+        self.validate_missing_data(missing_threshold)
         self.validate_data_types(expected_types)
         self.validate_value_ranges(range_rules)
         self.detect_outliers(outlier_columns) 
+        if rules:
+            self.validate_rules(rules, code_lists)
 
         # time stamp
 
@@ -202,9 +342,91 @@ class DataValidator:
         return self.validation_results
 
 
+    # approximate mode, the data is a sample and every rate gets a confidence interval
 
-    
-    
+    def run_approximate_validations(self, expected_types = None, range_rules = None, outlier_columns = None, confidence = 0.95,
+                                    rules = None, code_lists = None):
+        """
+        Run all validations on a sample and attach confidence intervals to each estimate
+
+        args:
+            expected_types: dictionary mapping column names to expected types
+            range_rules: dictionary mapping columns to min/max rules
+            outlier_columns: list of columns to check for outliers
+            confidence: confidence level of the intervals (0.95 = 95%)
+            rules: cross-column rules, see validate_rules
+            code_lists: code lists referenced by the rules
+
+        returns:
+            validation results, with an "approximate" section of estimates and intervals
+        """
+        self.run_all_validations(expected_types, range_rules, outlier_columns, rules, code_lists)
+
+        n = len(self.data)
+        population = self.population_size or n
+
+        def estimate(successes):
+            low, high = proportion_interval(int(successes), n, confidence, population)
+            rate = successes / n if n else 0.0
+            return {"estimate": float(rate), "interval": (low, high), "estimated_count": int(round(rate * population))}
+
+        # completeness, overall from per-row completeness and per column rates
+
+        row_completeness = 1 - self.data.isna().mean(axis = 1)
+        missing_counts = self.data.isna().sum()
+
+        completeness = {
+            "estimate": float(row_completeness.mean()) if n else 0.0,
+            "interval": mean_interval(row_completeness, confidence, population)
+        }
+        missing_rates = {col: estimate(missing_counts[col]) for col in self.data.columns}
+
+        # type checks on individual values, not just the sample dtype
+
+        type_violation_rates = {}
+        for column, expected in (expected_types or {}).items():
+            if column in self.data.columns:
+                type_violation_rates[column] = estimate(self._type_violation_mask(self.data[column], expected).sum())
+
+        # range violations, outliers and rules as rates over the sample, from the bitmaps of
+        # every executed check so a check without sampled violations still gets 0 and its bound
+
+        def check_rates(prefix):
+            return {key[len(prefix):]: estimate(bitmap.count())
+                    for key, bitmap in self.violation_bitmaps.items() if key.startswith(prefix)}
+
+        range_violation_rates = check_rates("range:")
+        outlier_rates = check_rates("outlier:")
+        rule_violation_rates = check_rates("rule:")
+
+        self.validation_results["approximate"] = {
+            "sample_size": n,
+            "population_size": population,
+            "confidence": confidence,
+            "completeness": completeness,
+            "missing_rates": missing_rates,
+            "type_violation_rates": type_violation_rates,
+            "range_violation_rates": range_violation_rates,
+            "outlier_rates": outlier_rates,
+            "rule_violation_rates": rule_violation_rates
+        }
+
+        return self.validation_results
+
+    def _type_violation_mask(self, series, expected):
+        """
+            Helper method flagging non-missing values that do not parse as the expected type
+        """
+        present = series.notna()
+
+        if expected == "numeric":
+            parsed = pd.to_numeric(series, errors = "coerce")
+        elif expected == "datetime":
+            parsed = pd.to_datetime(series, errors = "coerce", format = "mixed")
+        elif expected == "string" or expected == "categorical":
+            return present & ~series.map(lambda v: isinstance(v, str)).astype(bool)
+        else:
+            return present & ~pd.Series(self._is_compatible_type(series.dtype, expected), index = series.index)
+
+        return present & parsed.isna()
 
-    
-            
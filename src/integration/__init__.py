@@ -0,0 +1,5 @@
+
+# src/integration/__init__.py
+
+
+from .store import MultiOmicsStore
@@ -0,0 +1,477 @@
+# src/integration/store.py
+
+import io
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.cache import write_frame, read_frame
+
+# on-disk store that aligns clinical tables and omics matrices on one shared sample axis
+#
+# layout:
+#   <root>/manifest.json                  samples + modality descriptions
+#   <root>/<matrix>/features.json         feature ids of a matrix modality
+#   <root>/<matrix>/g<gene block>_s<sample block>.npy.z   zlib compressed chunks
+#   <root>/<table>/s<sample block>.parquet (or .pkl)      clinical rows per sample block
+#
+# every write appends new sample blocks, existing chunks are never rewritten
+
+MANIFEST = "manifest.json"
+
+
+class MultiOmicsStore:
+    """
+    Chunked store of omics matrices (features x samples) and clinical tables (samples x columns)
+    """
+
+    def __init__(self, root, logger=None):
+        self.root = root
+        self.logger = logger or logging.getLogger(__name__)
+        os.makedirs(root, exist_ok=True)
+
+        self.manifest = self._load_manifest()
+        self._features = {}
+
+    # manifest handling
+
+    def _load_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {"version": 1, "samples": [], "modalities": {}}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        self.manifest["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        _write_json(os.path.join(self.root, MANIFEST), self.manifest)
+
+    @property
+    def samples(self):
+        """Shared sample axis (sample ids in insertion order)"""
+        return list(self.manifest["samples"])
+
+    @property
+    def modalities(self):
+        """Modality names and kinds"""
+        return {name: info["kind"] for name, info in self.manifest["modalities"].items()}
+
+    def features(self, modality):
+        """Feature ids of a matrix modality, or column names of a table modality"""
+        info = self._modality(modality)
+        if info["kind"] == "table":
+            return list(info["columns"])
+
+        if modality not in self._features:
+            with open(os.path.join(self.root, modality, "features.json")) as f:
+                self._features[modality] = pd.Index(json.load(f))
+        return list(self._features[modality])
+
+    def modality_samples(self, modality):
+        """Samples present in a modality"""
+        info = self._modality(modality)
+        all_samples = self.manifest["samples"]
+        return [all_samples[p] for block in info["sample_blocks"] for p in block]
+
+    def _modality(self, modality):
+        if modality not in self.manifest["modalities"]:
+            raise KeyError(f"Unknown modality: {modality}")
+        return self.manifest["modalities"][modality]
+
+    def _register_samples(self, info, sample_ids):
+        """Add new ids to the shared axis, return their global positions"""
+        sample_ids = [str(s) for s in sample_ids]
+        if len(set(sample_ids)) != len(sample_ids):
+            raise ValueError("duplicate sample ids in write")
+
+        positions = {s: i for i, s in enumerate(self.manifest["samples"])}
+        present = {p for block in info["sample_blocks"] for p in block}
+        stored = [s for s in sample_ids if positions.get(s) in present]
+        if stored:
+            raise ValueError(f"samples already stored in this modality: {stored[:5]}")
+
+        result = []
+        for sample in sample_ids:
+            if sample not in positions:
+                positions[sample] = len(self.manifest["samples"])
+                self.manifest["samples"].append(sample)
+            result.append(positions[sample])
+
+        return result
+
+    # writing
+
+    def create_matrix(self, modality, features, dtype, feature_chunk=1024, sample_chunk=64, compression_level=1):
+        """
+        Create an empty matrix modality with a fixed feature axis
+
+        Args:
+            modality: modality name (ex. "rnaseq")
+            features: feature ids in storage order
+            dtype: storage dtype
+            feature_chunk: features per chunk
+            sample_chunk: samples per chunk
+            compression_level: zlib level per chunk
+
+        Returns:
+            modality description stored in the manifest
+        """
+        if modality in self.manifest["modalities"]:
+            raise ValueError(f"modality {modality} already exists")
+
+        directory = os.path.join(self.root, modality)
+        os.makedirs(directory, exist_ok=True)
+        features = [str(f) for f in features]
+        _write_json(os.path.join(directory, "features.json"), features)
+        self._features[modality] = pd.Index(features)
+
+        info = {
+            "kind": "matrix",
+            "num_features": len(features),
+            "feature_chunk": feature_chunk,
+            "sample_chunk": sample_chunk,
+            "dtype": str(np.dtype(dtype)),
+            "compression": "zlib",
+            "compression_level": compression_level,
+            "sample_blocks": []
+        }
+        self.manifest["modalities"][modality] = info
+        self._save_manifest()
+        return info
+
+    def write_matrix(self, modality, matrix, feature_chunk=1024, sample_chunk=64, dtype=None, compression_level=1,
+                     duplicates="sum"):
+        """
+        Create a matrix modality or append samples to it
+
+        Args:
+            modality: modality name (ex. "rnaseq")
+            matrix: DataFrame with features as rows and samples as columns (count matrix layout)
+            feature_chunk: features per chunk (fixed when the modality is created)
+            sample_chunk: samples per chunk (fixed when the modality is created)
+            dtype: storage dtype, defaults to the matrix dtype on creation
+            compression_level: zlib level per chunk
+            duplicates: rows sharing a feature id are "sum"med, the "first" one is kept,
+                or they raise ("error")
+
+        Returns:
+            list of sample ids written
+        """
+        info = self.manifest["modalities"].get(modality)
+        if info is not None and info["kind"] != "matrix":
+            raise ValueError(f"modality {modality} is a {info['kind']}, not a matrix")
+
+        sample_ids = [str(s) for s in matrix.columns]
+        if len(set(sample_ids)) != len(sample_ids):
+            raise ValueError("duplicate sample ids in write")
+
+        # everything is checked and aligned before anything is written, a failed write
+        # leaves no half-created modality behind
+        row_ids = matrix.index.astype(str)
+        if info is None:
+            features = pd.Index(pd.unique(row_ids))
+            store_dtype = np.dtype(dtype if dtype else np.result_type(*matrix.dtypes))
+        else:
+            features = pd.Index(self.features(modality))
+            store_dtype = np.dtype(info["dtype"])
+
+        # positional join of the rows on the feature axis, repeated ids follow the policy
+        target = features.get_indexer(row_ids)
+        unknown = int((target < 0).sum())
+        if unknown:
+            self.logger.warning(f"dropping {unknown} features not in modality {modality}")
+        rows, has_duplicates = resolve_duplicates(target, duplicates, modality)
+
+        source = matrix.to_numpy()
+        filled = np.zeros(len(features), dtype=bool)
+        filled[target[rows]] = True
+        if not filled.all() or pd.isna(source[rows]).any():
+            if not np.issubdtype(store_dtype, np.floating):
+                raise ValueError(f"missing values or features for integer modality {modality}")
+
+        values = np.full((len(features), len(sample_ids)), np.nan if store_dtype.kind == "f" else 0, dtype=store_dtype)
+        if has_duplicates and duplicates == "sum":
+            values[target[rows]] = 0
+            np.add.at(values, target[rows], source[rows].astype(store_dtype))
+        else:
+            values[target[rows]] = source[rows]
+
+        if info is None:
+            self.create_matrix(modality, features, store_dtype, feature_chunk=feature_chunk,
+                               sample_chunk=sample_chunk, compression_level=compression_level)
+
+        self.append_matrix_values(modality, values, sample_ids)
+        return sample_ids
+
+    def append_matrix_values(self, modality, values, sample_ids):
+        """
+        Append samples to a matrix modality from an array already in the stored feature order
+
+        Args:
+            modality: modality name
+            values: array features x samples
+            sample_ids: ids of the columns of values
+
+        Returns:
+            list of sample ids written
+        """
+        info = self._modality(modality)
+        if info["kind"] != "matrix":
+            raise ValueError(f"modality {modality} is a {info['kind']}, not a matrix")
+        if values.shape != (info["num_features"], len(sample_ids)):
+            raise ValueError(f"expected a {info['num_features']} x {len(sample_ids)} array for {modality}, "
+                             f"got {values.shape[0]} x {values.shape[1]}")
+
+        values = values.astype(info["dtype"], copy=False)
+        positions = self._register_samples(info, sample_ids)
+        directory = os.path.join(self.root, modality)
+
+        # new samples always start new sample blocks
+        f_chunk, s_chunk = info["feature_chunk"], info["sample_chunk"]
+        for start in range(0, len(positions), s_chunk):
+            block_id = len(info["sample_blocks"])
+            block = values[:, start:start + s_chunk]
+            for g, f_start in enumerate(range(0, info["num_features"], f_chunk)):
+                _write_chunk(os.path.join(directory, f"g{g}_s{block_id}.npy.z"),
+                             block[f_start:f_start + f_chunk], info["compression_level"])
+            info["sample_blocks"].append(positions[start:start + s_chunk])
+
+        self._save_manifest()
+        self.logger.info(f"wrote {len(positions)} samples x {info['num_features']} features to {modality}")
+        return [str(s) for s in sample_ids]
+
+    def write_table(self, modality, table, sample_chunk=1024):
+        """
+        Create a table modality (clinical rows indexed by sample id) or append rows to it,
+        appended rows need the same columns (in any order)
+
+        Args:
+            modality: modality name (ex. "clinical")
+            table: DataFrame indexed by sample id
+            sample_chunk: rows per stored block
+
+        Returns:
+            list of sample ids written
+        """
+        info = self.manifest["modalities"].get(modality)
+        directory = os.path.join(self.root, modality)
+
+        table = table.copy()
+        table.columns = [str(c) for c in table.columns]
+
+        if info is None:
+            info = {"kind": "table", "columns": list(table.columns), "sample_blocks": []}
+        elif info["kind"] != "table":
+            raise ValueError(f"modality {modality} is a {info['kind']}, not a table")
+        elif set(table.columns) != set(info["columns"]):
+            added = [c for c in table.columns if c not in info["columns"]]
+            missing = [c for c in info["columns"] if c not in table.columns]
+            raise ValueError(f"columns of {modality} differ from the stored table, new: {added}, missing: {missing}")
+
+        table = table[info["columns"]]
+        positions = self._register_samples(info, table.index)
+
+        # registered only once the samples are accepted, a failed first write leaves nothing behind
+        if modality not in self.manifest["modalities"]:
+            os.makedirs(directory, exist_ok=True)
+            self.manifest["modalities"][modality] = info
+
+        for start in range(0, len(positions), sample_chunk):
+            block_id = len(info["sample_blocks"])
+            block = table.iloc[start:start + sample_chunk]
+            block.index = block.index.astype(str)
+            path = write_frame(block, os.path.join(directory, f"s{block_id}"))
+            info.setdefault("block_files", []).append(os.path.basename(path))
+            info["sample_blocks"].append(positions[start:start + sample_chunk])
+
+        self._save_manifest()
+        self.logger.info(f"wrote {len(positions)} rows to {modality}")
+        return [str(s) for s in table.index]
+
+    # reading, only the chunks a query touches are opened
+
+    def _sample_selection(self, info, samples):
+        """
+        Map requested sample ids to (block id, offset inside block, output position)
+        """
+        all_samples = self.manifest["samples"]
+        located = {}
+        for block_id, block in enumerate(info["sample_blocks"]):
+            for offset, p in enumerate(block):
+                located[all_samples[p]] = (block_id, offset)
+
+        if samples is None:
+            samples = [all_samples[p] for block in info["sample_blocks"] for p in block]
+
+        selection = []
+        for out, sample in enumerate(samples):
+            if str(sample) in located:
+                block_id, offset = located[str(sample)]
+                selection.append((block_id, offset, out))
+
+        return [str(s) for s in samples], selection
+
+    def read_matrix(self, modality, samples=None, features=None):
+        """
+        Subset of a matrix modality
+
+        Args:
+            modality: modality name
+            samples: sample ids (all samples of the modality if None), samples missing
+                from the modality come back as NaN columns
+            features: feature ids (all if None)
+
+        Returns:
+            DataFrame features x samples
+        """
+        info = self._modality(modality)
+        if info["kind"] != "matrix":
+            raise ValueError(f"modality {modality} is a {info['kind']}, not a matrix")
+
+        all_features = pd.Index(self.features(modality))
+        if features is None:
+            feature_positions = np.arange(len(all_features))
+            features = all_features
+        else:
+            features = pd.Index([str(f) for f in features])
+            feature_positions = all_features.get_indexer(features)
+
+        samples, selection = self._sample_selection(info, samples)
+
+        store_dtype = np.dtype(info["dtype"])
+        out_dtype = store_dtype if len(selection) == len(samples) and (feature_positions >= 0).all() else np.float64
+        out = np.full((len(features), len(samples)), np.nan if out_dtype.kind == "f" else 0, dtype=out_dtype)
+
+        f_chunk = info["feature_chunk"]
+        valid = np.flatnonzero(feature_positions >= 0)
+        gene_blocks = feature_positions[valid] // f_chunk
+
+        by_block = {}
+        for block_id, offset, column in selection:
+            by_block.setdefault(block_id, []).append((offset, column))
+
+        directory = os.path.join(self.root, modality)
+        for g in np.unique(gene_blocks):
+            rows_out = valid[gene_blocks == g]
+            rows_in = feature_positions[rows_out] - g * f_chunk
+            for block_id, pairs in by_block.items():
+                chunk = _read_chunk(os.path.join(directory, f"g{g}_s{block_id}.npy.z"))
+                offsets = [o for o, _ in pairs]
+                columns = [c for _, c in pairs]
+                out[np.ix_(rows_out, columns)] = chunk[np.ix_(rows_in, offsets)]
+
+        return pd.DataFrame(out, index=features, columns=samples)
+
+    def read_table(self, modality, samples=None, columns=None):
+        """
+        Rows of a table modality
+
+        Args:
+            modality: modality name
+            samples: sample ids (all if None), only blocks holding them are read
+            columns: columns to return (all if None)
+
+        Returns:
+            DataFrame indexed by sample id
+        """
+        info = self._modality(modality)
+        if info["kind"] != "table":
+            raise ValueError(f"modality {modality} is a {info['kind']}, not a table")
+
+        samples, selection = self._sample_selection(info, samples)
+        directory = os.path.join(self.root, modality)
+
+        parts = []
+        for block_id in sorted({block_id for block_id, _, _ in selection}):
+            parts.append(read_frame(os.path.join(directory, info["block_files"][block_id]), columns=columns))
+
+        if parts:
+            table = pd.concat(parts)
+        else:
+            table = pd.DataFrame(columns=columns or info["columns"])
+
+        return table.reindex(samples)
+
+    def aligned(self, samples=None, matrix_features=None, table_columns=None):
+        """
+        All modalities restricted to the same samples
+
+        Args:
+            samples: sample ids, defaults to samples present in every modality
+            matrix_features: dict of modality -> feature ids
+            table_columns: dict of modality -> columns
+
+        Returns:
+            dict of modality -> DataFrame (matrices features x samples, tables samples x columns)
+        """
+        if samples is None:
+            shared = None
+            for modality in self.manifest["modalities"]:
+                present = set(self.modality_samples(modality))
+                shared = present if shared is None else shared & present
+            samples = [s for s in self.manifest["samples"] if shared and s in shared]
+
+        result = {}
+        for modality, info in self.manifest["modalities"].items():
+            if info["kind"] == "matrix":
+                result[modality] = self.read_matrix(modality, samples, (matrix_features or {}).get(modality))
+            else:
+                result[modality] = self.read_table(modality, samples, (table_columns or {}).get(modality))
+
+        return result
+
+
+def resolve_duplicates(target, policy, name):
+    """
+    Rows to keep of a positional join, with repeated targets handled by policy
+
+    Args:
+        target: feature position of every source row (-1 for rows not joined)
+        policy: "sum" keeps every row (caller adds them up), "first" keeps the first row
+            of each feature, "error" raises
+        name: what is written, for the error message
+
+    Returns:
+        tuple: (ascending source rows, whether any target repeats)
+    """
+    if policy not in ("sum", "first", "error"):
+        raise ValueError(f"Unsupported duplicate policy: {policy}")
+
+    rows = np.flatnonzero(target >= 0)
+    order = np.argsort(target[rows], kind="stable")
+    sorted_targets = target[rows][order]
+    repeated = np.zeros(len(sorted_targets), dtype=bool)
+    repeated[1:] = sorted_targets[1:] == sorted_targets[:-1]
+
+    if repeated.any():
+        if policy == "error":
+            raise ValueError(f"{name} has {int(repeated.sum())} duplicated feature rows")
+        if policy == "first":
+            rows = np.sort(rows[order][~repeated])
+
+    return rows, bool(repeated.any())
+
+
+def _write_json(path, payload):
+    # write then rename, readers never see a partial file
+    with open(path + ".tmp", "w") as f:
+        json.dump(payload, f)
+    os.replace(path + ".tmp", path)
+
+
+def _write_chunk(path, array, level):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    with open(path + ".tmp", "wb") as f:
+        f.write(zlib.compress(buffer.getvalue(), level))
+    os.replace(path + ".tmp", path)
+
+
+def _read_chunk(path):
+    with open(path, "rb") as f:
+        return np.load(io.BytesIO(zlib.decompress(f.read())), allow_pickle=False)
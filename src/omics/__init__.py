@@ -0,0 +1,23 @@
+
+# src/omics/__init__.py
+
+from importlib import import_module
+
+# submodules load on first attribute access, so importing one analysis
+# (ex. the gene index for the dashboard) does not import the others
+
+_EXPORTS = {
+    "CoexpressionEngine": ".coexpression",
+    "DifferentialExpression": ".differential",
+    "EmbeddingService": ".embedding",
+    "CountMatrixIndex": ".gene_index",
+    "CountMatrixMerger": ".merge",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
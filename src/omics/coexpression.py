@@ -0,0 +1,170 @@
+# src/omics/coexpression.py
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# gene-gene co-expression without the dense genes x genes correlation matrix
+#
+# genes are standardized once so a correlation tile is a plain matrix product of two
+# gene blocks; each block of genes walks across all column blocks keeping only its
+# top k partners, so memory is one tile per worker plus genes x k for the result.
+# numpy releases the GIL inside matmul/argpartition, so a thread pool uses every core
+
+
+def _standardize(matrix, pseudocount, normalize):
+    """
+    log2 normalized expression scaled so row dot products are Pearson correlations
+
+    Returns:
+        (float32 genes x samples array, boolean mask of genes with non-zero variance)
+    """
+    values = np.asarray(matrix, dtype=np.float64)
+    if normalize == "cpm":
+        totals = values.sum(axis=0)
+        values = values / np.where(totals > 0, totals, 1) * 1e6
+    values = np.log2(values + pseudocount)
+
+    centered = values - values.mean(axis=1, keepdims=True)
+    norms = np.sqrt((centered ** 2).sum(axis=1))
+    varying = norms > 0
+
+    scaled = np.zeros_like(centered)
+    scaled[varying] = centered[varying] / norms[varying, None]
+    return scaled.astype(np.float32), varying
+
+
+class CoexpressionEngine:
+    """
+    Blocked top-k Pearson co-expression over a count matrix
+    """
+
+    def __init__(self, top_k=10, block_size=2048, absolute=False, normalize="cpm",
+                 pseudocount=1.0, n_jobs=-1, logger=None):
+        """
+        Args:
+            top_k: partners kept per gene
+            block_size: genes per tile side
+            absolute: rank partners by |r| (keeps strong negative correlations too)
+            normalize: "cpm" or None for values that are already normalized
+            pseudocount: added before taking logs
+            n_jobs: worker threads (-1 = every core)
+        """
+        if normalize not in ("cpm", None):
+            raise ValueError(f"Unsupported normalization: {normalize}")
+
+        self.top_k = top_k
+        self.block_size = block_size
+        self.absolute = absolute
+        self.normalize = normalize
+        self.pseudocount = pseudocount
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _merge_dense(self, best_scores, best_index, scores, col_ids):
+        """Merge a whole tile into the running top k (argpartition per row)"""
+        k = self.top_k
+        merged_scores = np.hstack([best_scores, scores])
+        merged_index = np.hstack([best_index, np.broadcast_to(col_ids, scores.shape)])
+        keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        return np.take_along_axis(merged_scores, keep, axis=1), np.take_along_axis(merged_index, keep, axis=1)
+
+    def _merge_sparse(self, best_scores, best_index, scores, col_ids, rows, cols):
+        """Merge only the tile cells that beat a row's current k-th score"""
+        n_rows, k = best_scores.shape
+        row_of = np.concatenate([np.repeat(np.arange(n_rows), k), rows])
+        merged_scores = np.concatenate([best_scores.ravel(), scores[rows, cols]])
+        merged_index = np.concatenate([best_index.ravel(), col_ids[cols]])
+
+        # sort by row, best score first, and keep the first k of every row
+        order = np.lexsort((-merged_scores, row_of))
+        row_sorted = row_of[order]
+        rank = np.arange(len(order)) - np.searchsorted(row_sorted, row_sorted)
+        keep = order[rank < k]
+        return merged_scores[keep].reshape(n_rows, k), merged_index[keep].reshape(n_rows, k)
+
+    def _row_block(self, z, start):
+        """Top k partners of the genes in one row block, scanning every column block"""
+        rows = z[start:start + self.block_size]
+        n_rows, k = len(rows), self.top_k
+
+        best_scores = np.full((n_rows, k), -np.inf, dtype=np.float32)
+        best_index = np.full((n_rows, k), -1, dtype=np.int64)
+
+        for col_start in range(0, len(z), self.block_size):
+            tile = rows @ z[col_start:col_start + self.block_size].T
+            col_ids = np.arange(col_start, col_start + tile.shape[1])
+
+            scores = np.abs(tile) if self.absolute else tile
+            # a gene is not its own partner
+            lo, hi = max(start, col_start), min(start + n_rows, col_start + tile.shape[1])
+            if lo < hi:
+                diagonal = np.arange(lo, hi)
+                scores[diagonal - start, diagonal - col_start] = -np.inf
+
+            # once the running top k fills up, few cells beat the k-th score,
+            # those are merged without partitioning the whole tile
+            candidates = scores > best_scores.min(axis=1)[:, None]
+            if candidates.sum() > 4 * n_rows * k:
+                best_scores, best_index = self._merge_dense(best_scores, best_index, scores, col_ids)
+            else:
+                cand_rows, cand_cols = np.nonzero(candidates)
+                if len(cand_rows):
+                    best_scores, best_index = self._merge_sparse(best_scores, best_index, scores, col_ids,
+                                                                 cand_rows, cand_cols)
+
+        # strongest partner first
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_index, order, axis=1)
+
+    def top_partners(self, counts):
+        """
+        Top k co-expressed partners of every gene
+
+        Args:
+            counts: genes x samples DataFrame, or a CountMatrixIndex
+
+        Returns:
+            edge list DataFrame with columns gene, partner, correlation, rank
+            (genes with constant expression are left out)
+        """
+        if hasattr(counts, "matrix"):
+            matrix, genes = counts.matrix, np.asarray(counts.genes, dtype=object)
+        else:
+            matrix, genes = counts.to_numpy(), np.asarray(counts.index, dtype=object)
+
+        z, varying = _standardize(matrix, self.pseudocount, self.normalize)
+        z, genes = np.ascontiguousarray(z[varying]), genes[varying]
+        if len(z) < 2:
+            return pd.DataFrame(columns=["gene", "partner", "correlation", "rank"])
+
+        starts = range(0, len(z), self.block_size)
+        if self.n_jobs and self.n_jobs > 1:
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+                parts = list(pool.map(lambda s: self._row_block(z, s), starts))
+        else:
+            parts = [self._row_block(z, s) for s in starts]
+
+        scores = np.vstack([p[0] for p in parts])
+        index = np.vstack([p[1] for p in parts])
+        k = index.shape[1]
+
+        # with fewer than k other genes the unused slots stay at -inf
+        found = np.isfinite(scores)
+        source = np.repeat(np.arange(len(z)), k).reshape(index.shape)
+        pairs_source, pairs_target = source[found], index[found]
+        # score may be |r|, report the signed correlation of each pair
+        correlation = np.einsum("ij,ij->i", z[pairs_source], z[pairs_target])
+
+        edges = pd.DataFrame({
+            "gene": genes[pairs_source],
+            "partner": genes[pairs_target],
+            "correlation": np.clip(correlation, -1.0, 1.0),
+            "rank": np.tile(np.arange(1, k + 1), len(z)).reshape(index.shape)[found],
+        })
+
+        self.logger.info(f"co-expression: {len(z)} genes, {len(edges)} edges (top {self.top_k})")
+        return edges
@@ -0,0 +1,220 @@
+# src/omics/differential.py
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# per-gene differential expression between two condition groups of a count matrix
+#
+# the matrix is processed in blocks of genes, every statistic is computed for the whole
+# block at once (vectorized along the gene axis), so memory stays bounded by the block
+# size and blocks can be farmed out to worker processes
+
+RESULT_COLUMNS = [
+    "mean_a", "mean_b", "log2_fold_change",
+    "t_statistic", "t_pvalue", "t_padj",
+    "u_statistic", "u_pvalue", "u_padj",
+]
+
+
+def condition_groups(samples, separator="_"):
+    """
+    Group sample names by their condition prefix (KI_3, KI_4, SAA_4 -> KI, SAA)
+
+    Returns:
+        dict of condition -> list of samples, in order of first appearance
+    """
+    groups = {}
+    for sample in samples:
+        groups.setdefault(str(sample).split(separator)[0], []).append(sample)
+    return groups
+
+
+def benjamini_hochberg(pvalues):
+    """
+    Benjamini-Hochberg adjusted p-values, NaN p-values are skipped and stay NaN
+
+    Args:
+        pvalues: array of p-values
+
+    Returns:
+        numpy array of adjusted p-values in the input order
+    """
+    pvalues = np.asarray(pvalues, dtype=float)
+    adjusted = np.full(pvalues.shape, np.nan)
+
+    tested = np.flatnonzero(~np.isnan(pvalues))
+    n = len(tested)
+    if n == 0:
+        return adjusted
+
+    order = tested[np.argsort(pvalues[tested], kind="stable")]
+    scaled = pvalues[order] * n / np.arange(1, n + 1)
+
+    # running minimum from the largest p-value down keeps the adjusted values monotone
+    adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    return adjusted
+
+
+def _block_statistics(block_a, block_b, pseudocount):
+    """
+    Statistics for one block of genes (rows) on log2 normalized expression
+
+    Args:
+        block_a: normalized expression of group a (genes x samples)
+        block_b: normalized expression of group b (genes x samples)
+        pseudocount: added before taking logs
+
+    Returns:
+        numpy array (genes x 7): mean_a, mean_b, log2 fold change, t, t p-value, U, U p-value
+    """
+    from scipy import stats
+
+    mean_a = block_a.mean(axis=1)
+    mean_b = block_b.mean(axis=1)
+    log2_fc = np.log2(mean_b + pseudocount) - np.log2(mean_a + pseudocount)
+
+    log_a = np.log2(block_a + pseudocount)
+    log_b = np.log2(block_b + pseudocount)
+
+    # constant genes (mostly all-zero) give 0/0, those rows are left as NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        welch = stats.ttest_ind(log_a, log_b, axis=1, equal_var=False)
+
+    u_stat = np.full(len(block_a), np.nan)
+    u_pvalue = np.full(len(block_a), np.nan)
+    combined = np.sort(np.hstack([log_a, log_b]), axis=1)
+    varying = combined[:, -1] > combined[:, 0]
+    tied = (np.diff(combined, axis=1) == 0).any(axis=1)
+
+    # scipy picks one method for the whole call, so rows without ties are tested
+    # separately to keep the exact distribution for small groups
+    for rows in (varying & ~tied, varying & tied):
+        if rows.any():
+            mwu = stats.mannwhitneyu(log_a[rows], log_b[rows], axis=1, alternative="two-sided")
+            u_stat[rows] = mwu.statistic
+            u_pvalue[rows] = mwu.pvalue
+
+    return np.column_stack([mean_a, mean_b, log2_fc, welch.statistic, welch.pvalue, u_stat, u_pvalue])
+
+
+class DifferentialExpression:
+    """
+    Vectorized, block-wise differential expression between two groups of samples
+
+    Each gene gets the group means of the normalized counts, the log2 fold change
+    (b over a), a Welch t-test and a Mann-Whitney U test on log2 expression, and
+    Benjamini-Hochberg adjusted p-values for both tests.
+    """
+
+    def __init__(self, block_size=8192, normalize="cpm", pseudocount=1.0, n_jobs=1, logger=None):
+        """
+        Args:
+            block_size: genes per block
+            normalize: "cpm" (counts per million of each sample) or None for raw values
+            pseudocount: added before taking logs
+            n_jobs: worker processes for the blocks (1 = in process, -1 = every core)
+        """
+        if normalize not in ("cpm", None):
+            raise ValueError(f"Unsupported normalization: {normalize}")
+
+        self.block_size = block_size
+        self.normalize = normalize
+        self.pseudocount = pseudocount
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _library_sizes(self, matrix, columns):
+        """Per-sample totals, summed block by block so memmaps are never read whole"""
+        totals = np.zeros(len(columns))
+        for start in range(0, matrix.shape[0], self.block_size):
+            totals += np.asarray(matrix[start:start + self.block_size][:, columns], dtype=float).sum(axis=0)
+        return totals
+
+    def _blocks(self, matrix, columns_a, columns_b, scale_a, scale_b):
+        """Normalized (group a, group b) blocks of genes"""
+        for start in range(0, matrix.shape[0], self.block_size):
+            block = np.asarray(matrix[start:start + self.block_size], dtype=float)
+            yield block[:, columns_a] * scale_a, block[:, columns_b] * scale_b
+
+    def compare(self, counts, group_a, group_b):
+        """
+        Compare two groups of samples for every gene
+
+        Args:
+            counts: genes x samples DataFrame, or a CountMatrixIndex (read from its memmap)
+            group_a: sample names of the reference group
+            group_b: sample names of the compared group
+
+        Returns:
+            DataFrame indexed by gene with RESULT_COLUMNS, sorted like the input
+        """
+        if hasattr(counts, "matrix"):
+            matrix, genes, samples = counts.matrix, counts.genes, list(counts.samples)
+        else:
+            matrix, genes, samples = counts.to_numpy(), counts.index, list(counts.columns)
+
+        missing = [s for s in list(group_a) + list(group_b) if s not in samples]
+        if missing:
+            raise KeyError(f"Unknown samples: {missing}")
+        if len(group_a) < 2 or len(group_b) < 2:
+            raise ValueError("each group needs at least two samples")
+
+        columns_a = [samples.index(s) for s in group_a]
+        columns_b = [samples.index(s) for s in group_b]
+
+        if self.normalize == "cpm":
+            totals = self._library_sizes(matrix, columns_a + columns_b)
+            scale = 1e6 / np.where(totals > 0, totals, 1)
+            scale_a, scale_b = scale[:len(columns_a)], scale[len(columns_a):]
+        else:
+            scale_a, scale_b = 1.0, 1.0
+
+        blocks = self._blocks(matrix, columns_a, columns_b, scale_a, scale_b)
+        if self.n_jobs and self.n_jobs > 1:
+            # at most two blocks per worker are in flight, the next block is only read
+            # and normalized once the oldest result is collected
+            parts = []
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                for a, b in blocks:
+                    if len(pending) >= 2 * self.n_jobs:
+                        parts.append(pending.popleft().result())
+                    pending.append(pool.submit(_block_statistics, a, b, self.pseudocount))
+                parts.extend(f.result() for f in pending)
+        else:
+            parts = [_block_statistics(a, b, self.pseudocount) for a, b in blocks]
+
+        stats = np.vstack(parts) if parts else np.empty((0, 7))
+        result = pd.DataFrame({
+            "mean_a": stats[:, 0],
+            "mean_b": stats[:, 1],
+            "log2_fold_change": stats[:, 2],
+            "t_statistic": stats[:, 3],
+            "t_pvalue": stats[:, 4],
+            "t_padj": benjamini_hochberg(stats[:, 4]),
+            "u_statistic": stats[:, 5],
+            "u_pvalue": stats[:, 6],
+            "u_padj": benjamini_hochberg(stats[:, 6]),
+        }, index=pd.Index(genes, name="gene"))
+
+        self.logger.info(f"compared {len(group_b)} vs {len(group_a)} samples over {len(result)} genes")
+        return result[RESULT_COLUMNS]
+
+    def compare_conditions(self, counts, condition_a, condition_b, separator="_"):
+        """
+        Compare two conditions named by sample prefix (ex. "KI" vs "SAA")
+
+        Returns:
+            DataFrame, see compare
+        """
+        samples = counts.samples if hasattr(counts, "matrix") else counts.columns
+        groups = condition_groups(samples, separator)
+        for condition in (condition_a, condition_b):
+            if condition not in groups:
+                raise KeyError(f"No samples for condition {condition}, found: {list(groups)}")
+        return self.compare(counts, groups[condition_a], groups[condition_b])
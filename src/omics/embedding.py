@@ -0,0 +1,256 @@
+# src/omics/embedding.py
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.cache import DEFAULT_CACHE_DIR, file_fingerprint, read_frame, write_frame
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# low dimensional embeddings of the samples of a count matrix (genes x samples)
+#
+# two fits:
+#   svd          randomized truncated SVD of the in-memory samples x genes matrix
+#   incremental  streams gene chunks from the csv, accumulating the samples x samples
+#                Gram matrix; genes are centered within their own chunk, so the result
+#                is the exact PCA with memory bounded by one chunk
+#
+# results are cached on disk by data hash and embedding settings
+
+
+def _flip_signs(scores):
+    """Deterministic component signs: the largest absolute score of each component is positive"""
+    largest = np.argmax(np.abs(scores), axis=0)
+    signs = np.sign(scores[largest, np.arange(scores.shape[1])])
+    return scores * np.where(signs == 0, 1, signs)
+
+
+def randomized_svd(matrix, n_components, n_oversamples=10, n_iter=4, seed=0):
+    """
+    Truncated SVD by random projection (Halko, Martinsson and Tropp)
+
+    Args:
+        matrix: 2-d array
+        n_components: singular vectors to keep
+        n_oversamples: extra random directions for accuracy
+        n_iter: power iterations, help when the spectrum decays slowly
+
+    Returns:
+        U, S, Vt truncated to n_components
+    """
+    rng = np.random.default_rng(seed)
+    size = min(n_components + n_oversamples, *matrix.shape)
+
+    # range finder, re-orthonormalized after every power iteration
+    q, _ = np.linalg.qr(matrix @ rng.standard_normal((matrix.shape[1], size)))
+    for _ in range(n_iter):
+        q, _ = np.linalg.qr(matrix.T @ q)
+        q, _ = np.linalg.qr(matrix @ q)
+
+    u_small, s, vt = np.linalg.svd(q.T @ matrix, full_matrices=False)
+    u = q @ u_small
+    return u[:, :n_components], s[:n_components], vt[:n_components]
+
+
+def normalize_counts(block, library_sizes=None, normalize="cpm", log=True):
+    """
+    Normalize a block of counts (genes x samples)
+
+    Args:
+        block: array of counts
+        library_sizes: per-sample totals over the whole matrix (needed for cpm on chunks)
+        normalize: "cpm" or None
+        log: take log2(x + 1)
+
+    Returns:
+        float array shaped like block
+    """
+    values = np.asarray(block, dtype=float)
+    if normalize == "cpm":
+        totals = values.sum(axis=0) if library_sizes is None else np.asarray(library_sizes, dtype=float)
+        values = values / np.where(totals > 0, totals, 1) * 1e6
+    elif normalize is not None:
+        raise ValueError(f"Unsupported normalization: {normalize}")
+
+    return np.log2(values + 1) if log else values
+
+
+class IncrementalSamplePCA:
+    """
+    PCA of samples fed by blocks of genes
+
+    Each block is centered per gene and added to the samples x samples Gram matrix,
+    the components are the top eigenvectors of the Gram matrix once all blocks are in.
+    """
+
+    def __init__(self, n_components=2):
+        self.n_components = n_components
+        self.gram = None
+        self.n_genes = 0
+
+    def partial_fit(self, block):
+        """
+        Add a block of normalized expression (genes x samples)
+
+        Returns:
+            self
+        """
+        block = np.asarray(block, dtype=float)
+        centered = block - block.mean(axis=1, keepdims=True)
+
+        if self.gram is None:
+            self.gram = np.zeros((block.shape[1], block.shape[1]))
+        self.gram += centered.T @ centered
+        self.n_genes += len(block)
+        return self
+
+    def embedding(self):
+        """
+        Sample scores and explained variance ratio of the fitted components
+
+        Returns:
+            (samples x n_components array, array of explained variance ratios)
+        """
+        if self.gram is None:
+            raise ValueError("no blocks were fitted")
+
+        eigenvalues, eigenvectors = np.linalg.eigh(self.gram)
+        order = np.argsort(eigenvalues)[::-1][:self.n_components]
+        eigenvalues = np.clip(eigenvalues[order], 0, None)
+
+        scores = eigenvectors[:, order] * np.sqrt(eigenvalues)
+        return _flip_signs(scores), eigenvalues / np.trace(self.gram)
+
+
+class EmbeddingService:
+    """
+    Sample embeddings of a count matrix with an on-disk result cache
+    """
+
+    def __init__(self, cache_dir=None, logger=None):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "embeddings")
+        self.logger = logger or logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source, **settings):
+        """
+        Cache key for a count matrix (csv path or DataFrame) and embedding settings
+
+        Returns:
+            str: hex digest
+        """
+        if isinstance(source, pd.DataFrame):
+            digest = hashlib.sha1(pd.util.hash_pandas_object(source, index=True).to_numpy().tobytes())
+            digest.update(json.dumps([str(c) for c in source.columns]).encode())
+            identity = {"data": digest.hexdigest()}
+        else:
+            identity = {"source": file_fingerprint(source)}
+
+        identity["settings"] = settings
+        payload = json.dumps(identity, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _fit_svd(self, source, n_components, normalize, log, seed):
+        counts = source if isinstance(source, pd.DataFrame) else pd.read_csv(source, index_col=0)
+        values = normalize_counts(counts.to_numpy(), normalize=normalize, log=log)
+
+        # samples are the observations, center every gene across samples
+        samples_by_genes = values.T - values.T.mean(axis=0)
+        u, s, _ = randomized_svd(samples_by_genes, n_components, seed=seed)
+
+        total = (samples_by_genes ** 2).sum()
+        return _flip_signs(u * s), s ** 2 / total, list(counts.columns)
+
+    def _chunks(self, source, chunksize):
+        if isinstance(source, pd.DataFrame):
+            for start in range(0, len(source), chunksize):
+                yield source.iloc[start:start + chunksize]
+        else:
+            yield from ClinicalDataIngestor(source).iter_chunks(chunksize=chunksize, index_col=0)
+
+    def _fit_incremental(self, source, n_components, normalize, log, chunksize):
+        # cpm needs the library sizes of the whole matrix, first pass only sums
+        library_sizes, samples = None, None
+        if normalize == "cpm":
+            for chunk in self._chunks(source, chunksize):
+                totals = chunk.to_numpy(dtype=float).sum(axis=0)
+                library_sizes = totals if library_sizes is None else library_sizes + totals
+
+        pca = IncrementalSamplePCA(n_components)
+        for chunk in self._chunks(source, chunksize):
+            samples = list(chunk.columns)
+            pca.partial_fit(normalize_counts(chunk.to_numpy(), library_sizes, normalize, log))
+
+        scores, ratio = pca.embedding()
+        return scores, ratio, samples
+
+    def embed(self, source, method="svd", n_components=2, normalize="cpm", log=True,
+              chunksize=20000, seed=0, use_cache=True):
+        """
+        Embed the samples of a count matrix
+
+        Args:
+            source: csv path or genes x samples DataFrame
+            method: "svd" (randomized, in memory) or "incremental" (streamed in gene chunks)
+            n_components: embedding dimensions
+            normalize: "cpm" or None
+            log: embed log2(x + 1) values
+            chunksize: genes per chunk for the incremental fit
+            seed: random seed of the randomized SVD
+            use_cache: read and write the on-disk cache
+
+        Returns:
+            DataFrame samples x PC1..PCn, attrs["explained_variance_ratio"] holds the ratios
+        """
+        if method not in ("svd", "incremental"):
+            raise ValueError(f"Unsupported embedding method: {method}")
+
+        settings = {"method": method, "n_components": n_components, "normalize": normalize, "log": log}
+        if method == "svd":
+            settings["seed"] = seed
+        key = self.key(source, **settings)
+        path = os.path.join(self.cache_dir, key)
+
+        if use_cache:
+            cached = self._load(path)
+            if cached is not None:
+                self.hits += 1
+                self.logger.info(f"embedding cache hit: {key}")
+                return cached
+            self.misses += 1
+
+        if method == "svd":
+            scores, ratio, samples = self._fit_svd(source, n_components, normalize, log, seed)
+        else:
+            scores, ratio, samples = self._fit_incremental(source, n_components, normalize, log, chunksize)
+
+        embedding = pd.DataFrame(scores, index=pd.Index(samples, name="sample"),
+                                 columns=[f"PC{i + 1}" for i in range(scores.shape[1])])
+        embedding.attrs["explained_variance_ratio"] = [float(r) for r in ratio]
+
+        if use_cache:
+            self._store(path, embedding)
+        self.logger.info(f"embedded {len(embedding)} samples with {method}, "
+                         f"explained variance {embedding.attrs['explained_variance_ratio']}")
+        return embedding
+
+    def _load(self, path):
+        for ext in (".parquet", ".pkl"):
+            if os.path.exists(path + ext) and os.path.exists(path + ".json"):
+                embedding = read_frame(path + ext)
+                with open(path + ".json") as f:
+                    embedding.attrs = json.load(f)
+                return embedding
+        return None
+
+    def _store(self, path, embedding):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # attrs go to a sidecar, parquet/pickle round trips of attrs differ between pandas versions
+        write_frame(embedding, path)
+        with open(path + ".json", "w") as f:
+            json.dump(embedding.attrs, f)
@@ -0,0 +1,206 @@
+# src/omics/gene_index.py
+
+import bisect
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from src.data_ingestion.cache import DEFAULT_CACHE_DIR, cache_name, file_fingerprint
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# memory-mapped count matrix with a hash index (gene symbol -> row) and a prefix index
+# for autocomplete, so one gene can be read without loading the whole csv
+#
+# index directory layout:
+#   counts.npy    genes x samples matrix (numpy format, opened as a memmap)
+#   genes.json    gene symbols in row order
+#   meta.json     samples, dtype and the fingerprint of the source csv
+
+
+class CountMatrixIndex:
+    """
+    Gene/sample lookup over a memory-mapped count matrix
+    """
+
+    def __init__(self, index_dir, logger=None):
+        self.index_dir = index_dir
+        self.logger = logger or logging.getLogger(__name__)
+
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "genes.json")) as f:
+            self.genes = json.load(f)
+
+        self.samples = self.meta["samples"]
+        self.matrix = np.load(os.path.join(index_dir, "counts.npy"), mmap_mode="r")
+
+        # hash index, duplicated symbols keep every row
+        self._rows = {}
+        for row, gene in enumerate(self.genes):
+            self._rows.setdefault(gene, []).append(row)
+
+        # prefix index, case-insensitive sorted keys
+        order = sorted(range(len(self.genes)), key=lambda i: self.genes[i].upper())
+        self._sorted_keys = [self.genes[i].upper() for i in order]
+        self._sorted_rows = order
+
+        self._sample_positions = {s: i for i, s in enumerate(self.samples)}
+
+    # building
+
+    @classmethod
+    def build(cls, csv_path, index_dir, chunksize=20000, dtype=None, logger=None):
+        """
+        Convert a count matrix csv (genes in the first column, one column per sample)
+        into a memory-mapped index directory, streaming the csv in chunks
+
+        Args:
+            csv_path: path to the count matrix csv
+            index_dir: directory for the index files
+            chunksize: csv rows per chunk
+            dtype: matrix dtype (int64 when the head sample is integer, else float64)
+
+        Returns:
+            CountMatrixIndex
+        """
+        logger = logger or logging.getLogger(__name__)
+        ingestor = ClinicalDataIngestor(csv_path)
+
+        # row count and dtype plan from the header scan, no full parse needed
+        scan = ingestor.scan_metadata()
+        samples = scan["column_names"][1:]
+        if dtype is None:
+            sampled = {scan["data_types"][s] for s in samples}
+            dtype = np.int64 if sampled == {"int64"} else np.float64
+
+        os.makedirs(index_dir, exist_ok=True)
+        matrix_path = os.path.join(index_dir, "counts.npy")
+        matrix = open_memmap(matrix_path + ".tmp", mode="w+", dtype=dtype, shape=(scan["num_subjects"], len(samples)))
+
+        genes = []
+        for chunk in ingestor.iter_chunks(chunksize=chunksize, index_col=0):
+            values = chunk.to_numpy()
+            if np.issubdtype(matrix.dtype, np.integer) and not np.issubdtype(values.dtype, np.integer):
+                raise ValueError(f"non-integer counts after row {len(genes)}, rebuild with dtype='float64'")
+            matrix[len(genes):len(genes) + len(chunk)] = values
+            genes.extend(str(g) for g in chunk.index)
+
+        if len(genes) != matrix.shape[0]:
+            raise ValueError(f"row scan found {matrix.shape[0]} genes but parsing found {len(genes)}")
+
+        matrix.flush()
+        del matrix
+        os.replace(matrix_path + ".tmp", matrix_path)
+
+        with open(os.path.join(index_dir, "genes.json"), "w") as f:
+            json.dump(genes, f)
+        with open(os.path.join(index_dir, "meta.json"), "w") as f:
+            json.dump({"samples": samples, "dtype": np.dtype(dtype).name, "source": file_fingerprint(csv_path)}, f)
+
+        logger.info(f"built count matrix index for {csv_path}: {len(genes)} genes x {len(samples)} samples")
+        return cls(index_dir, logger=logger)
+
+    @classmethod
+    def for_file(cls, csv_path, cache_dir=None, logger=None):
+        """
+        Open the index of a count matrix csv, building it on first use or when the csv changed
+
+        Returns:
+            CountMatrixIndex
+        """
+        index_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "gene_index", cache_name(csv_path))
+
+        meta_path = os.path.join(index_dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)["source"] == file_fingerprint(csv_path):
+                    return cls(index_dir, logger=logger)
+
+        return cls.build(csv_path, index_dir, logger=logger)
+
+    # lookups
+
+    def rows(self, gene):
+        """
+        Matrix rows of a gene symbol (exact match first, then case-insensitive)
+
+        Returns:
+            list of row numbers (empty when the gene is unknown)
+        """
+        rows = self._rows.get(gene)
+        if rows:
+            return list(rows)
+
+        key = gene.upper()
+        start = bisect.bisect_left(self._sorted_keys, key)
+        end = bisect.bisect_right(self._sorted_keys, key)
+        return sorted(self._sorted_rows[start:end])
+
+    def complete(self, prefix, limit=10):
+        """
+        Gene symbols starting with prefix (case-insensitive), for autocomplete
+
+        Returns:
+            list of gene symbols in sorted order
+        """
+        key = prefix.upper()
+        start = bisect.bisect_left(self._sorted_keys, key)
+
+        matches = []
+        for i in range(start, len(self._sorted_keys)):
+            if not self._sorted_keys[i].startswith(key) or len(matches) >= limit:
+                break
+            matches.append(self.genes[self._sorted_rows[i]])
+        return matches
+
+    def gene(self, gene):
+        """
+        Expression of one gene across all samples, reads only its rows
+
+        Returns:
+            DataFrame (matching symbols x samples)
+        """
+        return self.genes_frame([gene])
+
+    def genes_frame(self, genes):
+        """
+        Expression of several genes across all samples
+
+        Returns:
+            DataFrame (genes x samples), unknown genes are skipped
+        """
+        rows = [row for gene in genes for row in self.rows(gene)]
+        return pd.DataFrame(np.asarray(self.matrix[rows]), index=[self.genes[r] for r in rows], columns=self.samples)
+
+    def sample(self, sample, genes=None, top=None):
+        """
+        Expression of one sample
+
+        Args:
+            sample: sample (column) name
+            genes: only these genes
+            top: only the top n expressed genes
+
+        Returns:
+            Series indexed by gene symbol
+        """
+        if sample not in self._sample_positions:
+            raise KeyError(f"Unknown sample: {sample}")
+        column = self._sample_positions[sample]
+
+        if genes is not None:
+            rows = [row for gene in genes for row in self.rows(gene)]
+            values = np.asarray(self.matrix[rows, column])
+            return pd.Series(values, index=[self.genes[r] for r in rows], name=sample)
+
+        values = np.asarray(self.matrix[:, column])
+        if top is not None:
+            rows = np.argpartition(-values, min(top, len(values) - 1))[:top]
+            rows = rows[np.argsort(-values[rows], kind="stable")]
+            return pd.Series(values[rows], index=[self.genes[r] for r in rows], name=sample)
+
+        return pd.Series(values, index=self.genes, name=sample)
@@ -0,0 +1,255 @@
+# src/omics/merge.py
+
+import logging
+import os
+
+import numpy as np
+
+from src.integration.store import MultiOmicsStore, resolve_duplicates
+from src.omics.gene_index import CountMatrixIndex
+
+# merge of several count matrices (GEO series in the GSE289715_counts.csv layout) into one
+# chunked MultiOmicsStore modality, without building the dense merged matrix or any
+# per-series reindexed copy
+#
+#   1. the gene index of every series is deduplicated with a sort, the merged index is the
+#      sorted union (outer) or intersection (inner) of them
+#   2. every source row is joined to its merged row with searchsorted on the merged index
+#      (sorted-merge join), rows of genes dropped by an inner merge get -1
+#   3. series are streamed from their memory-mapped CountMatrixIndex in row chunks and
+#      scattered into a buffer of one store sample block (merged genes x sample_chunk),
+#      full blocks are compressed to disk straight away
+#
+# memory is one sample block plus one row chunk, whatever the number of series. a series is
+# read once per sample block it spans, for typical series (tens of samples) that is once
+
+DUPLICATE_POLICIES = ("sum", "first", "error")
+
+
+def _source_path(source):
+    if isinstance(source, CountMatrixIndex):
+        return source.meta.get("source", {}).get("path") or source.index_dir
+    return str(source)
+
+
+def series_names(sources):
+    """
+    Series names of a list of sources: the file name without extension, or the path
+    relative to the common directory when several series share a file name
+
+    Args:
+        sources: csv paths or CountMatrixIndex objects
+
+    Returns:
+        list of unique names, in the order of sources
+    """
+    paths = [os.path.abspath(_source_path(s)) for s in sources]
+    names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    if len(set(names)) < len(names):
+        root = os.path.commonpath(paths)
+        names = [os.path.splitext(os.path.relpath(p, root))[0].replace(os.sep, "/") for p in paths]
+    repeated = sorted({n for n in names if names.count(n) > 1})
+    if repeated:
+        raise ValueError(f"several sources are the same series, pass a dict of series name -> source: {repeated}")
+    return names
+
+
+def _open_source(source, cache_dir, logger):
+    if isinstance(source, CountMatrixIndex):
+        return source
+    return CountMatrixIndex.for_file(source, cache_dir=cache_dir, logger=logger)
+
+
+class CountMatrixMerger:
+    """
+    Outer/inner merge of count matrices with differing genes and samples into a MultiOmicsStore
+    """
+
+    def __init__(self, how="outer", fill_value=0, duplicates="sum", prefix_samples=False,
+                 row_chunk=50000, cache_dir=None, harmonizer=None, logger=None):
+        """
+        Args:
+            how: "outer" keeps genes of any series, "inner" only genes present in every series
+            fill_value: value of genes a series does not have (outer merges), NaN stores floats
+            duplicates: rows sharing a gene symbol inside one series are "sum"med, the
+                "first" one is kept, or they raise ("error")
+            prefix_samples: store samples as "<series>:<sample>", for series reusing sample names
+            row_chunk: source rows read from a memory map at a time
+            cache_dir: where csv sources get their CountMatrixIndex built
+            harmonizer: GeneIdHarmonizer translating every series to approved symbols before
+                the join (series using Ensembl ids or aliases), translated genes falling on
+                the same symbol follow the duplicates policy
+        """
+        if how not in ("outer", "inner"):
+            raise ValueError(f"Unsupported merge: {how}")
+        if duplicates not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unsupported duplicate policy: {duplicates}")
+
+        self.how = how
+        self.fill_value = fill_value
+        self.duplicates = duplicates
+        self.prefix_samples = prefix_samples
+        self.row_chunk = row_chunk
+        self.cache_dir = cache_dir
+        self.harmonizer = harmonizer
+        self.logger = logger or logging.getLogger(__name__)
+        self.last_stats = {}
+
+    def _genes(self, index):
+        """Gene symbols of a series in row order, harmonized when a harmonizer is set"""
+        genes = np.asarray(index.genes, dtype=object)
+        return self.harmonizer.translate(genes) if self.harmonizer is not None else genes
+
+    def merged_genes(self, indexes):
+        """
+        Sorted merged gene index of several series
+
+        Args:
+            indexes: list of CountMatrixIndex
+
+        Returns:
+            numpy array of gene symbols
+        """
+        merged = None
+        for index in indexes:
+            genes = np.unique(self._genes(index).astype(str))
+            if merged is None:
+                merged = genes
+            elif self.how == "outer":
+                merged = np.union1d(merged, genes)
+            else:
+                merged = np.intersect1d(merged, genes, assume_unique=True)
+        return merged if merged is not None else np.array([], dtype=str)
+
+    def join_rows(self, genes, merged):
+        """
+        Merged row of every source row (-1 for genes not in the merged index)
+
+        Args:
+            genes: gene symbols of a series in row order
+            merged: sorted merged gene index
+
+        Returns:
+            numpy int64 array, one entry per source row
+        """
+        genes = np.asarray(genes, dtype=object).astype(str)
+        positions = np.searchsorted(merged, genes)
+        found = positions < len(merged)
+        found[found] = merged[positions[found]] == genes[found]
+        return np.where(found, positions, -1).astype(np.int64)
+
+    def merge(self, sources, store, modality, feature_chunk=1024, sample_chunk=64, dtype=None,
+              compression_level=1):
+        """
+        Merge count matrices into a new matrix modality of a store
+
+        Args:
+            sources: csv paths or CountMatrixIndex objects (named by series_names), or a dict
+                of series name -> source
+            store: MultiOmicsStore or the directory of one
+            modality: name of the new modality
+            feature_chunk: genes per stored chunk
+            sample_chunk: samples per stored chunk (and rows of the write buffer)
+            dtype: storage dtype, defaults to the common dtype of the series (float with NaN fill)
+            compression_level: zlib level per chunk
+
+        Returns:
+            dict with the merge summary (genes, samples, per series genes matched and dropped)
+        """
+        if not isinstance(sources, dict):
+            sources = list(sources)
+            sources = dict(zip(series_names(sources), sources))
+        if not isinstance(store, MultiOmicsStore):
+            store = MultiOmicsStore(store, logger=self.logger)
+
+        indexes = {name: _open_source(source, self.cache_dir, self.logger) for name, source in sources.items()}
+
+        # samples are checked before anything is written
+        sample_ids = []
+        for name, index in indexes.items():
+            sample_ids.extend(f"{name}:{s}" if self.prefix_samples else str(s) for s in index.samples)
+        seen = set()
+        repeated = sorted({s for s in sample_ids if s in seen or seen.add(s)})
+        if repeated:
+            raise ValueError(f"sample ids appear in several series, use prefix_samples: {repeated[:5]}")
+
+        merged = self.merged_genes(list(indexes.values()))
+        if dtype is None:
+            dtype = np.result_type(*[index.matrix.dtype for index in indexes.values()])
+            if np.issubdtype(dtype, np.integer) and (self.how == "outer" and np.isnan(self.fill_value)):
+                dtype = np.float64
+        dtype = np.dtype(dtype)
+
+        store.create_matrix(modality, merged, dtype, feature_chunk=feature_chunk, sample_chunk=sample_chunk,
+                            compression_level=compression_level)
+
+        # inner merges have every gene in every series, nothing is ever filled
+        fill_value = self.fill_value if self.how == "outer" else 0
+        buffer = np.full((len(merged), sample_chunk), fill_value, dtype=dtype)
+        pending = []
+        stats = {"series": {}}
+
+        def flush():
+            store.append_matrix_values(modality, buffer[:, :len(pending)], pending)
+            buffer.fill(fill_value)
+            pending.clear()
+
+        for name, index in indexes.items():
+            target = self.join_rows(self._genes(index), merged)
+            rows, has_duplicates = resolve_duplicates(target, self.duplicates, f"series {name}")
+            stats["series"][name] = {"samples": len(index.samples),
+                                     "genes_matched": int(len(np.unique(target[rows]))),
+                                     "rows_dropped": int(len(target) - len(rows)),
+                                     "duplicates": has_duplicates}
+
+            # source columns in groups that fill the free part of the buffer
+            column = 0
+            while column < len(index.samples):
+                width = min(sample_chunk - len(pending), len(index.samples) - column)
+                out = slice(len(pending), len(pending) + width)
+                if has_duplicates and self.duplicates == "sum":
+                    # slots of this series start from zero instead of fill_value, duplicates add up
+                    buffer[np.unique(target[rows]), out] = 0
+
+                for start in range(0, len(rows), self.row_chunk):
+                    chunk_rows = rows[start:start + self.row_chunk]
+                    # rows are ascending, one contiguous read of the memmap covers the chunk
+                    lo, hi = chunk_rows[0], chunk_rows[-1] + 1
+                    block = np.asarray(index.matrix[lo:hi, column:column + width])[chunk_rows - lo]
+                    targets = target[chunk_rows]
+                    if has_duplicates and self.duplicates == "sum":
+                        np.add.at(buffer[:, out], targets, block)
+                    else:
+                        buffer[targets, out] = block
+
+                pending.extend(f"{name}:{s}" if self.prefix_samples else str(s)
+                               for s in index.samples[column:column + width])
+                column += width
+                if len(pending) == sample_chunk:
+                    flush()
+
+        if pending:
+            flush()
+
+        stats.update(genes=len(merged), samples=len(sample_ids), modality=modality)
+        self.last_stats = stats
+        self.logger.info(f"merged {len(indexes)} series into {modality}: {len(merged)} genes x {len(sample_ids)} samples ({self.how})")
+        return stats
+
+
+def merge_count_matrices(sources, store, modality, how="outer", **kwargs):
+    """
+    Merge count matrices into a new matrix modality of a store
+
+    Args:
+        sources: csv paths or CountMatrixIndex objects, or a dict of series name -> source
+        store: MultiOmicsStore or the directory of one
+        modality: name of the new modality
+        how: "outer" or "inner" merge of the gene indexes
+        kwargs: CountMatrixMerger settings and merge() storage settings
+
+    Returns:
+        dict with the merge summary
+    """
+    storage = {k: kwargs.pop(k) for k in ("feature_chunk", "sample_chunk", "dtype", "compression_level") if k in kwargs}
+    return CountMatrixMerger(how=how, **kwargs).merge(sources, store, modality, **storage)
@@ -0,0 +1,22 @@
+
+# src/pipeline/__init__.py
+
+from importlib import import_module
+
+# submodules load on first attribute access (see src/omics/__init__.py)
+
+_EXPORTS = {
+    "StageGraph": ".stages",
+    "clinical_pipeline": ".stages",
+    "run_batch": ".cli",
+    "MemoryGovernor": ".memory",
+    "set_memory_budget": ".memory",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,310 @@
+# src/pipeline/cli.py
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.data_export.exporter import PartitionedExporter
+from src.data_ingestion.cache import file_fingerprint
+from src.data_standardization.string_transforms import save_shared_memo
+from src.pipeline.memory import MemoryGovernor, get_memory_budget
+from src.pipeline.stages import clinical_pipeline
+
+# headless batch runner: ingest -> validate -> standardize -> export for many files
+#
+#   python -m src.pipeline.cli data/raw --pattern "*.csv" --output data/processed/clinical --workers 4
+#
+# files are processed by a worker pool, the parent process does the export so only one
+# process writes the dataset manifest. a checkpoint is written per exported file and config,
+# a rerun skips files whose checkpoint matches the current file fingerprint.
+# every file is exported as its own source, named by its path relative to the batch root
+# (a/patients.csv -> "a/patients"), an export replaces all partitions of its source.
+# files over the memory budget are streamed in chunks (MemoryGovernor), staged as parquet
+# parts and exported part by part
+
+DEFAULT_PATTERNS = ("*.csv", "*.tsv", "*.txt", "*.xlsx", "*.xls")
+
+
+def collect_inputs(inputs, pattern=None):
+    """
+    Expand files and directories into a sorted list of input files
+
+    Args:
+        inputs: file and/or directory paths
+        pattern: glob pattern for files inside directories (defaults to the supported formats)
+
+    Returns:
+        list of file paths
+    """
+    patterns = [pattern] if pattern else DEFAULT_PATTERNS
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for p in patterns:
+                files.extend(glob.glob(os.path.join(item, p)))
+        elif os.path.exists(item):
+            files.append(item)
+        else:
+            raise FileNotFoundError(f"Input not found: {item}")
+    return sorted(dict.fromkeys(files))
+
+
+def source_keys(files, root=None):
+    """
+    Export source name of every input file, unique within the batch
+
+    Args:
+        files: input file paths
+        root: batch root the names are relative to (defaults to the common directory)
+
+    Returns:
+        dict of file path -> source name ("a/patients", extensions kept only where
+        two files would otherwise share a name, ex. patients.csv and patients.xlsx)
+
+    Raises:
+        ValueError: when two inputs still map to the same source
+    """
+    if not files:
+        return {}
+    absolute = {f: os.path.abspath(f) for f in files}
+    root = os.path.abspath(root) if root else os.path.commonpath([os.path.dirname(p) for p in absolute.values()])
+
+    relative = {f: os.path.relpath(p, root).replace(os.sep, "/") for f, p in absolute.items()}
+    stems = {f: os.path.splitext(r)[0] for f, r in relative.items()}
+    counts = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    keys = {f: stems[f] if counts[stems[f]] == 1 else relative[f] for f in files}
+
+    seen = {}
+    for f, key in keys.items():
+        if key in seen and absolute[seen[key]] != absolute[f]:
+            raise ValueError(f"{seen[key]} and {f} would be exported as the same source {key}")
+        seen[key] = f
+    return keys
+
+
+def config_hash(config):
+    """Hash of a batch config, checkpoints of another config do not count"""
+    return hashlib.sha1(json.dumps(config or {}, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Checkpoints:
+    """
+    One small json file per finished input file and config
+    """
+
+    def __init__(self, checkpoint_dir, config=None):
+        self.checkpoint_dir = checkpoint_dir
+        self.config_hash = config_hash(config)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _path(self, data_path):
+        key = f"{os.path.abspath(data_path)}\0{self.config_hash}"
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.checkpoint_dir, name + ".json")
+
+    def is_done(self, data_path):
+        """True when the file was exported and has not changed since"""
+        path = self._path(data_path)
+        if not os.path.exists(path):
+            return False
+        with open(path) as f:
+            return json.load(f)["fingerprint"] == file_fingerprint(data_path)
+
+    def mark_done(self, data_path, stats):
+        path = self._path(data_path)
+        record = {"fingerprint": file_fingerprint(data_path), "config": self.config_hash, **stats}
+        with open(path + ".tmp", "w") as f:
+            json.dump(record, f, default=str)
+        os.replace(path + ".tmp", path)
+
+
+def process_file(data_path, config, cache_dir=None, budget=None, staging_dir=None):
+    """
+    Ingest, validate and standardize one file, the memory budget picks how
+
+    Files that fit the budget go through the memoized stage graph, larger files are
+    streamed by MemoryGovernor.run_clinical and staged as parquet parts under staging_dir.
+    The string memo is saved after every file, pool workers exit without atexit hooks.
+
+    Args:
+        data_path: input file
+        config: batch config (see run_batch)
+        cache_dir: stage artifact cache
+        budget: memory budget of this worker (the pipeline-wide budget when None)
+        staging_dir: directory of the staged parts of chunked files
+
+    Returns:
+        dict with the standardization info, validation results and stats, and either the
+        standardized data or the staged parts and their row count
+    """
+    start = time.perf_counter()
+    governor = MemoryGovernor(budget)
+    plan = governor.plan(data_path)
+    if plan["strategy"] != "eager":
+        result = governor.run_clinical(data_path, read_kwargs=config.get("read_kwargs"),
+                                       validation_config=config.get("validation"),
+                                       standardization_config=config.get("standardization"),
+                                       staging_dir=staging_dir, cache_dir=cache_dir, plan=plan)
+        save_shared_memo()
+        return {
+            "parts": result["parts"],
+            "rows": result["rows"],
+            "standardization_info": result["standardization_info"],
+            "validation_results": result["validation_results"],
+            "stages": {"strategy": plan["strategy"], "chunks": len(result["chunk_sizes"])},
+            "seconds": time.perf_counter() - start,
+        }
+
+    graph = clinical_pipeline(data_path,
+                              read_kwargs=config.get("read_kwargs"),
+                              validation_config=config.get("validation"),
+                              standardization_config=config.get("standardization"),
+                              cache_dir=cache_dir)
+    outputs = graph.run()
+    save_shared_memo()
+
+    return {
+        "data": outputs["standardize"]["data"],
+        "rows": len(outputs["standardize"]["data"]),
+        "standardization_info": outputs["standardize"]["standardization_info"],
+        "validation_results": outputs["validate"],
+        "stages": graph.last_run,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_batch(files, output, config=None, workers=1, checkpoint_dir=None, cache_dir=None,
+              restart=False, root=None, logger=None):
+    """
+    Run the pipeline over a list of files and export the results
+
+    Args:
+        files: input file paths
+        output: root of the exported dataset
+        config: {"read_kwargs", "validation", "standardization", "partition_cols"}
+        workers: worker processes (1 = in process)
+        checkpoint_dir: checkpoint directory (defaults to <output>/.checkpoints)
+        cache_dir: stage artifact cache
+        restart: ignore existing checkpoints
+        root: batch root the source names are relative to (see source_keys)
+
+    The pipeline-wide memory budget (set_memory_budget / PIPELINE_MEMORY_BUDGET) is shared
+    by the workers, files over a worker's share are processed in chunks and exported from
+    their staged parts (under <output>/.staging).
+
+    Returns:
+        summary dict with counts and throughput
+    """
+    logger = logger or logging.getLogger(__name__)
+    config = config or {}
+    checkpoints = Checkpoints(checkpoint_dir or os.path.join(output, ".checkpoints"), config)
+    exporter = PartitionedExporter(output, logger=logger)
+
+    # checked before anything runs, two files sharing a source would replace each other's partitions
+    sources = source_keys(files, root)
+
+    budget = get_memory_budget() // max(min(workers, len(files)), 1)
+    staging_root = os.path.join(output, ".staging")
+
+    def staging_dir(data_path):
+        return os.path.join(staging_root, hashlib.sha1(os.path.abspath(data_path).encode()).hexdigest())
+
+    pending = [f for f in files if restart or not checkpoints.is_done(f)]
+    summary = {"files": len(files), "processed": 0, "skipped": len(files) - len(pending),
+               "failed": [], "rows": 0, "bytes": 0}
+    logger.info(f"{len(pending)} of {len(files)} files to process, {summary['skipped']} already checkpointed")
+
+    def finish(data_path, result):
+        # export and checkpoint in the parent, one writer for the manifest
+        export = exporter.export_parts if "parts" in result else exporter.export
+        export(result["parts"] if "parts" in result else result["data"], sources[data_path],
+               partition_cols=config.get("partition_cols"),
+               standardization_info=result["standardization_info"],
+               validation_results=result["validation_results"],
+               source_path=data_path)
+        if "parts" in result:
+            shutil.rmtree(staging_dir(data_path), ignore_errors=True)
+
+        stats = {"rows": result["rows"], "bytes": os.path.getsize(data_path),
+                 "seconds": result["seconds"], "stages": result["stages"]}
+        checkpoints.mark_done(data_path, stats)
+        summary["processed"] += 1
+        summary["rows"] += stats["rows"]
+        summary["bytes"] += stats["bytes"]
+        logger.info(f"finished {data_path}: {stats['rows']} rows in {stats['seconds']:.2f}s")
+
+    start = time.perf_counter()
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_file, f, config, cache_dir, budget, staging_dir(f)): f for f in pending}
+            for future in as_completed(futures):
+                data_path = futures[future]
+                try:
+                    finish(data_path, future.result())
+                except Exception as e:
+                    logger.error(f"failed {data_path}: {str(e)}")
+                    summary["failed"].append(data_path)
+    else:
+        for data_path in pending:
+            try:
+                finish(data_path, process_file(data_path, config, cache_dir, budget, staging_dir(data_path)))
+            except Exception as e:
+                logger.error(f"failed {data_path}: {str(e)}")
+                summary["failed"].append(data_path)
+
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = elapsed
+    summary["files_per_second"] = summary["processed"] / elapsed if elapsed > 0 else 0.0
+    summary["rows_per_second"] = summary["rows"] / elapsed if elapsed > 0 else 0.0
+    summary["mb_per_second"] = summary["bytes"] / 1e6 / elapsed if elapsed > 0 else 0.0
+    return summary
+
+
+def format_summary(summary):
+    """Human readable throughput summary"""
+    return (f"processed {summary['processed']} files ({summary['skipped']} skipped, "
+            f"{len(summary['failed'])} failed) in {summary['seconds']:.2f}s\n"
+            f"  {summary['files_per_second']:.2f} files/s, {summary['rows_per_second']:.0f} rows/s, "
+            f"{summary['mb_per_second']:.2f} MB/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run ingest -> validate -> standardize -> export over files")
+    parser.add_argument("inputs", nargs="+", help="input files and/or directories")
+    parser.add_argument("--pattern", help="glob pattern for files inside directories")
+    parser.add_argument("--output", default=os.path.join("data", "processed", "clinical"),
+                        help="root of the exported dataset")
+    parser.add_argument("--config", help="json file with read_kwargs, validation, standardization, partition_cols")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint-dir", help="defaults to <output>/.checkpoints")
+    parser.add_argument("--cache-dir", help="stage artifact cache directory")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and process every file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    files = collect_inputs(args.inputs, args.pattern)
+    # source names are relative to the directories given on the command line
+    roots = [os.path.abspath(i if os.path.isdir(i) else os.path.dirname(i) or ".") for i in args.inputs]
+    summary = run_batch(files, args.output, config, workers=args.workers, checkpoint_dir=args.checkpoint_dir,
+                        cache_dir=args.cache_dir, restart=args.restart, root=os.path.commonpath(roots))
+    print(format_summary(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# src/pipeline/coldstart.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# cold-start report: imports each entry point in a fresh interpreter and records
+# the wall time and which heavy optional libraries came along with it
+#
+#   python -m src.pipeline.coldstart
+#   python -m src.pipeline.coldstart src.pipeline.cli visualization.dashboard --repeat 5
+
+DEFAULT_MODULES = (
+    "src.data_ingestion.base_ingestion",
+    "src.data_ingestion.clinical_ingestor",
+    "src.data_validation.validator",
+    "src.pipeline.cli",
+    "src.omics.gene_index",
+    "visualization.dashboard",
+)
+
+# libraries that should only load at the point of use
+HEAVY_MODULES = ("matplotlib", "seaborn", "scipy", "openpyxl", "sklearn", "streamlit")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+error = None
+try:
+    __import__({module!r})
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy, "modules": len(sys.modules), "error": error}}))
+"""
+
+
+def measure_import(module, repeat=3, heavy=HEAVY_MODULES, cwd=None):
+    """
+    Import a module in fresh interpreters and time it
+
+    Args:
+        module: dotted module name
+        repeat: interpreters to start, the fastest run is reported (least noise)
+        heavy: library names reported when they were imported
+        cwd: working directory of the interpreters (the repository root by default)
+
+    Returns:
+        dict with module, seconds, heavy (loaded heavy libraries), modules (sys.modules size) and error
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    code = _PROBE.format(module=module, heavy=tuple(heavy))
+
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {"module": module, "seconds": None, "heavy": [], "modules": None,
+                    "error": completed.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    best = min(runs, key=lambda r: r["seconds"])
+    return {"module": module, **best}
+
+
+def cold_start_report(modules=DEFAULT_MODULES, repeat=3):
+    """
+    Measure every module
+
+    Returns:
+        list of measure_import results
+    """
+    return [measure_import(module, repeat) for module in modules]
+
+
+def format_report(results):
+    """Text table of a cold-start report"""
+    width = max(len(r["module"]) for r in results)
+    lines = [f"{'module':<{width}}  {'import s':>8}  {'modules':>7}  heavy libraries"]
+    for r in results:
+        if r["error"]:
+            lines.append(f"{r['module']:<{width}}  {'-':>8}  {'-':>7}  not importable here ({r['error']})")
+            continue
+        heavy = ", ".join(r["heavy"]) or "none"
+        lines.append(f"{r['module']:<{width}}  {r['seconds']:>8.3f}  {r['modules']:>7}  {heavy}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the pipeline entry points")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module, fastest is kept")
+    parser.add_argument("--json", action="store_true", help="print the raw results as json")
+    args = parser.parse_args(argv)
+
+    results = cold_start_report(args.modules, args.repeat)
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+# src/pipeline/memory.py
+
+import csv
+import io
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.base_ingestion import _estimate_dtype
+from src.data_ingestion.cache import DEFAULT_CACHE_DIR, file_fingerprint, write_frame
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# memory budget governor: picks how a file is processed from what it will cost in memory
+#
+#   eager    load the whole table, validate and standardize it in one go (small files)
+#   chunked  stream row chunks through ingest -> validate -> standardize, the chunk size is
+#            adapted while running from the measured size of the chunks already read
+#   mmap     numeric matrices (count matrices) are converted once into a memory-mapped
+#            CountMatrixIndex, validation and standardization then run on blocks of its rows
+#
+# the cost of a file is estimated without parsing it: the file size, a header sample of
+# raw lines and the dtype plan of that sample (same estimate as scan_metadata) give the
+# bytes per row in memory. WORKING_FACTOR covers the parsed frame, validation masks and
+# the standardized copy that exist at the same time
+#
+# the budget is pipeline wide: set_memory_budget("4GB"), PIPELINE_MEMORY_BUDGET=4GB,
+# or half of the physical memory by default
+
+WORKING_FACTOR = 3.0
+
+# share of the budget one chunk (and its working copies) may use
+CHUNK_FRACTION = 0.25
+
+# bytes in memory per value of each planned dtype, strings add their length
+_DTYPE_BYTES = {"int64": 8, "float64": 8, "datetime64[ns]": 8, "bool": 1}
+_STRING_OVERHEAD = 50
+
+# in-memory size relative to the file size for formats without a line sample
+_EXPANSION = {"excel": 8.0, "ndjson": 1.5}
+
+# standardization steps that compare rows across the whole table, not run chunk by chunk
+WHOLE_TABLE_STEPS = ("duplicates",)
+
+# points inside the file where line lengths are sampled
+_PROBES = 4
+
+_SIZE_PATTERN = re.compile(r"^\s*([\d.]+)\s*([kmgt]?i?b?)\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+_budget = None
+
+
+def parse_size(value):
+    """
+    Bytes of a size given as a number or a string ("512MB", "4GB", "1.5g")
+
+    Raises:
+        ValueError: for unreadable sizes
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"unreadable memory size: {value}")
+    return int(float(match.group(1)) * _UNITS[match.group(2)[:1].lower()])
+
+
+def _physical_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 4 * 1024 ** 3
+
+
+def set_memory_budget(budget):
+    """Set the pipeline-wide memory budget (bytes or a size string, None = default)"""
+    global _budget
+    _budget = parse_size(budget) if budget is not None else None
+
+
+def get_memory_budget():
+    """Pipeline-wide memory budget in bytes"""
+    if _budget is not None:
+        return _budget
+    if os.environ.get("PIPELINE_MEMORY_BUDGET"):
+        return parse_size(os.environ["PIPELINE_MEMORY_BUDGET"])
+    return _physical_memory() // 2
+
+
+def current_memory():
+    """Resident memory of this process in bytes (None where it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _file_format(path):
+    name = path.lower()
+    if name.endswith((".ndjson", ".ndjson.gz")):
+        return "ndjson"
+    extension = name.rsplit(".", 1)[-1]
+    return {"csv": "csv", "tsv": "tsv", "txt": "tsv", "xlsx": "excel", "xls": "excel"}.get(extension, "csv")
+
+
+def estimate_cost(data_path, sample_rows=1000, skiprows=0, encoding="utf-8-sig"):
+    """
+    Estimate the in-memory cost of a file from its size and a header sample
+
+    Args:
+        data_path: input file
+        sample_rows: raw lines after the header used for the estimate
+        skiprows: lines before the header
+
+    Returns:
+        dict with file_format, file_bytes, rows, bytes_per_row, memory_bytes, data_types and numeric_matrix
+    """
+    file_format = _file_format(data_path)
+    file_bytes = os.path.getsize(data_path)
+    cost = {"data_path": data_path, "file_format": file_format, "file_bytes": file_bytes,
+            "data_types": {}, "numeric_matrix": False}
+
+    if file_format not in ("csv", "tsv"):
+        cost.update(rows=None, bytes_per_row=None,
+                    memory_bytes=int(file_bytes * _EXPANSION.get(file_format, WORKING_FACTOR)))
+        return cost
+
+    # raw lines of the head for the dtype plan, plus lines from a few points further into
+    # the file for the average line length (values often grow towards the end, ex. ids)
+    with open(data_path, "rb") as f:
+        for _ in range(skiprows):
+            f.readline()
+        header_line = f.readline()
+        lines = []
+        for _ in range(sample_rows):
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+
+        lengths = [len(line) for line in lines]
+        if len(lines) == sample_rows:
+            for k in range(1, _PROBES + 1):
+                f.seek(file_bytes * k // (_PROBES + 1))
+                f.readline()
+                for _ in range(sample_rows // _PROBES):
+                    line = f.readline()
+                    if not line:
+                        break
+                    lengths.append(len(line))
+
+    delimiter = "\t" if file_format == "tsv" else ","
+    text = (header_line + b"".join(lines)).decode(encoding, errors="replace")
+    parsed = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    header, sample = [c.strip() for c in parsed[0]] if parsed else [], [row for row in parsed[1:] if row]
+
+    data_types = {}
+    bytes_per_row = 0.0
+    for i, column in enumerate(header):
+        values = [row[i] if i < len(row) else "" for row in sample]
+        dtype = _estimate_dtype(values)
+        data_types[column] = dtype
+        if dtype in _DTYPE_BYTES:
+            bytes_per_row += _DTYPE_BYTES[dtype]
+        else:
+            bytes_per_row += _STRING_OVERHEAD + (sum(len(v) for v in values) / len(values) if values else 0)
+
+    raw_per_row = sum(lengths) / len(lengths) if lengths else 1
+    rows = int((file_bytes - len(header_line)) / raw_per_row) if lines else 0
+
+    # a label column followed by numeric columns only is a matrix (genes x samples)
+    numeric = [dtype in ("int64", "float64") for dtype in data_types.values()]
+    cost.update(rows=rows, bytes_per_row=bytes_per_row, memory_bytes=int(rows * bytes_per_row),
+                data_types=data_types,
+                numeric_matrix=len(numeric) > 2 and not numeric[0] and all(numeric[1:]))
+    return cost
+
+
+class MemoryGovernor:
+    """
+    Chooses eager, chunked or memory-mapped execution for a file and keeps chunks inside the budget
+    """
+
+    def __init__(self, budget=None, min_chunksize=1000, max_chunksize=1000000, logger=None):
+        """
+        Args:
+            budget: memory budget (bytes or size string), defaults to the pipeline-wide budget
+            min_chunksize: fewest rows per chunk
+            max_chunksize: most rows per chunk
+        """
+        self.budget = parse_size(budget) if budget is not None else get_memory_budget()
+        self.min_chunksize = min_chunksize
+        self.max_chunksize = max_chunksize
+        self.logger = logger or logging.getLogger(__name__)
+        self.chunk_sizes = []
+
+    def _chunksize_for(self, bytes_per_row):
+        rows = self.budget * CHUNK_FRACTION / max(bytes_per_row * WORKING_FACTOR, 1)
+        return int(min(max(rows, self.min_chunksize), self.max_chunksize))
+
+    def plan(self, data_path, **estimate_kwargs):
+        """
+        Execution plan of a file
+
+        Returns:
+            dict with strategy, chunksize, per stage strategies and the cost estimate
+        """
+        cost = estimate_cost(data_path, **estimate_kwargs)
+        working = cost["memory_bytes"] * WORKING_FACTOR
+
+        if working <= self.budget:
+            strategy = "eager"
+        elif cost["numeric_matrix"]:
+            strategy = "mmap"
+        else:
+            strategy = "chunked"
+
+        bytes_per_row = cost["bytes_per_row"] or cost["memory_bytes"] / max(cost["rows"] or 1, 1)
+        plan = {
+            "strategy": strategy,
+            "chunksize": self._chunksize_for(bytes_per_row) if strategy != "eager" else None,
+            "stages": {
+                "ingest": strategy,
+                # matrices are validated and standardized in blocks of rows from the index
+                "validate": "chunked" if strategy == "mmap" else strategy,
+                "standardize": "chunked" if strategy == "mmap" else strategy,
+            },
+            "budget_bytes": self.budget,
+            "working_bytes": int(working),
+            "cost": cost,
+        }
+        self.logger.info(f"{data_path}: ~{working / 1e6:.1f} MB working set, budget {self.budget / 1e6:.1f} MB "
+                         f"-> {strategy}")
+        return plan
+
+    def iter_chunks(self, data_path, chunksize=None, **read_kwargs):
+        """
+        Stream a file in chunks whose size follows the measured memory per row
+
+        After every chunk the next chunk size is recomputed from the chunk's real
+        memory usage, and halved while the process is above 90% of the budget.
+
+        Args:
+            data_path: delimited text file (other formats use a fixed chunk size)
+            chunksize: first chunk size (from the plan when None)
+            read_kwargs: passed to the pandas reader
+
+        Yields:
+            DataFrame chunks
+        """
+        chunksize = chunksize or self.plan(data_path)["chunksize"] or self.min_chunksize
+        self.chunk_sizes = []
+        file_format = _file_format(data_path)
+
+        if file_format not in ("csv", "tsv"):
+            # batch sizes of the excel / ndjson readers are fixed once started
+            if file_format == "ndjson":
+                from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor
+                chunks = FHIRPatientIngestor(data_path).iter_batches(batch_size=chunksize)
+            else:
+                chunks = ClinicalDataIngestor(data_path).iter_chunks(chunksize=chunksize, **read_kwargs)
+            for chunk in chunks:
+                self.chunk_sizes.append(len(chunk))
+                yield chunk
+            return
+
+        if file_format == "tsv":
+            read_kwargs.setdefault("sep", "\t")
+        with pd.read_csv(data_path, chunksize=chunksize, **read_kwargs) as reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(chunksize)
+                except StopIteration:
+                    return
+                if len(chunk) == 0:
+                    return
+                self.chunk_sizes.append(len(chunk))
+                yield chunk
+                chunksize = self._next_chunksize(chunk, chunksize)
+
+    def iter_matrix_blocks(self, data_path, chunksize=None, cache_dir=None):
+        """
+        Stream a count matrix in blocks of rows from its memory-mapped index
+
+        The index is built on first use (the csv is converted in chunks), blocks are
+        read straight from the memory map, so only one block is ever parsed in memory.
+
+        Args:
+            data_path: count matrix csv (genes in the first column, one column per sample)
+            chunksize: genes per block (from the plan when None)
+            cache_dir: where the CountMatrixIndex is built
+
+        Yields:
+            DataFrame blocks laid out like the csv (gene column first)
+        """
+        from src.omics.gene_index import CountMatrixIndex
+
+        chunksize = chunksize or self.plan(data_path)["chunksize"] or self.min_chunksize
+        self.chunk_sizes = []
+        index = CountMatrixIndex.for_file(data_path, cache_dir=cache_dir, logger=self.logger)
+        with open(data_path, encoding="utf-8-sig", newline="") as f:
+            gene_column = next(csv.reader(f))[0] or "genes"
+
+        for start in range(0, len(index.genes), chunksize):
+            block = pd.DataFrame(np.asarray(index.matrix[start:start + chunksize]), columns=index.samples)
+            block.insert(0, gene_column, index.genes[start:start + chunksize])
+            self.chunk_sizes.append(len(block))
+            yield block
+
+    def _next_chunksize(self, chunk, chunksize):
+        bytes_per_row = chunk.memory_usage(deep=True).sum() / max(len(chunk), 1)
+        adapted = self._chunksize_for(bytes_per_row)
+
+        resident = current_memory()
+        if resident is not None and resident > 0.9 * self.budget:
+            adapted = max(self.min_chunksize, min(adapted, chunksize // 2))
+            self.logger.warning(f"process at {resident / 1e6:.0f} MB of a {self.budget / 1e6:.0f} MB budget, "
+                                f"next chunk {adapted} rows")
+        return adapted
+
+    def run_clinical(self, data_path, read_kwargs=None, validation_config=None, standardization_config=None,
+                     sink=None, staging_dir=None, cache_dir=None, plan=None):
+        """
+        Ingest, validate and standardize a file with the planned strategy
+
+        Chunked runs hand every standardized chunk to sink (or write it as a parquet part
+        under staging_dir) and merge the per-chunk validation results: missing values,
+        range and rule violations are exact counts over the file, outliers use per-chunk
+        statistics (flagged with "per_chunk"). Memory-mapped runs do the same over blocks
+        of rows read from the CountMatrixIndex of the matrix (read_kwargs do not apply).
+        Every chunk gets its own DataStandardizer, so steps needing the whole table
+        ("duplicates") are rejected unless the plan is eager.
+
+        Args:
+            data_path: input file
+            read_kwargs: passed to the reader
+            validation_config: keyword arguments for run_all_validations
+            standardization_config: config for run_standardization_pipeline
+            sink: callable receiving each standardized chunk
+            staging_dir: directory of the parquet parts when sink is None
+            cache_dir: where the CountMatrixIndex of a memory-mapped run is built
+            plan: plan of the file from plan(), made here when None
+
+        Returns:
+            dict with strategy, validation_results, standardization_info and either data (eager)
+            or parts/chunks (chunked and mmap)
+        """
+        from src.data_standardization.standardizer import DataStandardizer
+        from src.data_validation.validator import DataValidator
+
+        read_kwargs = dict(read_kwargs or {})
+        validation_config = validation_config or {}
+        standardization_config = standardization_config or {}
+        plan = plan or self.plan(data_path)
+        start = time.perf_counter()
+
+        if plan["strategy"] == "eager":
+            data = ClinicalDataIngestor(data_path).load_data(**read_kwargs)
+            validation_results = DataValidator(data).run_all_validations(**validation_config)
+            standardizer = DataStandardizer(data.copy())
+            info = standardizer.run_standardization_pipeline(standardization_config)
+            return {"strategy": "eager", "plan": plan, "data": standardizer.data,
+                    "validation_results": validation_results, "standardization_info": info,
+                    "seconds": time.perf_counter() - start}
+
+        # duplicates would only be found within a chunk and cluster ids restart in every part
+        whole_table = [step for step in WHOLE_TABLE_STEPS if step in standardization_config]
+        if whole_table:
+            raise ValueError(f"{data_path} is processed in chunks ({plan['strategy']}), standardization steps "
+                             f"{whole_table} need the whole table, raise the memory budget to run them")
+
+        if sink is None:
+            key = file_fingerprint(data_path)
+            staging_dir = staging_dir or os.path.join(DEFAULT_CACHE_DIR, "chunks",
+                                                      f"{os.path.basename(data_path)}-{key['mtime_ns']}")
+            os.makedirs(staging_dir, exist_ok=True)
+
+        merged = _MergedValidation(validation_config.get("missing_threshold", 0.2))
+        info = None
+        parts = []
+        rows = 0
+        if plan["strategy"] == "mmap":
+            chunks = self.iter_matrix_blocks(data_path, plan["chunksize"], cache_dir=cache_dir)
+        else:
+            chunks = self.iter_chunks(data_path, plan["chunksize"], **read_kwargs)
+        for number, chunk in enumerate(chunks):
+            merged.add(chunk, DataValidator(chunk).run_all_validations(**validation_config))
+
+            standardizer = DataStandardizer(chunk.copy())
+            info = standardizer.run_standardization_pipeline(standardization_config)
+            if sink is not None:
+                sink(standardizer.data)
+            else:
+                parts.append(write_frame(standardizer.data, os.path.join(staging_dir, f"part-{number:05d}")))
+            rows += len(chunk)
+
+        self.logger.info(f"processed {rows} rows of {data_path} in {len(self.chunk_sizes)} chunks "
+                         f"(sizes {min(self.chunk_sizes, default=0)}-{max(self.chunk_sizes, default=0)})")
+        return {"strategy": plan["strategy"], "plan": plan, "parts": parts, "rows": rows,
+                "chunk_sizes": list(self.chunk_sizes), "validation_results": merged.results(),
+                "standardization_info": info, "seconds": time.perf_counter() - start}
+
+
+class _MergedValidation:
+    """Adds up per-chunk validation results into whole-file results"""
+
+    def __init__(self, missing_threshold=0.2):
+        self.missing_threshold = missing_threshold
+        self.rows = 0
+        self.missing = None
+        self.type_mismatches = {}
+        self.counts = {"range_violations": {}, "outliers": {}, "rule_violations": {}}
+        self.details = {"range_violations": {}, "outliers": {}, "rule_violations": {}}
+
+    def add(self, chunk, results):
+        self.rows += len(chunk)
+        missing = chunk.isna().sum()
+        self.missing = missing if self.missing is None else self.missing.add(missing, fill_value=0)
+        # a column mismatches when any chunk parsed it as another type
+        for column, mismatch in results.get("type_mismatches", {}).items():
+            merged = self.type_mismatches.setdefault(column, {"expected": mismatch["expected"], "actual": [], "chunks": 0})
+            if mismatch["actual"] not in merged["actual"]:
+                merged["actual"].append(mismatch["actual"])
+            merged["chunks"] += 1
+
+        for section, count_key in (("range_violations", "violation_count"), ("outliers", "outlier_count"),
+                                   ("rule_violations", "violation_count")):
+            for name, details in results.get(section, {}).items():
+                self.counts[section][name] = self.counts[section].get(name, 0) + int(details[count_key])
+                self.details[section].setdefault(name, {k: v for k, v in details.items()
+                                                        if k not in (count_key, "bitmap_key") and
+                                                        not k.endswith("percentage")})
+
+    def results(self):
+        rates = self.missing / max(self.rows, 1) if self.missing is not None else pd.Series(dtype=float)
+        results = {
+            "missing_data": {
+                "columns_above_threshold": rates[rates > self.missing_threshold].to_dict(),
+                "overall_completeness": float(1 - rates.mean()) if len(rates) else 1.0,
+            },
+            "type_mismatches": {column: {**mismatch, "actual": ", ".join(mismatch["actual"])}
+                                for column, mismatch in self.type_mismatches.items()},
+        }
+        for section, count_key, rate_key in (("range_violations", "violation_count", "violation_percentage"),
+                                             ("outliers", "outlier_count", "outlier_percentage"),
+                                             ("rule_violations", "violation_count", "violation_percentage")):
+            results[section] = {name: {**self.details[section][name], count_key: count,
+                                       rate_key: count / max(self.rows, 1)}
+                                for name, count in self.counts[section].items()}
+        for details in results["outliers"].values():
+            details["per_chunk"] = True
+        results["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return results
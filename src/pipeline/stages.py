@@ -0,0 +1,250 @@
+# src/pipeline/stages.py
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+
+from src.data_ingestion.cache import DEFAULT_CACHE_DIR, file_fingerprint
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+from src.data_standardization.standardizer import DataStandardizer
+from src.data_validation.validator import DataValidator
+
+# memoized stage graph for ingest -> validate -> standardize
+#
+# every stage gets a key hashed from its config, the fingerprints of its input files
+# (including files named in its config, ex. a gene id mapping table), the source of the
+# code it runs and the keys of its upstream stages, so a change anywhere upstream changes
+# every key below it. the clinical stages hash the whole src/ tree, helpers they import
+# (cache, predicates, rules, string transforms, ...) are part of their version too.
+# outputs are pickled into the artifact cache under that key; a rerun with nothing
+# changed only computes keys and loads the requested outputs
+
+# source file hashes, keyed by (path, mtime) so unchanged modules are read once
+_code_hashes = {}
+
+# the src/ package tree
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _file_hash(path):
+    cache_key = (path, os.stat(path).st_mtime_ns)
+    if cache_key not in _code_hashes:
+        with open(path, "rb") as f:
+            _code_hashes[cache_key] = hashlib.sha1(f.read()).hexdigest()
+    return _code_hashes[cache_key]
+
+
+def tree_hash(directory):
+    """
+    Hash of every python source file under a directory (names and contents)
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(f for f in files if f.endswith(".py")):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, directory).encode())
+            digest.update(_file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def config_files(config):
+    """Existing files named anywhere in a (nested) config, ex. mapping tables"""
+    if isinstance(config, dict):
+        return [path for value in config.values() for path in config_files(value)]
+    if isinstance(config, (list, tuple)):
+        return [path for value in config for path in config_files(value)]
+    if isinstance(config, str) and os.path.isfile(config):
+        return [config]
+    return []
+
+
+def code_hash(obj):
+    """
+    Hash of the source file that defines a function, class or module,
+    or of every source file under a directory path
+
+    Returns:
+        str: hex digest ("" when the source is not available)
+    """
+    if isinstance(obj, str):
+        return tree_hash(obj) if os.path.isdir(obj) else ""
+    try:
+        path = inspect.getsourcefile(obj)
+    except TypeError:
+        return ""
+    if path is None or not os.path.exists(path):
+        return ""
+
+    return _file_hash(path)
+
+
+class Stage:
+    """
+    One step of the graph: func(*upstream outputs, **config)
+    """
+
+    def __init__(self, name, func, upstream=(), config=None, files=(), code=()):
+        """
+        Args:
+            name: stage name, unique in the graph
+            func: callable producing the stage output
+            upstream: names of the stages whose outputs are passed to func, in order
+            config: keyword arguments of func (json serializable)
+            files: input files, re-run when their fingerprint changes (files named in the
+                config are added)
+            code: extra functions/classes/modules, or source directories, whose source is
+                part of the stage version
+        """
+        self.name = name
+        self.func = func
+        self.upstream = list(upstream)
+        self.config = config or {}
+        self.files = list(dict.fromkeys(list(files) + config_files(self.config)))
+        self.code = [func] + list(code)
+
+
+class StageGraph:
+    """
+    Runs stages in dependency order, skipping stages whose key is in the artifact cache
+    """
+
+    def __init__(self, cache_dir=None, logger=None):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "stages")
+        self.logger = logger or logging.getLogger(__name__)
+        self.stages = {}
+        self.last_run = {}
+
+    def add(self, name, func, upstream=(), config=None, files=(), code=()):
+        """
+        Add a stage, upstream stages must already be in the graph
+
+        Returns:
+            Stage
+        """
+        for dependency in upstream:
+            if dependency not in self.stages:
+                raise KeyError(f"Unknown upstream stage {dependency} for {name}")
+        self.stages[name] = Stage(name, func, upstream, config, files, code)
+        return self.stages[name]
+
+    def keys(self):
+        """
+        Cache key of every stage
+
+        Returns:
+            dict of stage name -> hex digest
+        """
+        keys = {}
+        # stages are added after their upstream stages, insertion order is a valid order
+        for name, stage in self.stages.items():
+            identity = {
+                "name": name,
+                "config": stage.config,
+                "files": [file_fingerprint(path) for path in stage.files],
+                "code": [code_hash(obj) for obj in stage.code],
+                "upstream": [keys[dependency] for dependency in stage.upstream],
+            }
+            payload = json.dumps(identity, sort_keys=True, default=str)
+            keys[name] = hashlib.sha1(payload.encode()).hexdigest()
+        return keys
+
+    def _artifact(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}.pkl")
+
+    def _load(self, name, key):
+        with open(self._artifact(name, key), "rb") as f:
+            return pickle.load(f)
+
+    def _store(self, name, key, output):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._artifact(name, key)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    def run(self, targets=None, force=()):
+        """
+        Produce the outputs of the target stages
+
+        Args:
+            targets: stage names to return (defaults to every stage)
+            force: stage names to re-run even when cached
+
+        Returns:
+            dict of target name -> output
+        """
+        targets = list(targets or self.stages)
+        keys = self.keys()
+        outputs = {}
+        self.last_run = {}
+
+        def resolve(name):
+            if name in outputs:
+                return outputs[name]
+
+            key = keys[name]
+            if name not in force and os.path.exists(self._artifact(name, key)):
+                outputs[name] = self._load(name, key)
+                self.last_run[name] = "cached"
+                return outputs[name]
+
+            # upstream outputs are only loaded when this stage has to run
+            stage = self.stages[name]
+            inputs = [resolve(dependency) for dependency in stage.upstream]
+            self.logger.info(f"running stage {name}")
+            outputs[name] = stage.func(*inputs, **stage.config)
+            self._store(name, key, outputs[name])
+            self.last_run[name] = "ran"
+            return outputs[name]
+
+        return {name: resolve(name) for name in targets}
+
+
+# clinical pipeline stages
+
+def ingest_stage(data_path, read_kwargs=None):
+    """Load a clinical table"""
+    return ClinicalDataIngestor(data_path).load_data(**(read_kwargs or {}))
+
+
+def validate_stage(data, **validation_config):
+    """Run all validations, returns the validation results"""
+    return DataValidator(data).run_all_validations(**validation_config)
+
+
+def standardize_stage(data, config):
+    """Run the standardization pipeline on a copy, returns the data and standardization info"""
+    standardizer = DataStandardizer(data.copy())
+    info = standardizer.run_standardization_pipeline(config)
+    return {"data": standardizer.data, "standardization_info": info}
+
+
+def clinical_pipeline(data_path, read_kwargs=None, validation_config=None, standardization_config=None,
+                      cache_dir=None, logger=None):
+    """
+    Stage graph for one clinical file: ingest -> validate, ingest -> standardize
+
+    Args:
+        data_path: input file
+        read_kwargs: keyword arguments for load_data
+        validation_config: keyword arguments for run_all_validations
+        standardization_config: config for run_standardization_pipeline
+
+    Returns:
+        StageGraph with stages "ingest", "validate" and "standardize"
+    """
+    graph = StageGraph(cache_dir, logger)
+    graph.add("ingest", ingest_stage, config={"data_path": data_path, "read_kwargs": read_kwargs or {}},
+              files=[data_path], code=[SOURCE_ROOT])
+    graph.add("validate", validate_stage, upstream=["ingest"], config=validation_config or {},
+              code=[SOURCE_ROOT])
+    graph.add("standardize", standardize_stage, upstream=["ingest"],
+              config={"config": standardization_config or {}}, code=[SOURCE_ROOT])
+    return graph
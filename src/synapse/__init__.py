@@ -0,0 +1,6 @@
+
+# src/synapse/__init__.py
+
+
+from .client import SynapseClient
+from .mock_server import MockSynapseServer
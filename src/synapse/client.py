@@ -0,0 +1,303 @@
+# src/synapse/client.py
+
+import hashlib
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import quote, urlsplit
+
+# upload/download of processed artifacts in parallel parts
+#
+# uploads: the file md5 is computed in one streaming pass, files whose md5 is already
+# stored remotely are skipped, otherwise the missing parts (a resumed upload only sends
+# what the server does not have) go out on a thread pool, each with its own md5 and retries.
+# downloads: ranged GETs on a thread pool written straight into a preallocated file.
+# the client keeps one worker pool for all its transfers and a bounded pool of keep-alive
+# connections shared by those workers, so connections are reused across files and at most
+# max_workers + 1 (the calling thread) are ever open
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+_READ_SIZE = 1024 * 1024
+
+
+class TransferError(Exception):
+    """A request failed after all retries"""
+
+
+def file_md5(path, read_size=_READ_SIZE):
+    """MD5 of a file, streamed in blocks"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(read_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SynapseClient:
+    """
+    Chunked, concurrent transfer client for the artifact store
+    """
+
+    def __init__(self, base_url, part_size=DEFAULT_PART_SIZE, max_workers=8, retries=3, backoff=0.2,
+                 timeout=60, logger=None):
+        """
+        Args:
+            base_url: store url (ex. the url of a MockSynapseServer)
+            part_size: bytes per part
+            max_workers: parallel part transfers
+            retries: attempts per request after the first one
+            backoff: seconds before the first retry, doubled on every retry
+            timeout: socket timeout in seconds
+        """
+        url = urlsplit(base_url)
+        self.scheme, self.host, self.port = url.scheme, url.hostname, url.port
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._idle = queue.LifoQueue(maxsize=max_workers + 1)
+        self._connections_lock = threading.Lock()
+        self._pool = None
+        self.stats = {"requests": 0, "retries": 0, "connections": 0}
+
+    # connection pool, idle keep-alive connections shared by every thread
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            with self._connections_lock:
+                self.stats["connections"] += 1
+            return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _workers(self):
+        """Worker pool of the client, created on first use and kept until close()"""
+        with self._connections_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="synapse")
+            return self._pool
+
+    def _map(self, function, items):
+        """
+        Run function over items on the worker pool, in order. On the first failure the
+        parts not started yet are cancelled and running ones finish before it is raised
+        """
+        futures = [self._workers().submit(function, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            raise
+
+    def close(self):
+        """Stop the worker pool and close every pooled connection"""
+        with self._connections_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, method, path, body=None, headers=None):
+        """
+        One request with retries on connection errors and 5xx answers,
+        other statuses are returned for the caller to check
+
+        Returns:
+            (status, response bytes)
+        """
+        for attempt in range(self.retries + 1):
+            connection = self._acquire()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+                with self._connections_lock:
+                    self.stats["requests"] += 1
+                self._release(connection)
+
+                if response.status < 500:
+                    return response.status, data
+                error = f"{method} {path} answered {response.status}: {data[:200]!r}"
+            except (OSError, http.client.HTTPException) as e:
+                # stale keep-alive connections are dropped, the next attempt takes another one
+                connection.close()
+                error = f"{method} {path} failed: {str(e)}"
+
+            if attempt < self.retries:
+                with self._connections_lock:
+                    self.stats["retries"] += 1
+                self.logger.warning(f"{error}, retry {attempt + 1}/{self.retries}")
+                time.sleep(self.backoff * 2 ** attempt)
+
+        raise TransferError(error)
+
+    def _json(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        status, data = self._request(method, path, body, headers)
+        return status, json.loads(data) if data else {}
+
+    # remote metadata
+
+    def remote_file(self, name):
+        """
+        Metadata of a stored file
+
+        Returns:
+            dict with name, size and md5, or None when the file is not stored
+        """
+        status, meta = self._json("GET", f"/files/{quote(name, safe='')}")
+        return meta if status == 200 else None
+
+    # upload
+
+    def _upload_part(self, path, upload_id, number):
+        with open(path, "rb") as f:
+            f.seek(number * self.part_size)
+            data = f.read(self.part_size)
+
+        headers = {"Content-MD5": hashlib.md5(data).hexdigest(), "Content-Type": "application/octet-stream"}
+        status, answer = self._request("PUT", f"/uploads/{upload_id}/parts/{number}", data, headers)
+        if status != 200:
+            raise TransferError(f"part {number} of {path} rejected ({status}): {answer[:200]!r}")
+        return len(data)
+
+    def upload(self, path, name=None):
+        """
+        Upload a file in parallel parts, skipping it when the store already has the same md5
+
+        Args:
+            path: local file
+            name: remote name (defaults to the file name)
+
+        Returns:
+            dict with name, size, md5, skipped, parts_sent, bytes_sent and seconds
+        """
+        name = name or os.path.basename(path)
+        start = time.perf_counter()
+        size = os.path.getsize(path)
+        md5 = file_md5(path)
+
+        remote = self.remote_file(name)
+        if remote and remote["md5"] == md5:
+            self.logger.info(f"{name} is up to date remotely, skipping upload")
+            return {"name": name, "size": size, "md5": md5, "skipped": True,
+                    "parts_sent": 0, "bytes_sent": 0, "seconds": time.perf_counter() - start}
+
+        _, upload = self._json("POST", "/uploads", {"name": name, "size": size, "md5": md5,
+                                                    "part_size": self.part_size})
+        parts = max(1, -(-size // self.part_size))
+        pending = [n for n in range(parts) if n not in set(upload["parts_done"])]
+        if len(pending) < parts:
+            self.logger.info(f"resuming upload of {name}: {parts - len(pending)} of {parts} parts already stored")
+
+        sent = self._map(lambda n: self._upload_part(path, upload["upload_id"], n), pending)
+
+        status, meta = self._json("POST", f"/uploads/{upload['upload_id']}/complete")
+        if status != 200 or meta.get("md5") != md5:
+            raise TransferError(f"completing upload of {name} failed ({status}): {meta}")
+
+        elapsed = time.perf_counter() - start
+        self.logger.info(f"uploaded {name}: {size / 1e6:.1f} MB in {elapsed:.2f}s")
+        return {"name": name, "size": size, "md5": md5, "skipped": False,
+                "parts_sent": len(pending), "bytes_sent": sum(sent), "seconds": elapsed}
+
+    def upload_directory(self, directory, prefix=""):
+        """
+        Upload every file under a directory, remote names keep the relative paths
+
+        Returns:
+            summary dict with per-file results and throughput
+        """
+        start = time.perf_counter()
+        results = []
+        for root, _, files in os.walk(directory):
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                results.append(self.upload(path, prefix + relative))
+
+        elapsed = time.perf_counter() - start
+        sent = sum(r["bytes_sent"] for r in results)
+        return {"files": results, "uploaded": sum(not r["skipped"] for r in results),
+                "skipped": sum(r["skipped"] for r in results), "bytes_sent": sent, "seconds": elapsed,
+                "mb_per_second": sent / 1e6 / elapsed if elapsed > 0 else 0.0}
+
+    # download
+
+    def _download_part(self, name, target, number, size):
+        first = number * self.part_size
+        last = min(first + self.part_size, size) - 1
+        status, data = self._request("GET", f"/files/{quote(name, safe='')}/content",
+                                     headers={"Range": f"bytes={first}-{last}"})
+        if status != 206 or len(data) != last - first + 1:
+            raise TransferError(f"range {first}-{last} of {name} failed ({status})")
+
+        with open(target, "r+b") as f:
+            f.seek(first)
+            f.write(data)
+        return len(data)
+
+    def download(self, name, path):
+        """
+        Download a stored file in parallel ranges, skipping it when the local copy matches
+
+        Args:
+            name: remote name
+            path: local target file
+
+        Returns:
+            dict with name, size, md5, skipped, bytes_received and seconds
+        """
+        start = time.perf_counter()
+        remote = self.remote_file(name)
+        if remote is None:
+            raise FileNotFoundError(f"Remote file not found: {name}")
+
+        if os.path.exists(path) and os.path.getsize(path) == remote["size"] and file_md5(path) == remote["md5"]:
+            return {**remote, "skipped": True, "bytes_received": 0, "seconds": time.perf_counter() - start}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        partial = path + ".part"
+        with open(partial, "wb") as f:
+            f.truncate(remote["size"])
+
+        parts = -(-remote["size"] // self.part_size)
+        received = self._map(lambda n: self._download_part(name, partial, n, remote["size"]), range(parts))
+
+        md5 = file_md5(partial)
+        if md5 != remote["md5"]:
+            os.remove(partial)
+            raise TransferError(f"md5 mismatch after downloading {name}: {md5} != {remote['md5']}")
+        os.replace(partial, path)
+
+        elapsed = time.perf_counter() - start
+        self.logger.info(f"downloaded {name}: {remote['size'] / 1e6:.1f} MB in {elapsed:.2f}s")
+        return {**remote, "skipped": False, "bytes_received": sum(received), "seconds": elapsed}
@@ -0,0 +1,257 @@
+# src/synapse/mock_server.py
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# local stand-in for the remote file store, speaks the protocol SynapseClient uses:
+#
+#   GET  /files/<name>                    file metadata (size, md5) or 404
+#   GET  /files/<name>/content            file bytes, supports "Range: bytes=a-b"
+#   POST /uploads                         start or resume a multipart upload
+#   PUT  /uploads/<id>/parts/<n>          one part, checked against its Content-MD5 header
+#   POST /uploads/<id>/complete           assemble the parts and verify the file md5
+#
+# fail_rate makes part uploads fail at random, to exercise client retries offline
+
+_PART = re.compile(r"^/uploads/([^/]+)/parts/(\d+)$")
+_COMPLETE = re.compile(r"^/uploads/([^/]+)/complete$")
+_RANGE = re.compile(r"^bytes=(\d+)-(\d*)$")
+
+
+class MockSynapseServer:
+    """
+    Threaded HTTP file store for offline transfer tests
+    """
+
+    def __init__(self, root=None, host="127.0.0.1", port=0, fail_rate=0.0, seed=None, logger=None):
+        """
+        Args:
+            root: storage directory (a temporary directory when None)
+            host: bind address
+            port: bind port (0 = any free port)
+            fail_rate: probability that a part upload answers 500
+            seed: random seed for the injected failures
+        """
+        self._own_root = root is None
+        self.root = root or tempfile.mkdtemp(prefix="mock_synapse_")
+        self.fail_rate = fail_rate
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.files = {}
+        self.uploads = {}
+        self.stats = {"parts_received": 0, "parts_failed": 0, "bytes_received": 0, "bytes_sent": 0}
+
+        os.makedirs(os.path.join(self.root, "files"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "parts"), exist_ok=True)
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        self.logger.info(f"mock synapse server listening on {self.url}")
+        return self
+
+    def stop(self):
+        """Stop serving and remove temporary storage"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._own_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # storage
+
+    def _file_path(self, name):
+        return os.path.join(self.root, "files", hashlib.sha1(name.encode()).hexdigest())
+
+    def _part_path(self, upload_id, number):
+        return os.path.join(self.root, "parts", f"{upload_id}-{number}")
+
+    def _start_upload(self, request):
+        with self._lock:
+            # resume: same name and checksum continue the unfinished upload
+            for upload_id, upload in self.uploads.items():
+                if upload["name"] == request["name"] and upload["md5"] == request["md5"] \
+                        and upload["part_size"] == request["part_size"]:
+                    return {"upload_id": upload_id, "parts_done": sorted(upload["parts"])}
+
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {**request, "parts": {}}
+            return {"upload_id": upload_id, "parts_done": []}
+
+    def _put_part(self, upload_id, number, body, content_md5):
+        with self._lock:
+            upload = self.uploads.get(upload_id)
+            fail = self._random.random() < self.fail_rate
+        if upload is None:
+            return 404, {"error": "unknown upload"}
+        if fail:
+            with self._lock:
+                self.stats["parts_failed"] += 1
+            return 500, {"error": "injected failure"}
+
+        md5 = hashlib.md5(body).hexdigest()
+        if content_md5 and md5 != content_md5:
+            return 400, {"error": f"part md5 mismatch: {md5} != {content_md5}"}
+
+        with open(self._part_path(upload_id, number), "wb") as f:
+            f.write(body)
+        with self._lock:
+            upload["parts"][number] = md5
+            self.stats["parts_received"] += 1
+            self.stats["bytes_received"] += len(body)
+        return 200, {"part": number, "md5": md5}
+
+    def _complete(self, upload_id):
+        with self._lock:
+            upload = self.uploads.get(upload_id)
+        if upload is None:
+            return 404, {"error": "unknown upload"}
+
+        expected_parts = max(1, -(-upload["size"] // upload["part_size"]))
+        missing = [n for n in range(expected_parts) if n not in upload["parts"]]
+        if missing:
+            return 409, {"error": "missing parts", "missing": missing}
+
+        digest = hashlib.md5()
+        target = self._file_path(upload["name"])
+        with open(target + ".tmp", "wb") as out:
+            for n in range(expected_parts):
+                with open(self._part_path(upload_id, n), "rb") as part:
+                    data = part.read()
+                digest.update(data)
+                out.write(data)
+
+        if digest.hexdigest() != upload["md5"]:
+            os.remove(target + ".tmp")
+            return 422, {"error": "file md5 mismatch"}
+
+        os.replace(target + ".tmp", target)
+        for n in range(expected_parts):
+            os.remove(self._part_path(upload_id, n))
+
+        meta = {"name": upload["name"], "size": upload["size"], "md5": upload["md5"]}
+        with self._lock:
+            self.files[upload["name"]] = meta
+            del self.uploads[upload_id]
+        return 200, meta
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                server.logger.debug(format % args)
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(length) if length else b""
+
+            def do_GET(self):
+                path = self.path
+                if path.startswith("/files/") and path.endswith("/content"):
+                    return self._send_content(unquote(path[len("/files/"):-len("/content")]))
+                if path.startswith("/files/"):
+                    meta = server.files.get(unquote(path[len("/files/"):]))
+                    return self._send_json(200, meta) if meta else self._send_json(404, {"error": "not found"})
+                self._send_json(404, {"error": "not found"})
+
+            def _send_content(self, name):
+                meta = server.files.get(name)
+                if meta is None:
+                    return self._send_json(404, {"error": "not found"})
+
+                start, end = 0, meta["size"] - 1
+                match = _RANGE.match(self.headers.get("Range", ""))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)) if match.group(2) else end, end)
+
+                with open(server._file_path(name), "rb") as f:
+                    f.seek(start)
+                    data = f.read(max(end - start + 1, 0))
+
+                self.send_response(206 if match else 200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                with server._lock:
+                    server.stats["bytes_sent"] += len(data)
+
+            def do_POST(self):
+                body = self._body()
+                if self.path == "/uploads":
+                    return self._send_json(200, server._start_upload(json.loads(body)))
+                match = _COMPLETE.match(self.path)
+                if match:
+                    return self._send_json(*server._complete(match.group(1)))
+                self._send_json(404, {"error": "not found"})
+
+            def do_PUT(self):
+                body = self._body()
+                match = _PART.match(self.path)
+                if match is None:
+                    return self._send_json(404, {"error": "not found"})
+                self._send_json(*server._put_part(match.group(1), int(match.group(2)), body,
+                                                  self.headers.get("Content-MD5")))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock file store for transfer tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--root", help="storage directory (temporary if omitted)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability of failing a part upload")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = MockSynapseServer(args.root, args.host, args.port, args.fail_rate)
+    print(f"serving on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
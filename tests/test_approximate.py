@@ -0,0 +1,74 @@
+
+# test_approximate.py
+import logging
+import numpy as np
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+from src.data_validation.validator import DataValidator
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_reservoir_sample():
+    """Reservoir sample keeps sample_size rows and counts every row"""
+
+    ingestor = ClinicalDataIngestor('data/raw/GSE289715_counts.csv')
+    sample, total_rows = ingestor.sample_rows(500, chunksize=5000, seed=7)
+
+    assert total_rows == 68836
+    assert len(sample) == 500
+    assert sample.index.is_unique
+
+    # rows come from the whole file, not just the first chunk
+    assert sample.index.max() > 34000
+
+    # same seed, same sample
+    again, _ = ingestor.sample_rows(500, chunksize=5000, seed=7)
+    assert np.array_equal(sample.index, again.index)
+
+def test_approximate_validation_intervals():
+    """Approximate mode reports estimates with intervals that bracket the exact value"""
+
+    ingestor = ClinicalDataIngestor('data/raw/GSE289715_counts.csv')
+    validator = DataValidator.from_sample(ingestor, sample_size=2000, seed=1, chunksize=10000)
+
+    range_rules = {"KI_3": {"min": 0, "max": 100}, "SAA_4": {"min": 0}}
+    results = validator.run_approximate_validations(
+        expected_types={"KI_3": "numeric", "genes": "string"},
+        range_rules=range_rules
+    )
+
+    approx = results["approximate"]
+    logger.info(f"approximate results: {approx['range_violation_rates']}")
+
+    assert approx["sample_size"] == 2000
+    assert approx["population_size"] == 68836
+    assert approx["type_violation_rates"]["KI_3"]["estimate"] == 0.0
+
+    # exact rate from the full matrix should fall inside the interval
+    full = ingestor.load_data()
+    exact = (full["KI_3"] > 100).mean()
+    low, high = approx["range_violation_rates"]["KI_3"]["interval"]
+    assert low <= exact <= high
+
+    # a check without sampled violations still gets an estimate and an upper bound
+    assert "SAA_4" not in results["range_violations"]
+    passed = approx["range_violation_rates"]["SAA_4"]
+    assert passed["estimate"] == 0.0 and passed["interval"][0] == 0.0 and 0 < passed["interval"][1] < 0.01
+    assert set(approx["outlier_rates"]) == set(full.select_dtypes("number").columns)
+
+def test_approximate_metadata():
+    """Approximate metadata keeps the exact row count and estimates missing values"""
+
+    metadata = ClinicalDataIngestor('data/raw/sample_clinical.csv').get_metadata(approximate=True, sample_size=5)
+
+    assert metadata["approximate"]
+    assert metadata["num_subjects"] == 9
+    assert metadata["sample_size"] == 5
+    assert metadata["missing_values"]["age"] == 0
+
+if __name__ == "__main__":
+    test_reservoir_sample()
+    test_approximate_validation_intervals()
+    test_approximate_metadata()
@@ -0,0 +1,158 @@
+# test_batchcli.py
+import json
+import logging
+import os
+import shutil
+import tempfile
+import pandas as pd
+from src.data_export.exporter import PartitionedExporter
+from src.data_validation.validator import DataValidator
+from src.pipeline.cli import collect_inputs, main, run_batch, source_keys
+from src.pipeline.memory import set_memory_budget
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/sample_clinical.csv'
+
+CONFIG = {
+    "validation": {"range_rules": {"age": {"min": 50, "max": 90}}},
+    "standardization": {"ids": {"column": "subject_id", "format": "alphanumeric", "prefix": "SUBJ-"}},
+    "partition_cols": ["diagnosis"],
+}
+
+def _drop(tmp_dir, n_files):
+    """Copies of the sample file as a new data drop"""
+    raw_dir = os.path.join(tmp_dir, "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    for i in range(n_files):
+        shutil.copy(DATA_PATH, os.path.join(raw_dir, f"site_{i}.csv"))
+    return raw_dir
+
+def test_batch_run_and_resume():
+    """Checkpointed files are skipped, changed and failed files are processed again"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = _drop(tmp_dir, 3)
+        output = os.path.join(tmp_dir, "processed")
+        cache_dir = os.path.join(tmp_dir, "cache")
+
+        # a file the ingestor cannot read stops nothing else, it just stays un-checkpointed
+        broken = os.path.join(raw_dir, "site_9.csv")
+        open(broken, "w").close()
+
+        files = collect_inputs([raw_dir], "*.csv")
+        assert len(files) == 4
+
+        summary = run_batch(files, output, CONFIG, workers=2, cache_dir=cache_dir)
+        logger.info(f"first run: {summary}")
+        assert summary["processed"] == 3
+        assert summary["failed"] == [broken]
+        assert summary["rows_per_second"] > 0
+
+        exported = PartitionedExporter(output).read()
+        assert sorted(exported["source"].unique()) == ["site_0", "site_1", "site_2"]
+        harmonized = [c for c in exported.columns if c.startswith("harmonized")]
+        assert exported[harmonized[0]].str.startswith("SUBJ-").all()
+
+        # resume after fixing the broken file: only that file runs
+        shutil.copy(DATA_PATH, broken)
+        summary = run_batch(files, output, CONFIG, workers=2, cache_dir=cache_dir)
+        assert summary["skipped"] == 3
+        assert summary["processed"] == 1
+        assert summary["failed"] == []
+
+def test_same_file_names_in_subdirectories():
+    """Files sharing a name keep separate sources, config changes invalidate checkpoints"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = os.path.join(tmp_dir, "raw")
+        for site in ("a", "b"):
+            os.makedirs(os.path.join(raw_dir, site))
+            shutil.copy(DATA_PATH, os.path.join(raw_dir, site, "patients.csv"))
+        files = [os.path.join(raw_dir, "a", "patients.csv"), os.path.join(raw_dir, "b", "patients.csv")]
+
+        keys = source_keys(files + [os.path.join(raw_dir, "a", "patients.xlsx")], root=raw_dir)
+        logger.info(f"source keys: {keys}")
+        assert sorted(keys.values()) == ["a/patients.csv", "a/patients.xlsx", "b/patients"]
+
+        output = os.path.join(tmp_dir, "processed")
+        cache_dir = os.path.join(tmp_dir, "cache")
+        summary = run_batch(files, output, CONFIG, cache_dir=cache_dir, root=raw_dir)
+        assert summary["processed"] == 2
+
+        exported = PartitionedExporter(output).read()
+        assert sorted(exported["source"].unique()) == ["a/patients", "b/patients"]
+        assert len(exported) == 2 * len(pd.read_csv(DATA_PATH))
+
+        # same files, different config: nothing is skipped
+        changed = {**CONFIG, "partition_cols": []}
+        summary = run_batch(files, output, changed, cache_dir=cache_dir, root=raw_dir)
+        assert summary["skipped"] == 0 and summary["processed"] == 2
+
+def test_budget_streams_large_files():
+    """Files over the memory budget are processed in chunks and exported from staged parts"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = os.path.join(tmp_dir, "raw")
+        os.makedirs(raw_dir)
+        data = pd.read_csv(DATA_PATH)
+        tall = pd.concat([data] * 20000, ignore_index=True)
+        tall.to_csv(os.path.join(raw_dir, "tall.csv"), index=False)
+        shutil.copy(DATA_PATH, os.path.join(raw_dir, "small.csv"))
+        output = os.path.join(tmp_dir, "processed")
+
+        set_memory_budget("32MB")
+        try:
+            files = collect_inputs([raw_dir])
+            summary = run_batch(files, output, CONFIG, cache_dir=os.path.join(tmp_dir, "cache"))
+            assert summary["processed"] == 2 and summary["rows"] == len(tall) + len(data)
+
+            exporter = PartitionedExporter(output)
+            large = exporter.read(sources=["tall"])
+            assert len(large) == len(tall)
+            assert (large["diagnosis"] == "AD").sum() == (tall["diagnosis"] == "AD").sum()
+            entry = exporter.partitions([("source", "==", "tall"), ("diagnosis", "==", "AD")])[0]
+            assert len(entry["files"]) > 1
+            merged = exporter.provenance("tall")["validation_results"]["range_violations"]
+            eager = DataValidator(tall).validate_value_ranges(CONFIG["validation"]["range_rules"])
+            assert {c: merged[c]["violation_count"] for c in merged} == {c: eager[c]["violation_count"] for c in eager}
+            assert not os.listdir(os.path.join(output, ".staging"))
+
+            # an unchanged rerun keeps the partitions it exported
+            again = run_batch(files, output, CONFIG, cache_dir=os.path.join(tmp_dir, "cache"), restart=True)
+            assert again["processed"] == 2
+            assert PartitionedExporter(output).partitions([("source", "==", "tall")]) == \
+                exporter.partitions([("source", "==", "tall")])
+        finally:
+            set_memory_budget(None)
+
+def test_cli_entry_point(capsys):
+    """The command line prints the throughput summary"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = _drop(tmp_dir, 2)
+        config_path = os.path.join(tmp_dir, "config.json")
+        with open(config_path, "w") as f:
+            json.dump(CONFIG, f)
+
+        args = [raw_dir, "--output", os.path.join(tmp_dir, "processed"), "--config", config_path,
+                "--workers", "1", "--cache-dir", os.path.join(tmp_dir, "cache")]
+        assert main(args) == 0
+        printed = capsys.readouterr().out
+        logger.info(printed)
+        assert "processed 2 files" in printed
+        assert "rows/s" in printed and "MB/s" in printed
+
+        assert main(args) == 0
+        assert "processed 0 files (2 skipped" in capsys.readouterr().out
+
+if __name__ == "__main__":
+    test_batch_run_and_resume()
+    test_same_file_names_in_subdirectories()
+    test_budget_streams_large_files()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = _drop(tmp_dir, 2)
+        main([raw_dir, "--output", os.path.join(tmp_dir, "processed"), "--cache-dir", os.path.join(tmp_dir, "cache")])
@@ -0,0 +1,65 @@
+# test_coexpression.py
+import logging
+import time
+import numpy as np
+import pandas as pd
+from src.omics.coexpression import CoexpressionEngine
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+
+def _dense_top_k(counts, k, absolute=False):
+    """Reference top k from the full correlation matrix"""
+    cpm = counts / counts.sum() * 1e6
+    log_cpm = np.log2(cpm + 1)
+    log_cpm = log_cpm[log_cpm.std(axis=1) > 0]
+
+    corr = np.corrcoef(log_cpm.to_numpy())
+    scores = np.abs(corr) if absolute else corr.copy()
+    np.fill_diagonal(scores, -np.inf)
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return log_cpm.index, corr, top
+
+def test_blocked_top_k_matches_dense():
+    """Tiles smaller than the matrix give the same partners as the dense matrix"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0).iloc[:3000]
+    genes, corr, top = _dense_top_k(counts, k=5)
+
+    start = time.perf_counter()
+    edges = CoexpressionEngine(top_k=5, block_size=256, n_jobs=2).top_partners(counts)
+    logger.info(f"top 5 partners of {len(genes)} genes in {time.perf_counter() - start:.2f}s")
+
+    assert len(edges) == len(genes) * 5
+    assert edges["gene"].nunique() == len(genes)
+    assert (edges["gene"] != edges["partner"]).all()
+
+    position = {g: i for i, g in enumerate(genes)}
+    for gene, group in edges.groupby("gene", sort=False):
+        i = position[gene]
+        expected = np.sort(corr[i, top[i]])[::-1]
+        assert np.allclose(group.sort_values("rank")["correlation"].to_numpy(), expected, atol=1e-4)
+
+def test_absolute_and_small_inputs():
+    """|r| ranking keeps negative partners, k larger than the gene count is capped"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0).iloc[:1000]
+    genes, corr, top = _dense_top_k(counts, k=3, absolute=True)
+
+    edges = CoexpressionEngine(top_k=3, block_size=128, absolute=True, n_jobs=1).top_partners(counts)
+    first = edges[edges["rank"] == 1].set_index("gene")["correlation"]
+    expected = pd.Series(corr[np.arange(len(genes)), top[:, 0]], index=genes)
+    assert np.allclose(first.abs(), expected.abs().loc[first.index], atol=1e-4)
+    assert (edges["correlation"] < 0).any()
+
+    tiny = counts[counts.std(axis=1) > 0].iloc[:4]
+    edges = CoexpressionEngine(top_k=10).top_partners(tiny)
+    assert len(edges) == 4 * 3
+
+if __name__ == "__main__":
+    test_blocked_top_k_matches_dense()
+    test_absolute_and_small_inputs()
@@ -0,0 +1,109 @@
+
+# test_countmerge.py
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from src.integration.store import MultiOmicsStore
+from src.omics.merge import CountMatrixMerger, merge_count_matrices, series_names
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+
+def write_series(tmp_dir):
+    """Two overlapping series cut from the GEO counts, the second one with a duplicated gene row"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0)
+    first = counts.iloc[:40000][["KI_3", "KI_4", "KI_6", "KI_7", "KI_8"]]
+    second = counts.iloc[30000:][["SAA_4", "SAA_5", "SAA_6", "SAA_7", "SAA_8"]]
+    second = pd.concat([second, second.iloc[[0]] * 2])
+
+    paths = []
+    for name, frame in (("GSE_A", first), ("GSE_B", second)):
+        path = os.path.join(tmp_dir, f"{name}.csv")
+        frame.to_csv(path, index_label="genes")
+        paths.append(path)
+    return first, second, paths
+
+def test_outer_merge_matches_pandas():
+    """Outer merge into the store equals a pandas outer join with zero fill and summed duplicates"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first, second, paths = write_series(tmp_dir)
+
+        stats = merge_count_matrices(paths, os.path.join(tmp_dir, "store"), "rnaseq",
+                                     cache_dir=os.path.join(tmp_dir, "cache"), sample_chunk=4, row_chunk=7000)
+        logger.info(f"merge summary: {stats['genes']} genes x {stats['samples']} samples, {stats['series']}")
+
+        expected = pd.concat([first.groupby(level=0).sum(), second.groupby(level=0).sum()], axis=1)
+        expected = expected.fillna(0).astype(np.int64).sort_index()
+
+        store = MultiOmicsStore(os.path.join(tmp_dir, "store"))
+        merged = store.read_matrix("rnaseq")
+        assert merged.index.tolist() == expected.index.astype(str).tolist()
+        assert merged.columns.tolist() == expected.columns.tolist()
+        assert np.array_equal(merged.to_numpy(), expected.to_numpy())
+        assert stats["series"]["GSE_B"]["duplicates"]
+
+        # samples of both series share sample blocks of four
+        info = store.manifest["modalities"]["rnaseq"]
+        assert [len(block) for block in info["sample_blocks"]] == [4, 4, 2]
+
+def test_inner_merge_and_sample_checks():
+    """Inner merges keep only shared genes, clashing sample names need prefixes"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first, second, paths = write_series(tmp_dir)
+        cache_dir = os.path.join(tmp_dir, "cache")
+
+        merger = CountMatrixMerger(how="inner", duplicates="first", cache_dir=cache_dir)
+        stats = merger.merge({"a": paths[0], "b": paths[1]}, os.path.join(tmp_dir, "store"), "shared")
+
+        shared = first.index.intersection(second.index)
+        merged = MultiOmicsStore(os.path.join(tmp_dir, "store")).read_matrix("shared")
+        assert stats["genes"] == len(shared.unique())
+        duplicated = second.index[0]
+        assert merged.loc[str(duplicated), "SAA_4"] == second.loc[duplicated, "SAA_4"].iloc[0]
+        assert merged.loc[str(duplicated), "KI_3"] == first["KI_3"][first.index == duplicated].iloc[0]
+
+        try:
+            merger.merge({"a": paths[0], "b": paths[0]}, os.path.join(tmp_dir, "store"), "twice")
+            assert False, "clashing sample ids should be rejected"
+        except ValueError:
+            pass
+
+        prefixed = CountMatrixMerger(prefix_samples=True, cache_dir=cache_dir)
+        prefixed.merge({"a": paths[0], "b": paths[0]}, os.path.join(tmp_dir, "store"), "twice")
+        assert MultiOmicsStore(os.path.join(tmp_dir, "store")).modality_samples("twice")[:2] == ["a:KI_3", "a:KI_4"]
+
+def test_same_file_name_in_two_directories():
+    """Series sharing a file name are named by their directory instead of replacing each other"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first, second, paths = write_series(tmp_dir)
+        renamed = []
+        for folder, path in zip(("a", "b"), paths):
+            os.makedirs(os.path.join(tmp_dir, folder))
+            renamed.append(os.path.join(tmp_dir, folder, "counts.csv"))
+            os.replace(path, renamed[-1])
+
+        stats = merge_count_matrices(renamed, os.path.join(tmp_dir, "store"), "rnaseq",
+                                     cache_dir=os.path.join(tmp_dir, "cache"))
+        assert set(stats["series"]) == {"a/counts", "b/counts"}
+        assert stats["samples"] == first.shape[1] + second.shape[1]
+
+        try:
+            series_names([renamed[0], renamed[0]])
+            assert False, "the same file twice should be rejected"
+        except ValueError:
+            pass
+
+if __name__ == "__main__":
+    test_outer_merge_matches_pandas()
+    test_inner_merge_and_sample_checks()
+    test_same_file_name_in_two_directories()
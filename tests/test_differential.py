@@ -0,0 +1,62 @@
+# test_differential.py
+import logging
+import time
+import numpy as np
+import pandas as pd
+from scipy import stats
+from src.omics.differential import DifferentialExpression, benjamini_hochberg, condition_groups
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+
+def test_ki_vs_saa():
+    """Block-wise statistics match per-gene scipy results"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0)
+    groups = condition_groups(counts.columns)
+    assert list(groups) == ["KI", "SAA"]
+
+    engine = DifferentialExpression(block_size=5000)
+    start = time.perf_counter()
+    result = engine.compare_conditions(counts, "KI", "SAA")
+    logger.info(f"compared {len(result)} genes in {time.perf_counter() - start:.2f}s")
+
+    assert len(result) == len(counts)
+
+    # recompute a few varying genes one at a time
+    cpm = counts / counts.sum() * 1e6
+    log_cpm = np.log2(cpm + 1)
+    for gene in ["NOC2L", "LINC01409", "FAM87B"]:
+        a, b = log_cpm.loc[gene, groups["KI"]], log_cpm.loc[gene, groups["SAA"]]
+        row = result.loc[gene]
+        assert np.isclose(row["t_pvalue"], stats.ttest_ind(a, b, equal_var=False).pvalue)
+        assert np.isclose(row["u_pvalue"], stats.mannwhitneyu(a, b).pvalue)
+        expected_fc = np.log2(cpm.loc[gene, groups["SAA"]].mean() + 1) - np.log2(cpm.loc[gene, groups["KI"]].mean() + 1)
+        assert np.isclose(row["log2_fold_change"], expected_fc)
+
+    # all-zero genes are not tested
+    zero_gene = counts.index[(counts == 0).all(axis=1)][0]
+    assert np.isnan(result.loc[zero_gene, "t_pvalue"])
+
+    logger.info(f"top genes:\n{result.sort_values('t_padj').head()}")
+
+def test_benjamini_hochberg_and_workers():
+    """BH adjustment and process pool blocks give the same results"""
+
+    pvalues = np.array([0.01, 0.04, np.nan, 0.03, 0.5])
+    adjusted = benjamini_hochberg(pvalues)
+    assert np.allclose(adjusted[[0, 1, 3, 4]], [0.04, 0.0533333, 0.0533333, 0.5])
+    assert np.isnan(adjusted[2])
+
+    counts = pd.read_csv(DATA_PATH, index_col=0).iloc[:4000]
+    serial = DifferentialExpression(block_size=1000).compare_conditions(counts, "KI", "SAA")
+    pooled = DifferentialExpression(block_size=1000, n_jobs=2).compare_conditions(counts, "KI", "SAA")
+    pd.testing.assert_frame_equal(serial, pooled)
+
+if __name__ == "__main__":
+    test_ki_vs_saa()
+    test_benjamini_hochberg_and_workers()
@@ -0,0 +1,66 @@
+# test_embedding.py
+import logging
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.omics.embedding import EmbeddingService, randomized_svd
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+
+def test_randomized_svd():
+    """Randomized SVD recovers the leading singular values"""
+
+    rng = np.random.default_rng(1)
+    matrix = rng.standard_normal((200, 30)) @ rng.standard_normal((30, 500))
+    _, s, _ = randomized_svd(matrix, 5)
+    expected = np.linalg.svd(matrix, compute_uv=False)[:5]
+    assert np.allclose(s, expected, rtol=1e-2)
+
+def test_svd_and_incremental_embeddings():
+    """The streamed fit gives the same sample embedding as the in-memory fit, reruns hit the cache"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = EmbeddingService(cache_dir=tmp_dir)
+
+        svd = service.embed(DATA_PATH, method="svd", n_components=3)
+        streamed = service.embed(DATA_PATH, method="incremental", n_components=3, chunksize=5000)
+        logger.info(f"embedding:\n{svd}")
+
+        assert svd.shape == (10, 3)
+        assert svd.index.tolist() == streamed.index.tolist()
+        assert np.allclose(svd.to_numpy(), streamed.to_numpy(), atol=1e-6)
+        assert np.allclose(svd.attrs["explained_variance_ratio"], streamed.attrs["explained_variance_ratio"])
+
+        # second call reads the cached result
+        start = time.perf_counter()
+        cached = service.embed(DATA_PATH, method="svd", n_components=3)
+        logger.info(f"cached embedding in {time.perf_counter() - start:.4f}s")
+        assert service.hits == 1
+        pd.testing.assert_frame_equal(cached, svd)
+        assert cached.attrs == svd.attrs
+
+        # other normalization settings are a different cache entry
+        service.embed(DATA_PATH, method="svd", n_components=3, log=False)
+        assert service.misses == 3
+
+def test_dataframe_source_key():
+    """In-memory matrices are keyed by their contents"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0).iloc[:2000]
+    service = EmbeddingService(cache_dir=tempfile.gettempdir())
+
+    assert service.key(counts, method="svd") == service.key(counts.copy(), method="svd")
+    changed = counts.copy()
+    changed.iloc[0, 0] += 1
+    assert service.key(changed, method="svd") != service.key(counts, method="svd")
+
+if __name__ == "__main__":
+    test_randomized_svd()
+    test_svd_and_incremental_embeddings()
+    test_dataframe_source_key()
@@ -0,0 +1,86 @@
+
+# test_excelingestion.py
+import logging
+import os
+import tempfile
+from datetime import datetime
+import pandas as pd
+from openpyxl import Workbook
+from src.data_ingestion.cache import IngestionCache
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def write_workbook(path):
+    """Two sheets, the clinical sheet is not the first one"""
+    workbook = Workbook()
+    notes = workbook.active
+    notes.title = "notes"
+    notes.append(["exported by", "demo"])
+
+    sheet = workbook.create_sheet("clinical")
+    sample = pd.read_csv('data/raw/sample_clinical.csv')
+    sheet.append(sample.columns.tolist() + ["visit_date"])
+    for i, row in enumerate(sample.itertuples(index=False)):
+        sheet.append(list(row) + [datetime(2024, 1, i + 1)])
+    workbook.save(path)
+
+def test_streaming_excel_load():
+    """Streaming reader picks the sheet and range and builds typed columns"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "clinical.xlsx")
+        write_workbook(path)
+
+        cache = IngestionCache(os.path.join(tmp_dir, "cache"))
+        ingestor = ClinicalDataIngestor(path, cache=cache)
+        data = ingestor.load_data(sheet_name="clinical")
+
+        logger.info(f"excel dtypes: {data.dtypes.to_dict()}")
+        assert data.shape == (9, 8)
+        assert data["age"].dtype == "int64"
+        assert str(data["visit_date"].dtype) == "datetime64[ns]"
+        assert data["subject_id"].tolist()[:2] == ["AD001", "AD002"]
+
+        subset = ingestor.load_excel(sheet_name="clinical", cell_range="A1:B4")
+        assert subset.columns.tolist() == ["subject_id", "age"]
+        assert len(subset) == 3
+
+def test_excel_parsed_once():
+    """Second load of the same sheet comes from the ingestion cache"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "clinical.xlsx")
+        write_workbook(path)
+
+        cache = IngestionCache(os.path.join(tmp_dir, "cache"))
+        first = ClinicalDataIngestor(path, cache=cache).load_data(sheet_name="clinical")
+        second = ClinicalDataIngestor(path, cache=cache).load_data(sheet_name="clinical")
+
+        assert cache.misses == 1
+        assert cache.hits == 1
+        pd.testing.assert_frame_equal(first, second)
+
+def test_excel_chunks_and_metadata():
+    """Chunks stream in order and fast metadata reads only the head"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "clinical.xlsx")
+        write_workbook(path)
+
+        ingestor = ClinicalDataIngestor(path)
+        chunks = list(ingestor.iter_chunks(chunksize=4, sheet_name="clinical"))
+        assert [len(c) for c in chunks] == [4, 4, 1]
+        assert chunks[-1].index.tolist() == [8]
+
+        metadata = ingestor.get_metadata(fast=True, sheet_name="clinical")
+        assert metadata["num_subjects"] == 9
+        assert metadata["data_types"]["mmse_score"] == "int64"
+
+if __name__ == "__main__":
+    test_streaming_excel_load()
+    test_excel_parsed_once()
+    test_excel_chunks_and_metadata()
@@ -0,0 +1,113 @@
+# test_export.py
+import logging
+import os
+import tempfile
+import pandas as pd
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+from src.data_validation.validator import DataValidator
+from src.data_export.exporter import PartitionedExporter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/sample_clinical.csv'
+
+def test_export_and_pruned_read():
+    """Partitions are written once, provenance is kept and reads open only matching partitions"""
+
+    df = ClinicalDataIngestor(DATA_PATH).load_data()
+    validator = DataValidator(df)
+    validation_results = validator.run_all_validations(range_rules={"age": {"min": 50, "max": 80}})
+    standardization_info = {"transformations_applied": [{"type": "id_harmonization"}], "timestamp": "2025-01-01 00:00:00"}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        exporter = PartitionedExporter(tmp_dir)
+        summary = exporter.export(df, "sample_clinical", partition_cols=["diagnosis"],
+                                  standardization_info=standardization_info,
+                                  validation_results=validation_results, source_path=DATA_PATH)
+        logger.info(f"export summary: {summary}")
+        assert len(summary["written"]) == df["diagnosis"].nunique()
+
+        # provenance survives a new process (manifest is re-read)
+        reopened = PartitionedExporter(tmp_dir)
+        provenance = reopened.provenance("sample_clinical")
+        assert provenance["standardization_info"] == standardization_info
+        assert provenance["validation_results"]["range_violations"]["age"]["violation_count"] == \
+            validation_results["range_violations"]["age"]["violation_count"]
+
+        # full read back
+        full = reopened.read()
+        assert len(full) == len(df)
+
+        # partition filter prunes, data filter is pushed down to the file
+        assert len(reopened.partitions([("diagnosis", "==", "AD")])) == 1
+        ad = reopened.read(columns=["subject_id", "age"], filters=[("diagnosis", "==", "AD"), ("age", ">", 70)])
+        expected = df[(df["diagnosis"] == "AD") & (df["age"] > 70)]
+        assert sorted(ad["subject_id"]) == sorted(expected["subject_id"])
+        assert set(ad.columns) == {"subject_id", "age", "source", "diagnosis"}
+
+def test_incremental_append():
+    """Re-exporting a changed drop rewrites only the changed partitions"""
+
+    df = ClinicalDataIngestor(DATA_PATH).load_data()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        exporter = PartitionedExporter(tmp_dir)
+        exporter.export(df, "sample_clinical", partition_cols=["diagnosis"])
+
+        unchanged = exporter.export(df, "sample_clinical", partition_cols=["diagnosis"])
+        assert unchanged["written"] == []
+
+        # one diagnosis changes, another disappears
+        drop = df[df["diagnosis"] != "Control"].copy()
+        drop.loc[drop["diagnosis"] == "AD", "mmse_score"] += 1
+        summary = exporter.export(drop, "sample_clinical", partition_cols=["diagnosis"])
+        logger.info(f"second drop: {summary}")
+        assert summary["written"] == ["source=sample_clinical/diagnosis=AD"]
+        assert summary["removed"] == ["source=sample_clinical/diagnosis=Control"]
+        assert not os.path.exists(os.path.join(tmp_dir, "source=sample_clinical", "diagnosis=Control"))
+
+        # a second source is appended next to the first
+        exporter.export(df.head(3), "other_site")
+        assert len(exporter.read(sources=["other_site"])) == 3
+        assert len(exporter.read()) == len(drop) + 3
+
+def test_partition_values_escaped_and_typed():
+    """Values with "/" stay one partition, numeric partitions prune as numbers"""
+
+    df = pd.DataFrame({"subject_id": ["S1", "S2", "S3", "S4"],
+                       "apoe_status": ["E3/E4", "E3/E3", "E3/E4", "E4/E4"],
+                       "age": [9, 10, 85, 9]})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        exporter = PartitionedExporter(tmp_dir)
+        summary = exporter.export(df, "site/a", partition_cols=["apoe_status", "age"])
+        assert len(summary["written"]) == 4
+        assert os.path.isdir(os.path.join(tmp_dir, "source=site%2Fa", "apoe_status=E3%2FE4", "age=9"))
+
+        reopened = PartitionedExporter(tmp_dir)
+        e34 = reopened.read(filters=[("apoe_status", "==", "E3/E4")])
+        assert sorted(e34["subject_id"]) == ["S1", "S3"]
+        assert set(reopened.read()["source"]) == {"site/a"}
+
+        # as strings "10" < "9", as numbers only the age 9 partitions are below 10
+        young = reopened.read(filters=[("age", "<", 10)])
+        logger.info(f"age < 10: {sorted(young['subject_id'])}")
+        assert sorted(young["subject_id"]) == ["S1", "S4"]
+        assert len(reopened.partitions([("age", "in", [10, 85])])) == 2
+
+        # partition keys come back with their exported dtype
+        assert reopened.read()["age"].dtype == df["age"].dtype
+
+        # a data column only one source has is missing for the other, filters on it do not fail
+        reopened.export(pd.DataFrame({"subject_id": ["T1", "T2"], "mmse_score": [18, 27]}), "site/b")
+        scored = reopened.read(filters=[("mmse_score", ">", 20)])
+        assert scored["subject_id"].tolist() == ["T2"]
+        assert len(reopened.read(filters=[("mmse_score", "!=", 18)], sources=["site/a"])) == len(df)
+
+if __name__ == "__main__":
+    test_export_and_pruned_read()
+    test_incremental_append()
+    test_partition_values_escaped_and_typed()
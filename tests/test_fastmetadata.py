@@ -0,0 +1,65 @@
+
+# test_fastmetadata.py
+import logging
+import os
+import tempfile
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_fast_metadata_matches_full_load():
+    """Fast scan metadata should agree with a full load on shape and columns"""
+
+    data_path = 'data/raw/sample_clinical.csv'
+
+    ingestor = ClinicalDataIngestor(data_path)
+    fast = ingestor.get_metadata(fast=True)
+
+    # the fast path must not have loaded the table
+    assert ingestor.data is None
+
+    full = ingestor.get_metadata()
+
+    logger.info(f"fast metadata: {fast}")
+
+    assert fast["num_subjects"] == full["num_subjects"]
+    assert fast["num_features"] == full["num_features"]
+    assert fast["column_names"] == full["column_names"]
+    assert fast["data_types"]["age"] == "int64"
+    assert fast["data_types"]["subject_id"] == "object"
+    assert fast["possible_id_columns"] == ["subject_id"]
+
+def test_fast_metadata_counts_large_matrix():
+    """Row count of the count matrix comes from the byte scan"""
+
+    ingestor = ClinicalDataIngestor('data/raw/GSE289715_counts.csv')
+    metadata = ingestor.get_metadata(fast=True)
+
+    assert metadata["num_subjects"] == 68836
+    assert metadata["column_names"][:2] == ["genes", "KI_3"]
+    assert metadata["data_types"]["KI_3"] == "int64"
+
+def test_fast_metadata_quoted_newlines():
+    """Newlines inside quoted fields are not counted as records"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "quoted.csv")
+        with open(path, "w", newline="") as f:
+            f.write('id,note,value\n')
+            f.write('1,"multi\nline\nnote",1.5\n')
+            f.write('2,"has ""quotes"" and, commas",\n')
+            f.write('3,plain,2.0')
+
+        metadata = ClinicalDataIngestor(path).get_metadata(fast=True)
+
+        assert metadata["num_subjects"] == 3
+        assert metadata["data_types"]["id"] == "int64"
+        assert metadata["data_types"]["value"] == "float64"
+
+if __name__ == "__main__":
+    test_fast_metadata_matches_full_load()
+    test_fast_metadata_counts_large_matrix()
+    test_fast_metadata_quoted_newlines()
@@ -0,0 +1,86 @@
+# test_fhiringestor.py
+import gzip
+import json
+import logging
+import os
+import tempfile
+import pandas as pd
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor, PATIENT_COLUMNS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/patient.ndjson'
+
+def test_matches_flattened_csv():
+    """NDJSON export gives the same patients as the multi-header csv flattening"""
+
+    ingestor = FHIRPatientIngestor(DATA_PATH)
+    patients = ingestor.load_data(batch_size=32)
+    logger.info(f"loaded patients:\n{patients.head()}")
+
+    assert list(patients.columns) == list(PATIENT_COLUMNS)
+    assert {c: str(t) for c, t in patients.dtypes.items()} == PATIENT_COLUMNS
+    assert ingestor.get_metadata()["num_subjects"] == len(patients)
+
+    # csv path used by the dashboard today
+    csv = ClinicalDataIngestor('data/raw/patient.csv').load_data(skiprows=3, header=None)
+    csv = csv[csv[0].notna()]
+    assert len(csv) == len(patients)
+    assert patients["id"].tolist() == csv[0].str.strip().tolist()
+    assert patients["family_name"].tolist() == csv[7].str.strip().tolist()
+    assert patients["email"].tolist() == csv[12].str.strip().tolist()
+    assert (patients["birth_date"] == pd.to_datetime(csv[14].str.strip()).to_numpy()).all()
+
+    males = ingestor.load_data(columns=["id", "gender"], filters=[("gender", "==", "male")])
+    assert list(males.columns) == ["id", "gender"]
+    assert len(males) == (patients["gender"] == "male").sum()
+
+def test_streaming_gzip_export():
+    """Compressed exports stream in fixed-size batches, bad lines are skipped"""
+
+    with open(DATA_PATH) as f:
+        resources = [json.loads(line) for line in f]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "Patient.ndjson.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for i in range(50):
+                for resource in resources:
+                    resource = dict(resource, id=f"{resource['id']}-{i}")
+                    f.write(json.dumps(resource) + "\n")
+            f.write("{not json\n")
+            f.write(json.dumps({"resourceType": "Observation", "id": "obs-1"}) + "\n")
+            # sparse resource with partial birth date and no name
+            f.write(json.dumps({"resourceType": "Patient", "id": "sparse", "birthDate": "1950-04"}) + "\n")
+
+        ingestor = FHIRPatientIngestor(path)
+        sizes = [len(batch) for batch in ingestor.iter_batches(batch_size=1000)]
+        assert sizes == [1000] * 5 + [1]
+        assert ingestor.skipped_lines == 2
+
+        sparse = ingestor.load_data(filters=[("id", "==", "sparse")])
+        assert sparse["birth_date"].iloc[0] == pd.Timestamp("1950-04-01")
+        assert sparse["family_name"].isna().all()
+
+def test_metadata_count_with_escaped_quotes():
+    """Escaped quotes inside json strings do not throw off the resource count"""
+
+    with open(DATA_PATH) as f:
+        resources = [json.loads(line) for line in f][:5]
+    resources[1]["name"] = [{"family": 'O"Brien', "given": ["Pat"]}]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "Patient.ndjson")
+        with open(path, "w") as f:
+            f.write("\n".join(json.dumps(r) for r in resources) + "\n\n")
+
+        assert FHIRPatientIngestor(path).get_metadata()["num_subjects"] == 5
+
+if __name__ == "__main__":
+    test_matches_flattened_csv()
+    test_streaming_gzip_export()
+    test_metadata_count_with_escaped_quotes()
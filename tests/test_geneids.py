@@ -0,0 +1,86 @@
+
+# test_geneids.py
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.data_standardization.gene_ids import GeneIdHarmonizer
+from src.data_standardization.standardizer import DataStandardizer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+
+def write_mapping(tmp_dir):
+    """Small mapping table in the HGNC complete set layout"""
+
+    table = pd.DataFrame({
+        "symbol": ["MIR1302-2HG", "FAM138A", "OR4F5", "NOC2L", "SAMD11", "KLHL17", "ISG15"],
+        "ensembl_gene_id": ["ENSG00000243485", "ENSG00000237613", "ENSG00000186092", "ENSG00000188976",
+                            "ENSG00000187634", "ENSG00000187961", ""],
+        "alias_symbol": ["", "F379", "", "NIR|DJ159A19.3", "", "DKIR", "G1P2|UCRP|SHARED"],
+        "prev_symbol": ["MIR1302-2", "", "", "", "", "SHARED", ""],
+    })
+    path = os.path.join(tmp_dir, "hgnc_subset.tsv")
+    table.to_csv(path, sep="\t", index=False)
+    return path
+
+def test_translate_symbols_ids_and_aliases():
+    """Dotted variants, versioned Ensembl ids and aliases resolve to approved symbols"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        harmonizer = GeneIdHarmonizer.for_table(write_mapping(tmp_dir), cache_dir=tmp_dir)
+
+        genes = ["MIR1302.2HG", "ENSG00000186092.6", "nir", "DJ159A19.3", "F379", "UCRP",
+                 "SHARED", "AL627309.1", None]
+        translated = harmonizer.translate(genes)
+        logger.info(f"translated: {list(translated)}")
+
+        assert list(translated[:6]) == ["MIR1302-2HG", "OR4F5", "NOC2L", "NOC2L", "FAM138A", "ISG15"]
+        # previous symbols beat aliases, unknown and missing genes are kept
+        assert translated[6] == "KLHL17"
+        assert translated[7] == "AL627309.1" and translated[8] is None
+        assert harmonizer.last_stats["normalized"] == 2
+
+        assert harmonizer.translate(["AL627309.1"], keep_unmapped=False)[0] is None
+
+        # second open loads the compiled index
+        start = time.perf_counter()
+        reloaded = GeneIdHarmonizer.for_table(os.path.join(tmp_dir, "hgnc_subset.tsv"),
+                                              cache_dir=tmp_dir)
+        logger.info(f"reloaded gene id index in {time.perf_counter() - start:.4f}s")
+        assert "source" in reloaded.meta
+        assert np.array_equal(reloaded.translate(genes[:-1]), translated[:-1])
+
+        # a table of the same name elsewhere gets its own compiled index
+        os.makedirs(os.path.join(tmp_dir, "other"))
+        GeneIdHarmonizer.for_table(write_mapping(os.path.join(tmp_dir, "other")), cache_dir=tmp_dir)
+        assert len(os.listdir(os.path.join(tmp_dir, "gene_ids"))) == 2
+
+def test_standardizer_harmonizes_count_index():
+    """harmonize_gene_ids replaces the gene index of a count matrix in bulk"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        standardizer = DataStandardizer(counts.copy())
+        start = time.perf_counter()
+        translated = standardizer.harmonize_gene_ids(write_mapping(tmp_dir), cache_dir=tmp_dir)
+        logger.info(f"harmonized {len(counts)} genes in {time.perf_counter() - start:.3f}s")
+
+        assert len(translated) == len(counts)
+        assert standardizer.data.index[0] == "MIR1302-2HG"
+        assert standardizer.data.index[1:].tolist()[:3] == counts.index[1:4].tolist()
+        assert standardizer.data.loc["MIR1302-2HG"].tolist() == counts.iloc[0].tolist()
+
+        info = standardizer.standardization_info["transformations_applied"][-1]
+        assert info["type"] == "gene_id_harmonization" and info["normalized"] >= 1
+
+if __name__ == "__main__":
+    test_translate_symbols_ids_and_aliases()
+    test_standardizer_harmonizes_count_index()
@@ -0,0 +1,81 @@
+
+# test_geneindex.py
+import logging
+import os
+import tempfile
+import time
+import pandas as pd
+from src.omics.gene_index import CountMatrixIndex
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+
+def test_gene_and_sample_lookup():
+    """Index lookups match the csv"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = CountMatrixIndex.for_file(DATA_PATH, cache_dir=tmp_dir)
+
+        assert index.matrix.shape == counts.shape
+        assert index.samples == counts.columns.tolist()
+
+        noc2l = index.gene("NOC2L")
+        assert noc2l.loc["NOC2L"].tolist() == counts.loc["NOC2L"].tolist()
+
+        # exact case first, both human and mouse symbols otherwise
+        assert index.gene("Samd11").index.tolist() == ["Samd11"]
+        assert sorted(index.gene("samd11").index.tolist()) == ["SAMD11", "Samd11"]
+
+        top = index.sample("KI_3", top=5)
+        assert top.tolist() == counts["KI_3"].nlargest(5).tolist()
+
+        # second open reuses the built index
+        start = time.perf_counter()
+        reopened = CountMatrixIndex.for_file(DATA_PATH, cache_dir=tmp_dir)
+        logger.info(f"reopened index in {time.perf_counter() - start:.3f}s")
+        assert reopened.sample("SAA_8", genes=["NOC2L"]).iloc[0] == counts.loc["NOC2L", "SAA_8"]
+
+def test_prefix_autocomplete():
+    """Prefix index returns sorted, case-insensitive completions"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = CountMatrixIndex.for_file(DATA_PATH, cache_dir=tmp_dir)
+
+        matches = index.complete("apo", limit=5)
+        logger.info(f"completions for apo: {matches}")
+
+        assert len(matches) == 5
+        assert all(m.upper().startswith("APO") for m in matches)
+        assert [m.upper() for m in matches] == sorted(m.upper() for m in matches)
+        assert index.complete("zzzz_not_a_gene") == []
+
+def test_same_file_name_in_two_directories():
+    """Count matrices sharing a file name get their own index instead of rebuilding each other's"""
+
+    counts = pd.read_csv(DATA_PATH, index_col=0, nrows=200)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for folder, columns in (("a", ["KI_3", "KI_4"]), ("b", ["SAA_4"])):
+            os.makedirs(os.path.join(tmp_dir, folder))
+            paths.append(os.path.join(tmp_dir, folder, "counts.csv"))
+            counts[columns].to_csv(paths[-1], index_label="genes")
+
+        first = CountMatrixIndex.for_file(paths[0], cache_dir=tmp_dir)
+        second = CountMatrixIndex.for_file(paths[1], cache_dir=tmp_dir)
+        assert first.index_dir != second.index_dir
+
+        reopened = CountMatrixIndex.for_file(paths[0], cache_dir=tmp_dir)
+        assert reopened.index_dir == first.index_dir and reopened.samples == ["KI_3", "KI_4"]
+        assert second.samples == ["SAA_4"]
+
+if __name__ == "__main__":
+    test_gene_and_sample_lookup()
+    test_prefix_autocomplete()
+    test_same_file_name_in_two_directories()
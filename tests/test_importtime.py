@@ -0,0 +1,62 @@
+# test_importtime.py
+import ast
+import logging
+import subprocess
+import sys
+from src.pipeline.coldstart import HEAVY_MODULES, format_report, measure_import
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# generous budgets (seconds), pandas alone is most of the pipeline modules' time
+IMPORT_BUDGETS = {
+    "src.data_ingestion.base_ingestion": 1.0,
+    "src.data_ingestion.clinical_ingestor": 3.0,
+    "src.pipeline.cli": 3.0,
+    "src.omics.gene_index": 3.0,
+}
+
+def test_import_budget():
+    """Entry points import within budget and without plotting / scientific extras"""
+
+    results = [measure_import(module, repeat=2) for module in IMPORT_BUDGETS]
+    logger.info("cold start report:\n" + format_report(results))
+
+    for result in results:
+        assert result["error"] is None
+        assert result["seconds"] < IMPORT_BUDGETS[result["module"]]
+        assert result["heavy"] == []
+
+    # the omics package only loads the analysis that is used
+    code = "import sys, src.omics.gene_index; print('src.omics.coexpression' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.strip() == "False"
+
+def test_no_logging_setup_on_import():
+    """Importing the ingestion package leaves the root logger alone"""
+
+    code = "import logging, src.data_ingestion.clinical_ingestor; print(len(logging.getLogger().handlers))"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.strip() == "0"
+
+def test_dashboard_imports_lazily():
+    """The dashboard only imports streamlit and light modules at module level"""
+
+    with open("visualization/dashboard.py") as f:
+        tree = ast.parse(f.read())
+
+    top_level = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            top_level.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            top_level.add(node.module.split(".")[0])
+
+    logger.info(f"dashboard top level imports: {sorted(top_level)}")
+    assert "src" not in top_level
+    assert not top_level & (set(HEAVY_MODULES) - {"streamlit"})
+
+if __name__ == "__main__":
+    test_import_budget()
+    test_no_logging_setup_on_import()
+    test_dashboard_imports_lazily()
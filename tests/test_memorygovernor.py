@@ -0,0 +1,155 @@
+# test_memorygovernor.py
+import logging
+import os
+import tempfile
+import pandas as pd
+import pytest
+from src.data_validation.validator import DataValidator
+from src.pipeline.memory import (CHUNK_FRACTION, WORKING_FACTOR, MemoryGovernor, estimate_cost,
+                                 get_memory_budget, parse_size, set_memory_budget)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CLINICAL_PATH = 'data/raw/sample_clinical.csv'
+COUNTS_PATH = 'data/raw/GSE289715_counts.csv'
+RANGE_RULES = {"age": {"min": 66, "max": 80}, "mmse_score": {"min": 20}}
+
+def _tall_clinical(tmp_dir, copies=20000):
+    data = pd.read_csv(CLINICAL_PATH)
+    tall = pd.concat([data] * copies, ignore_index=True)
+    tall["subject_id"] = tall["subject_id"] + "-" + tall.index.astype(str)
+    path = os.path.join(tmp_dir, "tall_clinical.csv")
+    tall.to_csv(path, index=False)
+    return path, tall
+
+def test_budget_setting():
+    """Budgets parse from sizes, the pipeline-wide setting wins over the environment"""
+
+    assert parse_size("512MB") == 512 * 1024 ** 2
+    assert parse_size("1.5g") == int(1.5 * 1024 ** 3)
+    assert parse_size(1000) == 1000
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+    os.environ["PIPELINE_MEMORY_BUDGET"] = "2GB"
+    try:
+        assert get_memory_budget() == 2 * 1024 ** 3
+        set_memory_budget("100MB")
+        assert get_memory_budget() == 100 * 1024 ** 2
+        assert MemoryGovernor().budget == 100 * 1024 ** 2
+    finally:
+        set_memory_budget(None)
+        del os.environ["PIPELINE_MEMORY_BUDGET"]
+
+def test_small_files_load_eagerly():
+    """The 10 row clinical file runs in memory, the count matrix is memory-mapped under a tight budget"""
+
+    governor = MemoryGovernor("1GB")
+    plan = governor.plan(CLINICAL_PATH)
+    assert plan["strategy"] == "eager" and plan["chunksize"] is None
+    assert plan["cost"]["data_types"]["age"] == "int64"
+
+    result = governor.run_clinical(CLINICAL_PATH, validation_config={"range_rules": RANGE_RULES})
+    assert result["strategy"] == "eager" and len(result["data"]) == 9
+    assert result["validation_results"]["range_violations"]["age"]["violation_count"] == 2
+
+    tight = MemoryGovernor("1MB")
+    plan = tight.plan(COUNTS_PATH)
+    assert plan["strategy"] == "mmap" and plan["cost"]["numeric_matrix"]
+
+def test_count_matrix_in_row_blocks():
+    """Count matrices over the budget are validated in row blocks of their memory-mapped index"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # head of the count matrix keeps the test quick
+        path = os.path.join(tmp_dir, "counts.csv")
+        counts = pd.read_csv(COUNTS_PATH, nrows=5000)
+        counts.to_csv(path, index=False)
+
+        governor = MemoryGovernor("256KB", min_chunksize=100)
+        rules = {"KI_3": {"max": 100}, "SAA_4": {"min": 1}}
+        result = governor.run_clinical(path, validation_config={"range_rules": rules},
+                                       staging_dir=os.path.join(tmp_dir, "parts"), cache_dir=tmp_dir)
+        assert result["strategy"] == "mmap" and result["rows"] == len(counts)
+        assert len(result["chunk_sizes"]) > 1 and len(result["parts"]) == len(result["chunk_sizes"])
+
+        eager = DataValidator(counts).validate_value_ranges(rules)
+        for column in rules:
+            assert result["validation_results"]["range_violations"][column]["violation_count"] == \
+                eager[column]["violation_count"]
+
+        first = pd.read_parquet(result["parts"][0])
+        assert list(first.columns) == list(counts.columns)
+        logger.info(f"count matrix in {len(result['chunk_sizes'])} blocks of the memory-mapped index")
+
+def test_chunked_within_budget():
+    """Large files stream in adaptive chunks and give the same validation counts as an eager run"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path, tall = _tall_clinical(tmp_dir)
+
+        cost = estimate_cost(path)
+        assert abs(cost["rows"] - len(tall)) / len(tall) < 0.05
+        logger.info(f"estimated {cost['rows']} rows ({len(tall)} actual), "
+                    f"{cost['memory_bytes'] / 1e6:.1f} MB in memory")
+
+        governor = MemoryGovernor("8MB", min_chunksize=100)
+        plan = governor.plan(path)
+        assert plan["strategy"] == "chunked"
+
+        # every chunk (with its working copies) fits its share of the budget
+        for chunk in governor.iter_chunks(path):
+            used = chunk.memory_usage(deep=True).sum() * WORKING_FACTOR
+            if len(governor.chunk_sizes) > 1:
+                assert used <= governor.budget * CHUNK_FRACTION * 1.1
+        assert sum(governor.chunk_sizes) == len(tall)
+        logger.info(f"chunk sizes: first {governor.chunk_sizes[0]}, then {governor.chunk_sizes[1]}")
+
+        rows = []
+        result = governor.run_clinical(path, validation_config={"range_rules": RANGE_RULES},
+                                       standardization_config={"ids": {"column": "subject_id", "prefix": "P-"}},
+                                       sink=lambda chunk: rows.append(len(chunk)))
+        assert result["strategy"] == "chunked" and sum(rows) == len(tall)
+
+        eager = DataValidator(tall).validate_value_ranges(RANGE_RULES)
+        merged = result["validation_results"]["range_violations"]
+        assert {c: merged[c]["violation_count"] for c in merged} == {c: eager[c]["violation_count"] for c in eager}
+        assert merged["age"]["violation_percentage"] == pytest.approx(eager["age"]["violation_percentage"])
+
+        # without a sink the standardized chunks are staged as parquet parts
+        staged = governor.run_clinical(path, staging_dir=os.path.join(tmp_dir, "parts"))
+        assert len(staged["parts"]) == len(staged["chunk_sizes"]) > 1
+        assert sum(len(pd.read_parquet(p)) for p in staged["parts"]) == len(tall)
+
+def test_chunked_validation_settings():
+    """Chunked runs keep the missing threshold and type mismatches of any chunk, whole-table steps are refused"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = pd.read_csv(CLINICAL_PATH)
+        tall = pd.concat([data] * 2000, ignore_index=True).astype({"age": object})
+        tall.loc[5000, "age"] = "unknown"
+        tall.loc[7, "mmse_score"] = None
+        path = os.path.join(tmp_dir, "tall.csv")
+        tall.to_csv(path, index=False)
+
+        governor = MemoryGovernor("1MB", min_chunksize=1000, max_chunksize=1000)
+        result = governor.run_clinical(path, validation_config={"expected_types": {"age": "numeric"},
+                                                                "missing_threshold": 0.0},
+                                       sink=lambda chunk: None)
+        assert result["strategy"] == "chunked" and len(result["chunk_sizes"]) > 5
+        # only the chunk holding row 5000 parsed age as text, a later chunk does not hide it
+        assert result["validation_results"]["type_mismatches"]["age"]["chunks"] == 1
+        assert "mmse_score" in result["validation_results"]["missing_data"]["columns_above_threshold"]
+
+        with pytest.raises(ValueError):
+            governor.run_clinical(path, standardization_config={"duplicates": {}}, sink=lambda chunk: None)
+
+if __name__ == "__main__":
+    test_budget_setting()
+    test_small_files_load_eagerly()
+    test_count_matrix_in_row_blocks()
+    test_chunked_within_budget()
+    test_chunked_validation_settings()
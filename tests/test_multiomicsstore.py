@@ -0,0 +1,125 @@
+
+# test_multiomicsstore.py
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from src.integration.store import MultiOmicsStore
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def load_counts():
+    return pd.read_csv('data/raw/GSE289715_counts.csv', index_col=0).head(3000)
+
+def test_subset_reads_match_source():
+    """Subset queries by samples and features return the original values"""
+
+    counts = load_counts()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = MultiOmicsStore(tmp_dir)
+        store.write_matrix("rnaseq", counts, feature_chunk=500, sample_chunk=4)
+
+        genes = ["FAM138A", counts.index[2500], counts.index[10]]
+        samples = ["SAA_8", "KI_3"]
+        subset = store.read_matrix("rnaseq", samples=samples, features=genes)
+
+        pd.testing.assert_frame_equal(subset, counts.loc[genes, samples], check_names=False)
+        assert subset.dtypes.iloc[0] == counts.dtypes.iloc[0]
+
+        # reopening reads the manifest back
+        reopened = MultiOmicsStore(tmp_dir)
+        assert reopened.samples == counts.columns.tolist()
+        full = reopened.read_matrix("rnaseq")
+        assert np.array_equal(full.to_numpy(), counts.to_numpy())
+
+def test_append_samples_and_modalities():
+    """New samples and modalities are appended without rewriting existing chunks"""
+
+    counts = load_counts()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = MultiOmicsStore(tmp_dir)
+        store.write_matrix("rnaseq", counts[["KI_3", "KI_4", "KI_6"]], feature_chunk=1000, sample_chunk=2)
+
+        first_chunk = os.path.join(tmp_dir, "rnaseq", "g0_s0.npy.z")
+        modified = os.path.getmtime(first_chunk)
+
+        store.write_matrix("rnaseq", counts[["SAA_4", "SAA_5"]])
+        assert os.path.getmtime(first_chunk) == modified
+
+        clinical = pd.DataFrame({"condition": ["KI", "KI", "SAA", "SAA"], "age": [70, 72, 68, 75]},
+                                index=["KI_3", "KI_4", "SAA_4", "CTRL_1"])
+        store.write_table("clinical", clinical)
+
+        assert store.samples == ["KI_3", "KI_4", "KI_6", "SAA_4", "SAA_5", "CTRL_1"]
+
+        aligned = store.aligned()
+        logger.info(f"aligned samples: {aligned['clinical'].index.tolist()}")
+        assert aligned["clinical"].index.tolist() == ["KI_3", "KI_4", "SAA_4"]
+        assert aligned["rnaseq"].columns.tolist() == ["KI_3", "KI_4", "SAA_4"]
+        assert aligned["rnaseq"]["SAA_4"].equals(counts["SAA_4"].rename("SAA_4").set_axis(aligned["rnaseq"].index))
+
+        try:
+            store.write_matrix("rnaseq", counts[["KI_3"]])
+            assert False, "duplicate samples should be rejected"
+        except ValueError:
+            pass
+
+        # appended rows keep the stored columns, in any order
+        store.write_table("clinical", pd.DataFrame({"age": [66], "condition": ["KI"]}, index=["KI_6"]))
+        assert store.read_table("clinical", samples=["KI_6"])["age"].tolist() == [66]
+        try:
+            store.write_table("clinical", pd.DataFrame({"condition": ["SAA"], "age": [70], "apoe": ["E4"]},
+                                                       index=["SAA_5"]))
+            assert False, "new columns should be rejected"
+        except ValueError:
+            pass
+
+        # a first write that fails does not register the modality
+        try:
+            store.write_table("visits", pd.DataFrame({"visit": [1, 2]}, index=["KI_3", "KI_3"]))
+            assert False, "duplicate sample ids should be rejected"
+        except ValueError:
+            pass
+        assert "visits" not in MultiOmicsStore(tmp_dir).manifest["modalities"]
+        assert "visits" not in store.manifest["modalities"]
+
+def test_full_matrix_with_duplicate_genes():
+    """The full GEO file repeats some gene symbols, they are summed, kept first or rejected"""
+
+    counts = pd.read_csv('data/raw/GSE289715_counts.csv', index_col=0)
+    repeated = counts.index[counts.index.duplicated()].unique()
+    assert len(repeated)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = MultiOmicsStore(tmp_dir)
+        store.write_matrix("rnaseq", counts)
+
+        expected = counts.groupby(level=0, sort=False).sum()
+        full = store.read_matrix("rnaseq")
+        logger.info(f"stored {full.shape[0]} genes from {len(counts)} rows, repeated: {list(repeated[:5])}")
+        assert full.index.tolist() == expected.index.tolist()
+        assert np.array_equal(full.to_numpy(), expected.to_numpy())
+
+        store.write_matrix("first", counts, duplicates="first")
+        gene = repeated[0]
+        assert store.read_matrix("first", features=[gene]).iloc[0].tolist() == counts.loc[gene].iloc[0].tolist()
+
+        # a rejected write leaves nothing behind
+        try:
+            store.write_matrix("strict", counts, duplicates="error")
+            assert False, "duplicate genes should be rejected"
+        except ValueError:
+            pass
+        assert "strict" not in store.modalities
+        assert not os.path.exists(os.path.join(tmp_dir, "strict"))
+
+if __name__ == "__main__":
+    test_subset_reads_match_source()
+    test_append_samples_and_modalities()
+    test_full_matrix_with_duplicate_genes()
@@ -0,0 +1,83 @@
+
+# test_outlierengine.py
+import logging
+import numpy as np
+import pandas as pd
+from src.data_validation.outliers import OutlierEngine
+from src.data_validation.validator import DataValidator
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_engine_matches_per_column_loop():
+    """Matrix-wide z-score and IQR agree with the per-column formulas"""
+
+    counts = pd.read_csv('data/raw/GSE289715_counts.csv', index_col=0).head(5000)
+
+    zscore = OutlierEngine("zscore", threshold=3).detect(counts)
+    iqr = OutlierEngine("iqr").detect(counts)
+
+    for column in ["KI_3", "SAA_8"]:
+        values = counts[column]
+        expected = np.abs((values - values.mean()) / values.std()) > 3
+        assert (zscore[column] == expected).all()
+
+        q1, q3 = values.quantile(0.25), values.quantile(0.75)
+        expected = (values < q1 - 1.5 * (q3 - q1)) | (values > q3 + 1.5 * (q3 - q1))
+        assert (iqr[column] == expected).all()
+
+def test_grouped_conditions():
+    """Per-gene thresholds within KI_* and SAA_* samples"""
+
+    counts = pd.DataFrame({
+        "KI_1": [10, 100], "KI_2": [11, 100], "KI_3": [12, 100], "KI_4": [90, 100],
+        "SAA_1": [90, 100], "SAA_2": [91, 100], "SAA_3": [92, 100], "SAA_4": [93, 100],
+    }, index=["GENE_A", "GENE_B"])
+
+    engine = OutlierEngine("mad", threshold=3.5, log_scale=True)
+    condition = lambda sample: sample.split("_")[0]
+    grouped = engine.detect(counts, groups=condition, axis=1)
+    pooled = engine.detect(counts, axis=1)
+
+    logger.info(f"grouped outliers:\n{grouped}")
+
+    # KI_4 is only unusual next to the other KI samples
+    assert grouped.loc["GENE_A", "KI_4"]
+    assert grouped.values.sum() == 1
+    assert not pooled.loc["GENE_A", "KI_4"]
+
+def test_validator_group_by_site():
+    """detect_outliers thresholds per site with a single grouped pass"""
+
+    data = pd.DataFrame({
+        "site": ["a"] * 20 + ["b"] * 20,
+        "value": [10.0] * 19 + [40.0] + [100.0 + i % 3 for i in range(20)],
+    })
+
+    validator = DataValidator(data, logger=logger)
+    outliers = validator.detect_outliers(["value"], method="mad", group_by="site")
+
+    assert outliers["value"]["outlier_count"] == 1
+    assert validator.violating_rows("outlier:value").index.tolist() == [19]
+
+def test_validator_group_by_labels():
+    """group_by also takes row labels (a Series or array) instead of a column name"""
+
+    data = pd.DataFrame({"value": [10.0] * 19 + [40.0] + [100.0 + i % 3 for i in range(20)]})
+    site = pd.Series(["a"] * 20 + ["b"] * 20, index=data.index)
+
+    validator = DataValidator(data, logger=logger)
+    by_series = validator.detect_outliers(method="mad", group_by=site)
+    assert by_series["value"]["outlier_count"] == 1 and by_series["value"]["grouped"]
+
+    by_array = validator.detect_outliers(["value"], method="mad", group_by=site.to_numpy())
+    assert by_array["value"]["outlier_count"] == 1
+    assert validator.violating_rows("outlier:value").index.tolist() == [19]
+
+if __name__ == "__main__":
+    test_engine_matches_per_column_loop()
+    test_grouped_conditions()
+    test_validator_group_by_site()
+    test_validator_group_by_labels()
@@ -0,0 +1,77 @@
+# test_paging.py
+import logging
+import time
+import numpy as np
+import pandas as pd
+from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor
+from visualization.paging import TablePager, num_pages, profile_frame
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COUNTS_PATH = 'data/raw/GSE289715_counts.csv'
+PATIENT_PATH = 'data/raw/patient.ndjson'
+
+def test_pages_match_pandas():
+    """Sorted, searched and filtered pages equal the same query in pandas"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data()
+    pager = TablePager(patients)
+
+    first, total = pager.page(1, 25)
+    assert total == len(patients)
+    pd.testing.assert_frame_equal(first, patients.iloc[:25])
+
+    # sorted with missing values last, stable for ties
+    expected = patients.sort_values("birth_date", ascending=False, kind="stable", na_position="last")
+    page, _ = pager.page(2, 10, sort_by="birth_date", ascending=False)
+    pd.testing.assert_frame_equal(page, expected.iloc[10:20])
+
+    # filter + case-insensitive search + sort
+    query = {"filters": [("gender", "==", "female")], "search": "CITY", "search_column": "city",
+             "sort_by": "family_name"}
+    expected = patients[(patients["gender"] == "female")
+                        & patients["city"].str.contains("city", case=False, na=False)]
+    expected = expected.sort_values("family_name", kind="stable", na_position="last")
+    page, total = pager.page(1, 1000, **query)
+    assert 0 < total == len(expected)
+    pd.testing.assert_frame_equal(page, expected)
+
+    # pages past the end are clamped to the last one
+    last, total = pager.page(99, 30)
+    assert num_pages(total, 30) == 4
+    pd.testing.assert_frame_equal(last, patients.iloc[90:])
+
+def test_profile_and_cached_queries():
+    """Column profile matches pandas, repeated queries reuse the row positions"""
+
+    counts = pd.read_csv(COUNTS_PATH, index_col=0)
+    profile = profile_frame(counts)
+    assert profile["Column"].tolist() == counts.columns.tolist()
+    assert profile["Missing Values"].tolist() == counts.isna().sum().tolist()
+    assert profile["Unique Values"].tolist() == counts.nunique().tolist()
+
+    # a tall table, only the page rows are materialized
+    tall = pd.concat([counts.reset_index()] * 20, ignore_index=True)
+    pager = TablePager(tall)
+
+    start = time.perf_counter()
+    page, total = pager.page(1, 50, sort_by="KI_3", ascending=False)
+    first = time.perf_counter() - start
+    positions = pager.rows(sort_by="KI_3", ascending=False)
+
+    start = time.perf_counter()
+    for n in range(2, 22):
+        page, _ = pager.page(n, 50, sort_by="KI_3", ascending=False)
+    flipping = (time.perf_counter() - start) / 20
+    logger.info(f"{total} rows: first sorted page {first * 1000:.1f} ms, next pages {flipping * 1000:.2f} ms each")
+
+    assert pager.rows(sort_by="KI_3", ascending=False) is positions
+    assert len(page) == 50
+    assert np.all(np.diff(tall["KI_3"].to_numpy()[positions]) <= 0)
+
+if __name__ == "__main__":
+    test_pages_match_pandas()
+    test_profile_and_cached_queries()
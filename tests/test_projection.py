@@ -0,0 +1,61 @@
+
+# test_projection.py
+import logging
+import os
+import tempfile
+from src.data_ingestion.cache import IngestionCache
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_column_projection():
+    """Only the requested columns come back, in the requested order"""
+
+    ingestor = ClinicalDataIngestor('data/raw/sample_clinical.csv')
+    data = ingestor.load_data(columns=["sex", "subject_id"])
+
+    assert data.columns.tolist() == ["sex", "subject_id"]
+    assert len(data) == 9
+
+def test_row_filters_per_chunk():
+    """Filters are applied chunk by chunk and may use columns that are not returned"""
+
+    ingestor = ClinicalDataIngestor('data/raw/sample_clinical.csv')
+    data = ingestor.load_data(
+        columns=["subject_id"],
+        filters=[("diagnosis", "in", ["AD", "MCI"]), ("age", ">=", 70)],
+        chunksize=2
+    )
+
+    assert data["subject_id"].tolist() == ["AD001", "AD003", "MCI001", "MCI003"]
+    assert data.index.tolist() == [0, 2, 6, 8]
+
+def test_cached_projection_and_filters():
+    """The columnar cache serves projections and filters after a single parse"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = IngestionCache(os.path.join(tmp_dir, "cache"))
+        ingestor = ClinicalDataIngestor('data/raw/sample_clinical.csv', cache=cache)
+
+        first = ingestor.load_data(columns=["subject_id"], filters=[("sex", "==", "F")], use_cache=True)
+        second = ingestor.load_data(columns=["subject_id"], filters=[("sex", "==", "F")], use_cache=True)
+        ages = ingestor.load_data(columns=["age"], filters=[("age", ">", 74)], use_cache=True)
+
+        logger.info(f"cached filter result: {second['subject_id'].tolist()}")
+        assert cache.misses == 1 and cache.hits == 2
+        assert first["subject_id"].tolist() == second["subject_id"].tolist()
+        assert second["subject_id"].tolist() == ["AD002", "CN001", "CN003", "MCI002"]
+
+        # the same query keeps the file's row labels on a miss, a hit and without the cache
+        chunked = ingestor.load_data(columns=["subject_id"], filters=[("sex", "==", "F")], chunksize=2)
+        assert first.index.tolist() == second.index.tolist() == chunked.index.tolist() == [1, 3, 5, 7]
+        assert second.columns.tolist() == ["subject_id"]
+        assert ages["age"].tolist() == [82, 75, 77]
+
+if __name__ == "__main__":
+    test_column_projection()
+    test_row_filters_per_chunk()
+    test_cached_projection_and_filters()
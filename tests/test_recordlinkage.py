@@ -0,0 +1,98 @@
+# test_recordlinkage.py
+import logging
+import numpy as np
+import pandas as pd
+from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor
+from src.data_standardization.linkage import RecordLinker, soundex
+from src.data_standardization.standardizer import DataStandardizer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PATIENT_PATH = 'data/raw/patient.ndjson'
+COLUMNS = ["id", "family_name", "given_name", "birth_date", "postal_code"]
+
+def _typo(name, rng):
+    """Swap two neighbouring letters of a name"""
+    if not isinstance(name, str) or len(name) < 4:
+        return name
+    k = rng.integers(1, len(name) - 2)
+    return name[:k] + name[k + 1] + name[k] + name[k + 2:]
+
+def _with_duplicates(patients, n_duplicates, seed=0):
+    """Append noisy copies of some patients, returns the table and the true duplicate pairs"""
+    rng = np.random.default_rng(seed)
+    source = rng.choice(len(patients), n_duplicates, replace=False)
+    copies = patients.iloc[source].copy()
+    copies["family_name"] = [_typo(n, rng) if rng.random() < 0.5 else n.upper() for n in copies["family_name"]]
+    copies["given_name"] = [_typo(n, rng) if rng.random() < 0.3 else n for n in copies["given_name"]]
+    copies.loc[rng.random(n_duplicates) < 0.3, "postal_code"] = None
+
+    table = pd.concat([patients, copies], ignore_index=True)
+    truth = {(int(s), len(patients) + k) for k, s in enumerate(source)}
+    return table, truth
+
+def test_soundex():
+    """Standard soundex codes"""
+
+    assert [soundex(n) for n in ["Robert", "Rupert", "Ashcraft", "Tymczak", "Pfister", "Lee"]] == \
+        ["R163", "R163", "A261", "T522", "P236", "L000"]
+    assert soundex("Müller") == soundex("MUELLER"[0] + "uller") and soundex("") == ""
+
+def test_duplicates_within_table():
+    """Noisy copies are found without comparing every pair"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data(columns=COLUMNS)
+    table, truth = _with_duplicates(patients, 20)
+
+    linker = RecordLinker(threshold=0.75, n_jobs=2, batch_size=500)
+    matches = linker.duplicates(table)
+    found = set(zip(matches["left"], matches["right"]))
+
+    logger.info(f"linkage stats: {linker.last_stats}")
+    assert truth <= found
+    assert len(found - truth) <= 2
+    assert linker.last_stats["candidate_pairs"] < linker.last_stats["all_pairs"] / 5
+
+    # missing postal codes neither help nor hurt the score
+    assert matches["postal_code"].isna().any()
+    assert matches["score"].between(0.75, 1).all()
+
+    # the standardizer keeps one cluster id per patient
+    standardizer = DataStandardizer(table.copy(), logger=logger)
+    standardizer.find_duplicates(threshold=0.75)
+    clusters = standardizer.data["duplicate_cluster"]
+    assert all(clusters[a] == clusters[b] for a, b in truth)
+    assert clusters.nunique() <= len(patients)
+    assert standardizer.standardization_info["transformations_applied"][-1]["type"] == "duplicate_detection"
+
+def test_link_across_tables_and_scale():
+    """Two files are linked pairwise, larger tables stay far from n^2 comparisons"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data(columns=COLUMNS)
+    table, truth = _with_duplicates(patients, 30, seed=1)
+    left, right = table.iloc[:len(patients)], table.iloc[len(patients):].reset_index(drop=True)
+
+    links = RecordLinker(threshold=0.75).link(left, right)
+    found = set(zip(links["left"], links["right"] + len(patients)))
+    assert truth <= found
+
+    # 100 synthetic families of 200 records each
+    rng = np.random.default_rng(2)
+    big = pd.concat([patients] * 200, ignore_index=True)
+    big["given_name"] = big["given_name"] + " " + pd.Series(rng.integers(0, 10**6, len(big))).astype(str)
+    big["birth_date"] = big["birth_date"] + pd.to_timedelta(rng.integers(0, 20000, len(big)), unit="D")
+
+    linker = RecordLinker(threshold=0.95, max_block_size=500)
+    linker.duplicates(big)
+    stats = linker.last_stats
+    logger.info(f"{stats['records']} records: {stats['candidate_pairs']} candidate pairs of "
+                f"{stats['all_pairs']} in {stats['seconds']:.2f}s")
+    assert stats["candidate_pairs"] < stats["all_pairs"] / 50
+
+if __name__ == "__main__":
+    test_soundex()
+    test_duplicates_within_table()
+    test_link_across_tables_and_scale()
@@ -0,0 +1,153 @@
+# test_ruleengine.py
+import logging
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor
+from src.data_validation.rules import RuleSet, RuleSyntaxError
+from src.data_validation.validator import DataValidator
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CLINICAL_PATH = 'data/raw/sample_clinical.csv'
+PATIENT_PATH = 'data/raw/patient.ndjson'
+
+def test_cross_column_rules():
+    """Conditional ranges, arithmetic and code lists flag the same rows as pandas"""
+
+    data = pd.read_csv(CLINICAL_PATH)
+    validator = DataValidator(data, logger=logger)
+    results = validator.validate_rules({
+        "ad_mmse": {"when": "diagnosis == 'AD'", "expr": "between(mmse_score, 10, 19)"},
+        "control_mmse": {"when": "diagnosis == 'Control'", "expr": "mmse_score >= 27"},
+        "school_age": "age - education_years >= 55",
+        "apoe_known": "apoe_status in apoe_codes",
+        "no_such_column": "visit_age >= age",
+    }, code_lists={"apoe_codes": ["E3/E3", "E3/E4"]})
+
+    assert set(results) == {"ad_mmse", "school_age", "apoe_known"}
+    assert validator.violating_rows("rule:ad_mmse")["subject_id"].tolist() == ["AD001", "AD002"]
+
+    expected = data[data["age"] - data["education_years"] < 55]["subject_id"].tolist()
+    assert validator.violating_rows("rule:school_age")["subject_id"].tolist() == expected
+    assert validator.violating_rows("rule:apoe_known")["subject_id"].tolist() == ["AD001", "MCI003"]
+    assert results["apoe_known"]["violation_count"] == 2
+
+    # missing values never count as violations
+    data.loc[0, "mmse_score"] = np.nan
+    data.loc[1, "diagnosis"] = None
+    masks = RuleSet({"ad_mmse": {"when": "diagnosis == 'AD'", "expr": "10 <= mmse_score <= 19"}}).evaluate(data)
+    assert not masks["ad_mmse"].any()
+
+def test_date_rules():
+    """Datetime columns compare with each other and with ISO date strings"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data()
+    rng = np.random.default_rng(0)
+    offsets = pd.to_timedelta(rng.integers(-2000, 30000, len(patients)), unit="D")
+    patients["deathDate"] = (patients["birth_date"] + offsets).where(rng.random(len(patients)) < 0.3)
+    patients["deathDateText"] = patients["deathDate"].dt.strftime("%Y-%m-%d")
+
+    rules = RuleSet({
+        "death_after_birth": "deathDate >= birth_date",
+        "death_after_birth_text": "date(deathDateText) >= birth_date",
+        "born_after_1900": "birth_date > '1900-01-01'",
+        "inactive_when_dead": {"when": "notnull(deathDate)", "expr": "not active"},
+        "deceased_flag": {"when": "notnull(deathDate)", "expr": "deceased == True"},
+    })
+    masks = rules.evaluate(patients, chunksize=17)
+
+    expected = (patients["deathDate"] < patients["birth_date"]).to_numpy()
+    assert expected.any()
+    assert np.array_equal(masks["death_after_birth"], expected)
+    assert np.array_equal(masks["death_after_birth_text"], expected)
+    assert np.array_equal(masks["born_after_1900"],
+                          (patients["birth_date"] <= pd.Timestamp("1900-01-01")).to_numpy())
+    # every patient is active, the deceased flag is never filled in (null, so never a violation)
+    assert np.array_equal(masks["inactive_when_dead"], patients["deathDate"].notna().to_numpy())
+    assert patients["deceased"].isna().all() and not masks["deceased_flag"].any()
+
+def test_dirty_dates_and_constants():
+    """Unparseable dates are missing years, constant rules flag all rows or none"""
+
+    data = pd.DataFrame({"birthDate": ["1950-03-02", "unknown", "1890-07-01", None, "03/04/1960"]})
+    masks = RuleSet({
+        "born_after_1900": "year(birthDate) > 1900",
+        "always": "True",
+        "never": "False",
+        "constant_year": "year('2020-05-01') > 2000",
+    }).evaluate(data)
+
+    assert masks["born_after_1900"].tolist() == [False, False, True, False, False]
+    assert not masks["always"].any() and not masks["constant_year"].any()
+    assert masks["never"].all()
+
+def test_rules_on_missing_columns():
+    """Rules on columns the table does not have are skipped, even when that is every rule"""
+
+    data = pd.DataFrame({"a": [1, 2, 3]})
+    assert DataValidator(data).validate_rules({"dead_after_birth": "deathDate >= birthDate"}) == {}
+
+    rule_set = RuleSet({"dead_after_birth": "deathDate >= birthDate", "positive": "a > 0"})
+    assert rule_set.evaluate(data, names=[]) == {}
+    assert rule_set.count_violations([data], names=[]) == ({}, len(data))
+    assert rule_set.evaluate(data, names=["positive"])["positive"].tolist() == [False, False, False]
+
+def test_shared_subexpressions_and_chunks():
+    """Hundreds of rules share their subexpressions and chunking does not change the result"""
+
+    data = pd.read_csv(CLINICAL_PATH)
+    big = pd.concat([data] * 20000, ignore_index=True)
+
+    rules = {}
+    for i in range(300):
+        diagnosis = ("AD", "MCI", "Control")[i % 3]
+        rules[f"age_{i}"] = {"when": f"diagnosis == '{diagnosis}' and apoe_status != 'E4/E4'",
+                             "expr": f"between(age, {50 + i % 20}, 90) and age - education_years > {40 + i % 15}"}
+    rule_set = RuleSet(rules)
+    assert rule_set.distinct_nodes < rule_set.node_count / 3
+    assert set(rule_set.columns) == {"age", "education_years", "apoe_status", "diagnosis"}
+
+    start = time.perf_counter()
+    masks = rule_set.evaluate(big, chunksize=50000)
+    elapsed = time.perf_counter() - start
+    logger.info(f"{len(rules)} rules over {len(big)} rows in {elapsed:.2f}s "
+                f"({rule_set.distinct_nodes} distinct of {rule_set.node_count} expressions)")
+
+    # rule 0 by hand
+    applies = (big["diagnosis"] == "AD") & (big["apoe_status"] != "E4/E4")
+    holds = big["age"].between(50, 90) & (big["age"] - big["education_years"] > 40)
+    assert np.array_equal(masks["age_0"], (applies & ~holds).to_numpy())
+
+    whole = rule_set.evaluate(big, chunksize=len(big))
+    assert all(np.array_equal(masks[name], whole[name]) for name in rules)
+
+    # streamed straight from the file
+    counts, total = rule_set.count_violations(ClinicalDataIngestor(CLINICAL_PATH).iter_chunks(chunksize=4))
+    assert total == len(data)
+    assert counts == {name: int(mask[:len(data)].sum()) for name, mask in masks.items()}
+
+def test_rule_errors():
+    """Malformed rules are rejected when the rule set is compiled"""
+
+    with pytest.raises(RuleSyntaxError):
+        RuleSet({"bad": "age >="})
+    with pytest.raises(RuleSyntaxError):
+        RuleSet({"not_a_condition": "age + 1"})
+    with pytest.raises(ValueError):
+        RuleSet({"call": "__import__('os')"})
+    with pytest.raises(RuleSyntaxError):
+        RuleSet({"codes": "apoe_codes == 'x'"}, code_lists={"apoe_codes": ["E3/E3"]})
+
+if __name__ == "__main__":
+    test_cross_column_rules()
+    test_date_rules()
+    test_dirty_dates_and_constants()
+    test_rules_on_missing_columns()
+    test_shared_subexpressions_and_chunks()
+    test_rule_errors()
@@ -0,0 +1,75 @@
+
+# test_schemachecker.py
+import logging
+import os
+import tempfile
+import pandas as pd
+from src.data_checker.checker import CSVSchemaChecker
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = 'data/schemas/sample_clinical_schema.json'
+
+def test_sample_upload_is_valid():
+    """The demo clinical file passes its sample schema"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        error_path = os.path.join(tmp_dir, "errors.csv")
+        summary = CSVSchemaChecker(SCHEMA_PATH, chunksize=4).check('data/raw/sample_clinical.csv', error_path)
+
+        logger.info(f"schema check summary: {summary}")
+        assert summary["valid"]
+        assert summary["rows_checked"] == 9
+
+def test_row_level_errors():
+    """Type, enum, range, pattern and uniqueness errors land in the error file"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        upload = os.path.join(tmp_dir, "upload.csv")
+        with open(upload, "w") as f:
+            f.write("subject_id,age,sex,diagnosis,mmse_score,extra\n")
+            f.write("AD001,73,M,AD,20,x\n")
+            f.write("AD001,seventy,M,AD,20,x\n")
+            f.write("XX002,150,Q,AD,,x\n")
+            f.write("CN003,70,F,,31,x\n")
+
+        error_path = os.path.join(tmp_dir, "errors.csv")
+        # chunksize 2 so the duplicate id is found across chunks
+        summary = CSVSchemaChecker(SCHEMA_PATH, chunksize=2).check(upload, error_path)
+        errors = pd.read_csv(error_path)
+
+        found = set(zip(errors["row"], errors["column"], errors["rule"]))
+        assert (0, "extra", "additional_column") in found
+        assert (2, "subject_id", "unique") in found
+        assert (2, "age", "type") in found
+        assert (3, "subject_id", "pattern") in found
+        assert (3, "age", "maximum") in found
+        assert (3, "sex", "enum") in found
+        assert (4, "diagnosis", "required") in found
+        assert (4, "mmse_score", "maximum") in found
+        assert not summary["valid"]
+        assert summary["error_count"] == len(errors)
+
+def test_error_cap_stops_run():
+    """The run stops once the error cap is reached"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        upload = os.path.join(tmp_dir, "upload.csv")
+        pd.DataFrame({"subject_id": ["bad"] * 1000, "age": [1] * 1000,
+                      "sex": ["M"] * 1000, "diagnosis": ["AD"] * 1000}).to_csv(upload, index=False)
+
+        error_path = os.path.join(tmp_dir, "errors.csv")
+        summary = CSVSchemaChecker(SCHEMA_PATH, max_errors=25, chunksize=100).check(upload, error_path)
+
+        assert summary["stopped_early"]
+        assert summary["error_count"] == 25
+        assert summary["rows_checked"] == 100
+        assert len(pd.read_csv(error_path)) == 25
+
+if __name__ == "__main__":
+    test_sample_upload_is_valid()
+    test_row_level_errors()
+    test_error_cap_stops_run()
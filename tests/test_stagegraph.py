@@ -0,0 +1,122 @@
+# test_stagegraph.py
+import logging
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from src.pipeline.stages import StageGraph, clinical_pipeline, tree_hash
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/sample_clinical.csv'
+
+STANDARDIZATION_CONFIG = {
+    "ids": {"column": "subject_id", "format": "alphanumeric", "prefix": "SUBJ-"},
+    "terminology": {"sex": {"m": "male", "f": "female"}},
+}
+
+def test_unchanged_rerun_is_cached():
+    """A second run with the same inputs loads artifacts instead of running stages"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graph = clinical_pipeline(DATA_PATH, validation_config={"range_rules": {"age": {"min": 50, "max": 80}}},
+                                  standardization_config=STANDARDIZATION_CONFIG, cache_dir=tmp_dir)
+        first = graph.run()
+        assert graph.last_run == {"ingest": "ran", "validate": "ran", "standardize": "ran"}
+        assert "range_violations" in first["validate"]
+        assert set(first["standardize"]["data"]["sex"]) <= {"male", "female"}
+
+        rerun = clinical_pipeline(DATA_PATH, validation_config={"range_rules": {"age": {"min": 50, "max": 80}}},
+                                  standardization_config=STANDARDIZATION_CONFIG, cache_dir=tmp_dir)
+        start = time.perf_counter()
+        second = rerun.run(["standardize"])
+        elapsed = time.perf_counter() - start
+        logger.info(f"unchanged rerun in {elapsed:.4f}s: {rerun.last_run}")
+
+        # only the requested output is loaded, upstream stages are not touched
+        assert rerun.last_run == {"standardize": "cached"}
+        assert elapsed < 1
+        pd.testing.assert_frame_equal(second["standardize"]["data"], first["standardize"]["data"])
+
+def test_changes_rerun_dependent_stages():
+    """Config changes re-run only their stage, input changes re-run everything downstream"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, "clinical.csv")
+        shutil.copy(DATA_PATH, data_path)
+
+        clinical_pipeline(data_path, standardization_config=STANDARDIZATION_CONFIG, cache_dir=tmp_dir).run()
+
+        graph = clinical_pipeline(data_path, validation_config={"range_rules": {"age": {"max": 70}}},
+                                  standardization_config=STANDARDIZATION_CONFIG, cache_dir=tmp_dir)
+        graph.run()
+        assert graph.last_run == {"ingest": "cached", "validate": "ran", "standardize": "cached"}
+
+        # new drop of the input file
+        with open(data_path, "a") as f:
+            f.write("CN999,66,F,Control,30,18,E3/E3\n")
+        graph = clinical_pipeline(data_path, standardization_config=STANDARDIZATION_CONFIG, cache_dir=tmp_dir)
+        outputs = graph.run()
+        assert graph.last_run == {"ingest": "ran", "validate": "ran", "standardize": "ran"}
+        assert "CN999" in set(outputs["ingest"]["subject_id"])
+
+def test_config_files_and_source_tree():
+    """Files named in the config and any module of the source tree are part of the key"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mapping_path = os.path.join(tmp_dir, "hgnc.tsv")
+        with open(mapping_path, "w") as f:
+            f.write("symbol\tensembl_gene_id\nAPOE\tENSG00000130203\n")
+
+        config = {**STANDARDIZATION_CONFIG, "gene_ids": {"mapping_path": mapping_path, "gene_column": "apoe_genotype",
+                                                         "cache_dir": tmp_dir}}
+        graph = clinical_pipeline(DATA_PATH, standardization_config=config, cache_dir=tmp_dir)
+        assert mapping_path in graph.stages["standardize"].files
+        graph.run()
+
+        # new version of the mapping table, only standardization runs again
+        time.sleep(0.01)
+        with open(mapping_path, "a") as f:
+            f.write("APP\tENSG00000142192\n")
+        graph = clinical_pipeline(DATA_PATH, standardization_config=config, cache_dir=tmp_dir)
+        graph.run()
+        assert graph.last_run == {"ingest": "cached", "validate": "cached", "standardize": "ran"}
+
+        # helper modules count, not only the module defining the stage
+        package = os.path.join(tmp_dir, "package")
+        os.makedirs(os.path.join(package, "helpers"))
+        with open(os.path.join(package, "helpers", "cache.py"), "w") as f:
+            f.write("BLOCK = 1\n")
+        before = tree_hash(package)
+        time.sleep(0.01)
+        with open(os.path.join(package, "helpers", "cache.py"), "w") as f:
+            f.write("BLOCK = 2\n")
+        assert tree_hash(package) != before
+
+def test_custom_graph():
+    """Any function can be a stage"""
+
+    calls = []
+
+    def double(values):
+        calls.append("double")
+        return [v * 2 for v in values]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for _ in range(2):
+            graph = StageGraph(cache_dir=tmp_dir)
+            graph.add("numbers", list, config={})
+            graph.add("doubled", double, upstream=["numbers"])
+            assert graph.run(["doubled"])["doubled"] == []
+
+        assert calls == ["double"]
+
+if __name__ == "__main__":
+    test_unchanged_rerun_is_cached()
+    test_changes_rerun_dependent_stages()
+    test_config_files_and_source_tree()
+    test_custom_graph()
@@ -0,0 +1,126 @@
+# test_stringtransforms.py
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor
+from src.data_standardization.standardizer import DataStandardizer
+from src.data_standardization.string_transforms import StringTransformer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PATIENT_PATH = 'data/raw/patient.ndjson'
+
+def _messy(values, rng):
+    """Same strings with random case and padding"""
+    return [None if v is None else (" " * rng.integers(0, 2)) + (v.upper() if rng.random() < 0.3 else v.lower())
+            for v in values]
+
+def test_same_result_as_row_wise():
+    """Distinct-value transforms match the row-wise .str calls, including missing and non-string values"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data()
+    rng = np.random.default_rng(0)
+    transformer = StringTransformer()
+
+    for column in ["family_name", "given_name", "city", "state", "address_line"]:
+        messy = pd.Series(_messy(patients[column].tolist(), rng), index=patients.index[::-1], dtype=object)
+        expected = messy.str.title().str.strip()
+        pd.testing.assert_series_equal(transformer.apply(messy, ("title", "strip")), expected)
+
+    mixed = pd.Series([" ann ", np.nan, 42, "ann", None, " BOB"], name="given")
+    pd.testing.assert_series_equal(transformer.apply(mixed, ["title", "strip"]), mixed.str.title().str.strip())
+
+    text = pd.Series([" ann ", None, "ann"], dtype="string")
+    pd.testing.assert_series_equal(transformer.apply(text, "strip"), text.str.strip())
+
+    # categoricals are transformed per category, colliding categories are merged
+    states = pd.Series(_messy(patients["state"].tolist(), rng), dtype="category")
+    result = transformer.apply(states, ("title", "strip"))
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert result.astype(object).tolist() == states.astype(object).str.title().str.strip().tolist()
+
+def test_memo_across_runs():
+    """Repeated columns only compute new distinct values, the memo survives a save/load"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data()
+    rng = np.random.default_rng(1)
+    tall = pd.Series(_messy(patients["city"].tolist() * 5000, rng), dtype=object)
+
+    transformer = StringTransformer()
+    start = time.perf_counter()
+    first = transformer.apply(tall, ("title", "strip"))
+    distinct_time = time.perf_counter() - start
+    computed = transformer.stats["computed"]
+    assert computed == tall.nunique()
+
+    start = time.perf_counter()
+    expected = tall.str.title().str.strip()
+    row_time = time.perf_counter() - start
+    logger.info(f"{len(tall)} rows, {computed} distinct: distinct-value path {distinct_time:.3f}s, "
+                f"row-wise .str {row_time:.3f}s")
+    pd.testing.assert_series_equal(first, expected)
+
+    transformer.apply(tall.iloc[::-1], ("title", "strip"))
+    assert transformer.stats["computed"] == computed
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "memo.pkl")
+        transformer.save(path)
+        reloaded = StringTransformer.load(path)
+        pd.testing.assert_series_equal(reloaded.apply(tall, ("title", "strip")), expected)
+        assert reloaded.stats["computed"] == 0
+
+def test_standardize_demographics():
+    """The standardizer output is unchanged by the distinct-value path"""
+
+    patients = FHIRPatientIngestor(PATIENT_PATH).load_data()
+    rng = np.random.default_rng(2)
+    patients["family_raw"] = _messy(patients["family_name"].tolist(), rng)
+    patients["city_raw"] = _messy(patients["city"].tolist(), rng)
+
+    standardizer = DataStandardizer(patients.copy(), logger=logger, string_transformer=StringTransformer())
+    standardizer.standardize_demographics({"family_raw": "family_clean"}, {"city_raw": "city_clean"})
+
+    assert standardizer.data["family_clean"].tolist() == patients["family_raw"].str.title().str.strip().tolist()
+    assert standardizer.data["city_clean"].tolist() == patients["city_raw"].str.strip().tolist()
+
+def test_memo_eviction_keeps_current_values():
+    """A full memo is cleared without losing values the current call needs"""
+
+    transformer = StringTransformer(max_entries=3)
+    transformer.apply(pd.Series(["a", "b"]), "upper")
+    result = transformer.apply(pd.Series(["a", "c", "d"]), "upper")
+
+    assert result.tolist() == ["A", "C", "D"]
+    assert len(transformer.memo[("upper",)]) == 3
+
+def test_shared_memo_saved_at_exit():
+    """The process-wide memo is written when a process exits and read by the next one"""
+
+    script = ("import pandas as pd\n"
+              "from src.data_standardization.string_transforms import shared_transformer, transform_column\n"
+              "transform_column(pd.Series(['  ann ', 'bob', 'ann']), 'strip', 'title')\n"
+              "print(shared_transformer().stats['computed'])\n")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {**os.environ, "AD_PIPELINE_CACHE_DIR": tmp_dir}
+        runs = [subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+                for _ in range(2)]
+
+        assert os.path.exists(os.path.join(tmp_dir, "string_memo.pkl"))
+        first, second = [int(run.stdout.strip()) for run in runs]
+        assert first > 0 and second == 0
+
+if __name__ == "__main__":
+    test_same_result_as_row_wise()
+    test_memo_across_runs()
+    test_standardize_demographics()
+    test_memo_eviction_keeps_current_values()
+    test_shared_memo_saved_at_exit()
@@ -0,0 +1,91 @@
+# test_synapseclient.py
+import logging
+import os
+import tempfile
+import pytest
+from src.synapse.client import SynapseClient, TransferError, file_md5
+from src.synapse.mock_server import MockSynapseServer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/raw/GSE289715_counts.csv'
+PART_SIZE = 256 * 1024
+
+def test_upload_download_and_skip():
+    """Round trip in parallel parts, unchanged files are not sent again"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir, MockSynapseServer() as server:
+        with SynapseClient(server.url, part_size=PART_SIZE, max_workers=4) as client:
+            result = client.upload(DATA_PATH)
+            logger.info(f"upload: {result}, {result['size'] / 1e6 / result['seconds']:.1f} MB/s")
+            assert not result["skipped"]
+            assert result["parts_sent"] == -(-os.path.getsize(DATA_PATH) // PART_SIZE)
+            assert result["md5"] == file_md5(DATA_PATH)
+
+            # pooled keep-alive connections, not one per request
+            assert client.stats["connections"] <= 5 < client.stats["requests"]
+
+            again = client.upload(DATA_PATH)
+            assert again["skipped"] and again["bytes_sent"] == 0
+
+            target = os.path.join(tmp_dir, "counts.csv")
+            downloaded = client.download(os.path.basename(DATA_PATH), target)
+            assert not downloaded["skipped"]
+            assert file_md5(target) == result["md5"]
+            assert client.download(os.path.basename(DATA_PATH), target)["skipped"]
+
+            with pytest.raises(FileNotFoundError):
+                client.download("missing.csv", os.path.join(tmp_dir, "missing.csv"))
+
+def test_retries_and_resume():
+    """Failed parts are retried, an interrupted upload resumes with the missing parts only"""
+
+    with MockSynapseServer(fail_rate=0.3, seed=7) as server:
+        client = SynapseClient(server.url, part_size=PART_SIZE, max_workers=4, retries=8, backoff=0.01)
+        result = client.upload(DATA_PATH, "retried/counts.csv")
+        assert client.stats["retries"] == server.stats["parts_failed"] > 0
+        assert server.files["retried/counts.csv"]["md5"] == result["md5"]
+
+        # no retries: the upload stops part way
+        server.fail_rate = 0.5
+        interrupted = SynapseClient(server.url, part_size=PART_SIZE, max_workers=4, retries=0)
+        with pytest.raises(TransferError):
+            interrupted.upload(DATA_PATH, "resumed/counts.csv")
+        stored = server.stats["parts_received"] - result["parts_sent"]
+
+        server.fail_rate = 0.0
+        resumed = SynapseClient(server.url, part_size=PART_SIZE).upload(DATA_PATH, "resumed/counts.csv")
+        logger.info(f"resumed upload sent {resumed['parts_sent']} parts, {stored} were already stored")
+        assert resumed["parts_sent"] == result["parts_sent"] - stored
+        assert server.files["resumed/counts.csv"]["md5"] == result["md5"]
+
+def test_upload_directory():
+    """Directory uploads keep relative names and report throughput"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir, MockSynapseServer() as server:
+        os.makedirs(os.path.join(tmp_dir, "clinical"))
+        for name in ("a.csv", os.path.join("clinical", "b.csv")):
+            with open(os.path.join(tmp_dir, name), "w") as f:
+                f.write("subject_id,age\nAD001,73\n" * 1000)
+
+        for i in range(8):
+            with open(os.path.join(tmp_dir, f"extra_{i}.csv"), "w") as f:
+                f.write(f"subject_id,age\nAD00{i},7{i}\n" * 1000)
+
+        with SynapseClient(server.url, part_size=8 * 1024, max_workers=4) as client:
+            summary = client.upload_directory(tmp_dir, prefix="processed/")
+            assert summary["uploaded"] == 10
+            assert {"processed/a.csv", "processed/clinical/b.csv"} <= set(server.files)
+            assert client.upload_directory(tmp_dir, prefix="processed/")["skipped"] == 10
+
+            # one worker pool and one bounded set of connections for all files
+            logger.info(f"{client.stats['connections']} connections for {client.stats['requests']} requests")
+            assert client.stats["connections"] <= 5
+
+if __name__ == "__main__":
+    test_upload_download_and_skip()
+    test_retries_and_resume()
+    test_upload_directory()
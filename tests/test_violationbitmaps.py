@@ -0,0 +1,66 @@
+
+# test_violationbitmaps.py
+import logging
+import numpy as np
+import pandas as pd
+from src.data_validation.bitmaps import RowBitmap
+from src.data_validation.validator import DataValidator
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_bitmap_roundtrip():
+    """Packing keeps one bit per row and round trips"""
+
+    rng = np.random.default_rng(0)
+    mask = rng.random(1001) < 0.1
+    bitmap = RowBitmap.from_mask(mask)
+
+    assert bitmap.nbytes == 126
+    assert bitmap.count() == mask.sum()
+    assert np.array_equal(bitmap.to_mask(), mask)
+    assert np.array_equal((~bitmap).to_mask(), ~mask)
+
+    # missing entries of nullable masks are not violations
+    assert RowBitmap.from_mask([True, np.nan, False]).to_mask().tolist() == [True, False, False]
+    assert RowBitmap.from_mask(pd.Series([pd.NA, True], dtype="boolean")).positions().tolist() == [1]
+
+def test_validator_drilldown():
+    """Range and outlier checks keep bitmaps that can be combined and queried"""
+
+    data = pd.read_csv('data/raw/sample_clinical.csv')
+    validator = DataValidator(data, logger=logger)
+    results = validator.run_all_validations(range_rules={
+        "age": {"min": 66, "max": 80},
+        "mmse_score": {"min": 20}
+    })
+
+    assert results["range_violations"]["age"]["bitmap_key"] == "range:age"
+
+    age_rows = validator.violating_rows("range:age")
+    assert age_rows["subject_id"].tolist() == ["AD002", "AD003"]
+
+    either = validator.violating_rows(["range:age", "range:mmse_score"], how="union")
+    both = validator.violating_rows(["range:age", "range:mmse_score"], how="intersection")
+    assert either["subject_id"].tolist() == ["AD002", "AD003"]
+    assert both["subject_id"].tolist() == ["AD003"]
+
+def test_passed_checks_keep_empty_bitmaps():
+    """A check that ran and passed can still be queried, it just has no rows"""
+
+    data = pd.read_csv('data/raw/sample_clinical.csv')
+    validator = DataValidator(data, logger=logger)
+    results = validator.run_all_validations(range_rules={"age": {"min": 0, "max": 120}},
+                                            rules={"mmse_bounded": "mmse_score <= 30"})
+
+    assert "age" not in results["range_violations"]
+    assert validator.violation_mask("range:age").count() == 0
+    assert validator.violation_mask("rule:mmse_bounded").count() == 0
+    assert len(validator.violating_rows(["range:age", "outlier:age"])) == results["outliers"].get("age", {}).get("outlier_count", 0)
+
+if __name__ == "__main__":
+    test_bitmap_roundtrip()
+    test_validator_drilldown()
+    test_passed_checks_keep_empty_bitmaps()
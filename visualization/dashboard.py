@@ -1,25 +1,25 @@
 # src/visualization/dashboard.py
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import logging
 import os
 import sys
 
 # Add parent directory to path to import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
-from src.data_validation.validator import DataValidator
-from src.data_standardization.standardizer import DataStandardizer
+# plotting libraries and pipeline modules are imported inside the functions that use
+# them, a rerun only pays for the parts of the page that are actually rendered
 
 def main():
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     st.title("AD Multi-Omics Data Integration Pipeline")
     st.sidebar.title("Controls")
     
     # File Upload Section
     st.sidebar.header("Data Input")
-    uploaded_file = st.sidebar.file_uploader("Upload clinical data file", type=["csv", "xlsx", "tsv", "txt"])
+    uploaded_file = st.sidebar.file_uploader("Upload clinical data file", type=["csv", "xlsx", "tsv", "txt", "ndjson"])
     
     demo_files = st.sidebar.checkbox("Use demo data instead")
     
@@ -29,54 +29,85 @@ def main():
     run_standardization = st.sidebar.checkbox("Run Data Standardization", value=True)
     
     # Main content
-    tab1, tab2, tab3 = st.tabs(["Data Overview", "Validation Results", "Standardized Data"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Data Overview", "Validation Results", "Standardized Data",
+                                            "Gene Explorer", "Sample Structure"])
     
     # Process data
     df = None
+    data_path = None
     validation_results = None
     standardized_data = None
     
     # Load data
     if uploaded_file is not None:
-        # Save uploaded file temporarily
-        with open("temp_upload.csv", "wb") as f:
+        # Save uploaded file temporarily, keeping its extension for format detection
+        data_path = "temp_upload" + os.path.splitext(uploaded_file.name)[1]
+        with open(data_path, "wb") as f:
             f.write(uploaded_file.getvalue())
-        
-        df = process_data("temp_upload.csv")
     elif demo_files:
-        df = process_data("/home/ubuntu/sage-bio/ad-multi-omics-pipeline/data/raw/GSE289715_counts.csv")
+        data_path = "/home/ubuntu/sage-bio/ad-multi-omics-pipeline/data/raw/GSE289715_counts.csv"
+    
+    if data_path is not None:
+        df = process_data(data_path)
+        # identifies the loaded table for the cached pagers/profiles
+        token = dataset_token(data_path)
+    
+    # Gene explorer works off the count matrix index, independent of the uploaded file
+    with tab4:
+        display_gene_explorer()
+    with tab5:
+        display_sample_embedding()
     
     # Display data overview
     if df is not None:
         with tab1:
-            display_data_overview(df)
+            display_data_overview(df, token)
         
         # Run validation if selected
         if run_validation:
-            validation_results = run_data_validation(df)
+            validator = load_validator(token, df)
+            validation_results = validator.validation_results
             with tab2:
-                display_validation_results(validation_results, df)
+                display_validation_results(validation_results, df, validator)
         
         # Run standardization if selected
         if run_standardization:
             standardized_data = run_data_standardization(df)
             with tab3:
-                display_standardized_data(standardized_data)
+                display_standardized_data(standardized_data, token + ":standardized")
+
+def dataset_token(file_path):
+    """Cache key of a data file, changes whenever the file is replaced"""
+    from src.data_ingestion.cache import file_fingerprint
+    
+    fingerprint = file_fingerprint(file_path)
+    return f"{fingerprint['path']}:{fingerprint['size']}:{fingerprint['mtime_ns']}"
+
+@st.cache_resource(max_entries=4)
+def load_dataset(file_path, token):
+    """Parse a data file once per version, reruns share the same DataFrame"""
+    from src.data_ingestion.clinical_ingestor import ClinicalDataIngestor
+    from src.data_ingestion.fhir_ingestor import FHIRPatientIngestor
+    
+    # FHIR Bulk Data exports are flattened directly
+    if file_path.endswith((".ndjson", ".ndjson.gz")):
+        return FHIRPatientIngestor(file_path).load_data()
+    
+    # Determine if we need to skip rows based on file structure
+    ingestor = ClinicalDataIngestor(file_path)
+    
+    # For FHIR formatted data, skip the first 2 rows
+    if "patient.csv" in file_path:
+        df = ingestor.load_data(skiprows=2, header=0)
+        # Clean column names
+        df.columns = [col.replace('*', '').split(' {')[0].strip() for col in df.columns]
+        return df
+    return ingestor.load_data()
 
 def process_data(file_path):
     """Load and process data from file"""
     try:
-        # Determine if we need to skip rows based on file structure
-        ingestor = ClinicalDataIngestor(file_path)
-        
-        # For FHIR formatted data, skip the first 2 rows
-        if "patient.csv" in file_path:
-            df = ingestor.load_data(skiprows=2, header=0)
-            # Clean column names
-            df.columns = [col.replace('*', '').split(' {')[0].strip() for col in df.columns]
-        else:
-            df = ingestor.load_data()
-        
+        df = load_dataset(file_path, dataset_token(file_path))
         st.success(f"Data loaded successfully with {df.shape[0]} rows and {df.shape[1]} columns")
         return df
     
@@ -84,16 +115,68 @@ def process_data(file_path):
         st.error(f"Error loading data: {str(e)}")
         return None
 
-def display_data_overview(df):
+@st.cache_resource(max_entries=8)
+def load_pager(token, _df):
+    """Pager over a table, kept across reruns so sort orders and query results are reused"""
+    from visualization.paging import TablePager
+    
+    return TablePager(_df)
+
+@st.cache_data(max_entries=8)
+def load_profile(token, _df):
+    """Column summary of a table, computed once per dataset"""
+    from visualization.paging import profile_frame
+    
+    return profile_frame(_df)
+
+def display_paged_table(df, token, key):
+    """Sort, search and page through a table, only the visible page is sent to the browser"""
+    from visualization.paging import PAGE_SIZES, num_pages
+    
+    pager = load_pager(token, df)
+    
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        search = st.text_input("Search", key=f"{key}_search")
+    with col2:
+        search_column = st.selectbox("in column", ["(all text columns)"] + list(df.columns), key=f"{key}_search_col")
+    with col3:
+        sort_by = st.selectbox("Sort by", ["(file order)"] + list(df.columns), key=f"{key}_sort")
+    with col4:
+        descending = st.checkbox("Descending", key=f"{key}_desc")
+    
+    query = {
+        "search": search or None,
+        "search_column": None if search_column == "(all text columns)" else search_column,
+        "sort_by": None if sort_by == "(file order)" else sort_by,
+        "ascending": not descending,
+    }
+    total = len(pager.rows(**query))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    with col2:
+        pages = num_pages(total, page_size)
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                               key=f"{key}_page_{pages}")
+    
+    rows, total = pager.page(page, page_size, **query)
+    st.dataframe(rows)
+    start = (page - 1) * page_size
+    st.caption(f"rows {min(start + 1, total)}-{start + len(rows)} of {total}")
+
+def display_data_overview(df, token):
     """Display basic data overview"""
     st.header("Data Overview")
     
     # Display basic info
     st.subheader("Data Sample")
-    st.dataframe(df.head())
+    display_paged_table(df, token, "overview")
     
-    # Data summary
+    # Data summary, from the precomputed column profile
     st.subheader("Data Summary")
+    profile = load_profile(token, df)
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -101,21 +184,22 @@ def display_data_overview(df):
     with col2:
         st.metric("Columns", df.shape[1])
     with col3:
-        missing_percentage = (df.isna().sum().sum() / (df.shape[0] * df.shape[1])) * 100
+        missing_percentage = (profile['Missing Values'].sum() / max(df.shape[0] * df.shape[1], 1)) * 100
         st.metric("Missing Data", f"{missing_percentage:.1f}%")
     
     # Data types
     st.subheader("Column Data Types")
-    dtypes_df = pd.DataFrame({
-        'Column': df.columns,
-        'Data Type': df.dtypes.astype(str),
-        'Missing Values': df.isna().sum(),
-        'Missing %': (df.isna().sum() / len(df) * 100).round(1)
-    })
-    st.dataframe(dtypes_df)
+    st.dataframe(profile)
+
+@st.cache_resource(max_entries=4)
+def load_validator(token, _df):
+    """Validator of a dataset, kept across reruns so the drill-down reads its stored bitmaps"""
+    return run_data_validation(_df)
 
 def run_data_validation(df):
     """Run validation on the data"""
+    from src.data_validation.validator import DataValidator
+    
     validator = DataValidator(df)
     
     # Create validation rules based on data
@@ -132,16 +216,19 @@ def run_data_validation(df):
     for col in date_cols:
         expected_types[col] = "datetime"
     
-    # Run validation
-    results = validator.run_all_validations(
+    # Run validation (results and row bitmaps stay on the validator)
+    validator.run_all_validations(
         expected_types=expected_types,
         range_rules=range_rules
     )
     
-    return results
+    return validator
 
-def display_validation_results(results, df):
+def display_validation_results(results, df, validator=None):
     """Display validation results"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     st.header("Data Validation Results")
     
     # Display completeness
@@ -202,8 +289,31 @@ def display_validation_results(results, df):
                 ax.set_title(f'Distribution of {col_to_plot}')
                 st.pyplot(fig)
 
+    # Drill down into failing rows from the stored bitmaps
+    if validator is not None and validator.violation_bitmaps:
+        display_violation_drilldown(validator)
+
+def display_violation_drilldown(validator):
+    """Show the rows failing selected checks"""
+    st.subheader("Failing Rows")
+
+    keys = sorted(validator.violation_bitmaps)
+    # passed checks are listed too (empty bitmaps), the first failing one is preselected
+    failing = [key for key in keys if validator.violation_bitmaps[key].count()]
+    selected = st.multiselect("Checks:", keys, default=failing[:1])
+    how = st.radio("Rows failing:", ["union", "intersection"], horizontal=True,
+                   format_func=lambda h: "any selected check" if h == "union" else "all selected checks")
+
+    if selected:
+        mask = validator.violation_mask(selected, how)
+        st.write(f"{mask.count()} rows")
+        st.dataframe(validator.violating_rows(selected, how, limit=1000))
+
 def run_data_standardization(df):
     """Run data standardization"""
+    from src.data_standardization.standardizer import DataStandardizer
+    from src.data_standardization.string_transforms import transform_column
+    
     standardizer = DataStandardizer(df.copy())
     
     # Create a simple standardization function 
@@ -231,14 +341,17 @@ def run_data_standardization(df):
     name_columns = [col for col in df.columns if 'name' in col.lower()]
     for col in name_columns:
         try:
-            standardized_df[col] = df[col].str.title()
+            standardized_df[col] = transform_column(df[col], "title")
         except:
             pass
     
     return standardized_df
 
-def display_standardized_data(df):
+def display_standardized_data(df, token):
     """Display standardized data"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     st.header("Standardized Data")
     
     if df is None:
@@ -246,7 +359,7 @@ def display_standardized_data(df):
         return
     
     st.subheader("Sample of Standardized Data")
-    st.dataframe(df.head())
+    display_paged_table(df, token, "standardized")
     
     # Show distribution of key variables if present
     numeric_cols = df.select_dtypes(include=['number']).columns
@@ -276,5 +389,89 @@ def display_standardized_data(df):
         ax.set_ylabel('')  # Hide "None" ylabel
         st.pyplot(fig)
 
+@st.cache_resource
+def load_gene_index(counts_path):
+    """Open (or build once) the memory-mapped gene index of a count matrix"""
+    from src.omics.gene_index import CountMatrixIndex
+    
+    return CountMatrixIndex.for_file(counts_path)
+
+def display_gene_explorer():
+    """Per-gene and per-sample slices of a count matrix"""
+    import matplotlib.pyplot as plt
+    
+    st.header("Gene Explorer")
+
+    counts_path = st.text_input("Count matrix:", "data/raw/GSE289715_counts.csv")
+    if not st.checkbox("Open gene index", value=False):
+        return
+    if not os.path.exists(counts_path):
+        st.warning(f"Count matrix not found: {counts_path}")
+        return
+
+    index = load_gene_index(counts_path)
+
+    # Gene lookup with prefix autocomplete
+    prefix = st.text_input("Gene symbol:", "APOE")
+    matches = index.complete(prefix, limit=50) if prefix else []
+    if not matches:
+        st.info("No genes match this prefix")
+    else:
+        gene = st.selectbox("Matching genes:", matches)
+        expression = index.gene(gene)
+        st.dataframe(expression)
+
+        fig, ax = plt.subplots(figsize=(10, 4))
+        expression.T.plot.bar(ax=ax, legend=len(expression) > 1)
+        ax.set_title(f'{gene} across samples')
+        ax.set_ylabel('Count')
+        st.pyplot(fig)
+
+    # Sample slice
+    st.subheader("Sample Slice")
+    sample = st.selectbox("Sample:", index.samples)
+    top = st.slider("Top genes:", 5, 100, 20)
+    st.dataframe(index.sample(sample, top=top).to_frame())
+
+@st.cache_data
+def load_embedding(counts_path, method, n_components, log):
+    """Sample embedding, the on-disk cache makes reruns and restarts instant"""
+    from src.omics.embedding import EmbeddingService
+    
+    return EmbeddingService().embed(counts_path, method=method, n_components=n_components, log=log)
+
+def display_sample_embedding():
+    """PCA scatter plot of the samples of a count matrix"""
+    import matplotlib.pyplot as plt
+    from src.omics.differential import condition_groups
+    
+    st.header("Sample Structure")
+
+    counts_path = st.text_input("Count matrix:", "data/raw/GSE289715_counts.csv", key="embedding_counts")
+    if not st.checkbox("Compute embedding", value=False):
+        return
+    if not os.path.exists(counts_path):
+        st.warning(f"Count matrix not found: {counts_path}")
+        return
+
+    method = st.radio("Method:", ["svd", "incremental"], horizontal=True)
+    log = st.checkbox("log2 CPM", value=True)
+    embedding = load_embedding(counts_path, method, 2, log)
+    ratio = embedding.attrs.get("explained_variance_ratio", [])
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for condition, samples in condition_groups(embedding.index).items():
+        points = embedding.loc[samples]
+        ax.scatter(points["PC1"], points["PC2"], label=condition)
+        for sample, row in points.iterrows():
+            ax.annotate(sample, (row["PC1"], row["PC2"]), fontsize=8)
+    if len(ratio) >= 2:
+        ax.set_xlabel(f'PC1 ({ratio[0]:.1%})')
+        ax.set_ylabel(f'PC2 ({ratio[1]:.1%})')
+    ax.legend()
+    st.pyplot(fig)
+
+    st.dataframe(embedding)
+
 if __name__ == "__main__":
     main()
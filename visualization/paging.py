@@ -0,0 +1,127 @@
+# visualization/paging.py
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion.predicates import filter_mask, validate_filters
+
+# server-side paging for the dashboard tables: the full table stays in the server process,
+# sorting/filtering produce an array of row positions (cached per query) and only the rows
+# of the visible page are sliced out and sent to the browser.
+# streamlit-free so it can be used and tested on its own
+
+PAGE_SIZES = (25, 50, 100, 500)
+
+
+def profile_frame(df):
+    """
+    Per-column summary (dtype, missing values, distinct values), computed once per dataset
+
+    Returns:
+        DataFrame with one row per column
+    """
+    missing = df.isna().sum()
+    return pd.DataFrame({
+        'Column': df.columns,
+        'Data Type': df.dtypes.astype(str).values,
+        'Missing Values': missing.values,
+        'Missing %': (missing / max(len(df), 1) * 100).round(1).values,
+        'Unique Values': [df[col].nunique(dropna=True) for col in df.columns],
+    })
+
+
+def num_pages(total_rows, page_size):
+    """Number of pages needed for total_rows (at least one, an empty table still has a page)"""
+    return max(1, -(-total_rows // page_size))
+
+
+class TablePager:
+    """
+    Sorted, filtered pages of a DataFrame without copying it
+    """
+
+    def __init__(self, frame, max_cached_queries=8):
+        """
+        Args:
+            frame: the full table
+            max_cached_queries: sort orders and query results kept in memory
+        """
+        self.frame = frame
+        self.max_cached_queries = max_cached_queries
+        self._orders = OrderedDict()
+        self._queries = OrderedDict()
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_cached_queries:
+            cache.popitem(last=False)
+        return value
+
+    def _order(self, column, ascending):
+        """Row positions sorted by one column, missing values last"""
+        key = (column, ascending)
+        if key in self._orders:
+            self._orders.move_to_end(key)
+            return self._orders[key]
+
+        values = self.frame[column].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        return self._remember(self._orders, key, order)
+
+    def _mask(self, filters, search, search_column):
+        mask = filter_mask(self.frame, filters)
+        if search:
+            columns = [search_column] if search_column else \
+                self.frame.select_dtypes(include=["object", "string"]).columns
+            matched = np.zeros(len(self.frame), dtype=bool)
+            for column in columns:
+                text = self.frame[column].astype("string")
+                matched |= np.asarray(text.str.contains(search, case=False, regex=False).fillna(False), dtype=bool)
+            mask &= matched
+        return mask
+
+    def rows(self, filters=None, search=None, search_column=None, sort_by=None, ascending=True):
+        """
+        Row positions of a query, cached so flipping pages does not re-run it
+
+        Args:
+            filters: list of (column, op, value), see src.data_ingestion.predicates
+            search: case-insensitive substring
+            search_column: column searched (all text columns when None)
+            sort_by: column to sort by (file order when None)
+            ascending: sort direction
+
+        Returns:
+            numpy array of row positions
+        """
+        filters = validate_filters(filters)
+        key = (repr(filters), search or None, search_column, sort_by, ascending)
+        if key in self._queries:
+            self._queries.move_to_end(key)
+            return self._queries[key]
+
+        positions = np.arange(len(self.frame)) if sort_by is None else self._order(sort_by, ascending)
+        if filters or search:
+            mask = self._mask(filters, search, search_column)
+            positions = positions[mask[positions]]
+        return self._remember(self._queries, key, positions)
+
+    def page(self, page=1, page_size=PAGE_SIZES[1], **query):
+        """
+        One page of a query
+
+        Args:
+            page: 1-based page number, clamped to the available pages
+            page_size: rows per page
+            query: passed to rows()
+
+        Returns:
+            tuple: (DataFrame of the page rows, number of matching rows)
+        """
+        positions = self.rows(**query)
+        page = min(max(1, page), num_pages(len(positions), page_size))
+        start = (page - 1) * page_size
+        return self.frame.iloc[positions[start:start + page_size]], len(positions)